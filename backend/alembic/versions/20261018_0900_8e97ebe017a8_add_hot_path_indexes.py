@@ -0,0 +1,111 @@
+"""add hot path indexes and uniqueness constraints
+
+Revision ID: 8e97ebe017a8
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e97ebe017a8'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, kwargs)
+INDEXES = [
+    ("ix_users_role_lower", "users", [sa.text("lower(role)")], {}),
+    ("ix_module_assignees_user_id", "module_assignees", ["user_id"], {}),
+    ("ix_notifications_recipient_read_created", "notifications", ["recipient_id", "is_read", "created_at"], {}),
+    ("ix_notifications_recipient_unread", "notifications", ["recipient_id"], {
+        "postgresql_where": sa.text("is_read = false"),
+        "sqlite_where": sa.text("is_read = 0"),
+    }),
+    ("ix_deliveries_assignee_id", "deliveries", ["assignee_id"], {}),
+    ("ix_knowledge_links_module_id", "knowledge_links", ["module_id"], {}),
+    ("ix_modules_project_id", "modules", ["project_id"], {}),
+    ("ix_modules_status_timeout_deadline", "modules", ["status", "is_timeout", "deadline"], {}),
+    ("ix_modules_pending_deadline", "modules", ["deadline"], {
+        "postgresql_where": sa.text("is_timeout = false AND deadline IS NOT NULL"),
+        "sqlite_where": sa.text("is_timeout = 0 AND deadline IS NOT NULL"),
+    }),
+    ("ix_reputation_history_user_changed", "reputation_history", ["user_id", "changed_at"], {}),
+    ("ix_module_abandon_requests_module_user_status", "module_abandon_requests", ["module_id", "user_id", "status"], {}),
+    ("ix_module_abandon_requests_status_created", "module_abandon_requests", ["status", "created_at"], {}),
+    ("ix_knowledge_items_created_at", "knowledge_items", ["created_at"], {}),
+    ("ix_knowledge_items_file_type_created", "knowledge_items", ["file_type", "created_at"], {}),
+    ("ix_knowledge_items_uploader_id", "knowledge_items", ["uploader_id"], {}),
+]
+
+# (name, table, columns)
+UNIQUE_CONSTRAINTS = [
+    ("uq_module_assignees_module_user", "module_assignees", ["module_id", "user_id"]),
+    ("uq_deliveries_module_assignee", "deliveries", ["module_id", "assignee_id"]),
+    ("uq_knowledge_links_knowledge_module", "knowledge_links", ["knowledge_id", "module_id"]),
+    ("uq_reviews_delivery_id", "reviews", ["delivery_id"]),
+]
+
+
+def _keep_first(table: str, columns: list) -> str:
+    return f"SELECT MIN(id) FROM {table} GROUP BY {', '.join(columns)}"
+
+
+# 同一承接人对同一模块的多条交付：优先保留已验收的一条（验收已结算信誉），
+# 都未验收时保留最早的一条。依赖验收已去重（每个交付最多一条验收）。
+DELIVERY_SURVIVORS = (
+    "SELECT COALESCE(MIN(CASE WHEN r.id IS NOT NULL THEN d.id END), MIN(d.id)) "
+    "FROM deliveries d LEFT JOIN reviews r ON r.delivery_id = d.id "
+    "GROUP BY d.module_id, d.assignee_id"
+)
+
+# 建唯一约束前清理重复行（此前只在路由中先查后插，并发时可能写入重复行）：
+# (表, 保留行 id 的子查询)，按顺序执行
+DEDUPLICATE = [
+    # 同一关联写入多次：保留最早的一条
+    ("module_assignees", _keep_first("module_assignees", ["module_id", "user_id"])),
+    ("knowledge_links", _keep_first("knowledge_links", ["knowledge_id", "module_id"])),
+    # 同一交付被验收多次：保留第一次验收
+    ("reviews", _keep_first("reviews", ["delivery_id"])),
+    # 将被删除的交付上的验收一并删除，再删除交付
+    ("reviews", f"SELECT id FROM reviews WHERE delivery_id IN ({DELIVERY_SURVIVORS})"),
+    ("deliveries", DELIVERY_SURVIVORS),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表，模型中已声明这些索引
+    if not inspector.has_table("users"):
+        return
+
+    for table, survivors in DEDUPLICATE:
+        op.execute(f"DELETE FROM {table} WHERE id NOT IN ({survivors})")
+
+    for name, table, columns in UNIQUE_CONSTRAINTS:
+        existing = {uc["name"] for uc in inspector.get_unique_constraints(table)}
+        if name in existing:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_unique_constraint(name, columns)
+
+    for name, table, columns, kwargs in INDEXES:
+        existing = {ix["name"] for ix in inspector.get_indexes(table)}
+        if name in existing:
+            continue
+        op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade() -> None:
+    for name, table, _columns, _kwargs in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+    for name, table, _columns in reversed(UNIQUE_CONSTRAINTS):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(name, type_="unique")
@@ -0,0 +1,57 @@
+"""add content-addressed file blobs
+
+Revision ID: 926f84956074
+Revises: 8e97ebe017a8
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '926f84956074'
+down_revision: Union[str, None] = '8e97ebe017a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("knowledge_items"):
+        return
+
+    if not inspector.has_table("file_blobs"):
+        op.create_table(
+            "file_blobs",
+            sa.Column("content_hash", sa.String(64), primary_key=True),
+            sa.Column("file_path", sa.String(500), nullable=False),
+            sa.Column("file_size", sa.Integer(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    columns = {c["name"] for c in inspector.get_columns("knowledge_items")}
+    if "content_hash" not in columns:
+        # 已有条目保留原来的独立文件，content_hash 为空
+        with op.batch_alter_table("knowledge_items") as batch_op:
+            batch_op.add_column(sa.Column("content_hash", sa.String(64), nullable=True))
+            batch_op.create_foreign_key(
+                "fk_knowledge_items_content_hash",
+                "file_blobs",
+                ["content_hash"],
+                ["content_hash"],
+            )
+        op.create_index("ix_knowledge_items_content_hash", "knowledge_items", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_knowledge_items_content_hash", table_name="knowledge_items")
+    with op.batch_alter_table("knowledge_items") as batch_op:
+        batch_op.drop_constraint("fk_knowledge_items_content_hash", type_="foreignkey")
+        batch_op.drop_column("content_hash")
+    op.drop_table("file_blobs")
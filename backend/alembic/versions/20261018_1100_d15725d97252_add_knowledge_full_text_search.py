@@ -0,0 +1,91 @@
+"""add knowledge full-text search
+
+Revision ID: d15725d97252
+Revises: 926f84956074
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd15725d97252'
+down_revision: Union[str, None] = '926f84956074'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+POSTGRESQL_UPGRADE = [
+    """
+    ALTER TABLE knowledge_items ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_knowledge_items_search_vector ON knowledge_items USING GIN (search_vector)",
+]
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE knowledge_items_fts USING fts5(
+        title, description, content='knowledge_items', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER knowledge_items_fts_ai AFTER INSERT ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER knowledge_items_fts_ad AFTER DELETE ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER knowledge_items_fts_au AFTER UPDATE OF title, description ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO knowledge_items_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    # 为已有数据建立索引
+    "INSERT INTO knowledge_items_fts(knowledge_items_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # 全新数据库由 init_db 的 create_all 建表，建表时会一并创建检索结构
+    if not inspector.has_table("knowledge_items"):
+        return
+
+    if bind.dialect.name == "postgresql":
+        columns = {c["name"] for c in inspector.get_columns("knowledge_items")}
+        if "search_vector" not in columns:
+            for statement in POSTGRESQL_UPGRADE:
+                op.execute(statement)
+    elif bind.dialect.name == "sqlite":
+        if not inspector.has_table("knowledge_items_fts"):
+            for statement in SQLITE_UPGRADE:
+                op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_knowledge_items_search_vector")
+        op.execute("ALTER TABLE knowledge_items DROP COLUMN IF EXISTS search_vector")
+    elif bind.dialect.name == "sqlite":
+        for trigger in ("knowledge_items_fts_ai", "knowledge_items_fts_ad", "knowledge_items_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS knowledge_items_fts")
@@ -0,0 +1,136 @@
+"""add knowledge text extraction
+
+Revision ID: 3b6f2a9c41d0
+Revises: d15725d97252
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b6f2a9c41d0'
+down_revision: Union[str, None] = 'd15725d97252'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_TRIGGERS = ("knowledge_items_fts_ai", "knowledge_items_fts_ad", "knowledge_items_fts_au")
+
+
+def _postgres_search_vector(with_content: bool) -> list:
+    content = (
+        " ||\n        setweight(to_tsvector('simple', coalesce(content_text, '')), 'C')"
+        if with_content else ""
+    )
+    return [
+        "DROP INDEX IF EXISTS ix_knowledge_items_search_vector",
+        "ALTER TABLE knowledge_items DROP COLUMN IF EXISTS search_vector",
+        f"""
+    ALTER TABLE knowledge_items ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B'){content}
+    ) STORED
+    """,
+        "CREATE INDEX ix_knowledge_items_search_vector ON knowledge_items USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_fts(columns: list) -> list:
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    statements = [f"DROP TRIGGER IF EXISTS {trigger}" for trigger in SQLITE_TRIGGERS]
+    statements += [
+        "DROP TABLE IF EXISTS knowledge_items_fts",
+        f"""
+    CREATE VIRTUAL TABLE knowledge_items_fts USING fts5(
+        {names}, content='knowledge_items', content_rowid='id'
+    )
+    """,
+        f"""
+    CREATE TRIGGER knowledge_items_fts_ai AFTER INSERT ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(rowid, {names})
+        VALUES (new.id, {new_values});
+    END
+    """,
+        f"""
+    CREATE TRIGGER knowledge_items_fts_ad AFTER DELETE ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, {names})
+        VALUES ('delete', old.id, {old_values});
+    END
+    """,
+        f"""
+    CREATE TRIGGER knowledge_items_fts_au AFTER UPDATE OF {names} ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, {names})
+        VALUES ('delete', old.id, {old_values});
+        INSERT INTO knowledge_items_fts(rowid, {names})
+        VALUES (new.id, {new_values});
+    END
+    """,
+        # 为已有数据重建索引
+        "INSERT INTO knowledge_items_fts(knowledge_items_fts) VALUES ('rebuild')",
+    ]
+    return statements
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("knowledge_items"):
+        return
+
+    columns = {c["name"] for c in inspector.get_columns("knowledge_items")}
+    if "content_text" in columns:
+        return
+
+    with op.batch_alter_table("knowledge_items") as batch_op:
+        batch_op.add_column(sa.Column("content_text", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("extraction_status", sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column("extraction_error", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("extracted_at", sa.DateTime(timezone=True), nullable=True))
+
+    # 已有条目保持 extraction_status 为 NULL，可通过 POST /knowledge/reindex 补提取
+    if bind.dialect.name == "postgresql":
+        statements = _postgres_search_vector(with_content=True)
+    elif bind.dialect.name == "sqlite":
+        statements = _sqlite_fts(["title", "description", "content_text"])
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        statements = _postgres_search_vector(with_content=False)
+    elif bind.dialect.name == "sqlite":
+        statements = _sqlite_fts(["title", "description"])
+    else:
+        statements = []
+
+    # 先去掉依赖 content_text 的检索结构，再删除列
+    if bind.dialect.name == "sqlite":
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS knowledge_items_fts")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_knowledge_items_search_vector")
+        op.execute("ALTER TABLE knowledge_items DROP COLUMN IF EXISTS search_vector")
+
+    with op.batch_alter_table("knowledge_items") as batch_op:
+        batch_op.drop_column("extracted_at")
+        batch_op.drop_column("extraction_error")
+        batch_op.drop_column("extraction_status")
+        batch_op.drop_column("content_text")
+
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,54 @@
+"""add notification counters
+
+Revision ID: 7c2d4e8f1a93
+Revises: 3b6f2a9c41d0
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d4e8f1a93'
+down_revision: Union[str, None] = '3b6f2a9c41d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("notifications"):
+        return
+
+    if inspector.has_table("notification_counters"):
+        return
+
+    counters = op.create_table(
+        "notification_counters",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("unread_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # 用现有未读通知初始化计数
+    notifications = sa.table(
+        "notifications",
+        sa.column("recipient_id", sa.Integer()),
+        sa.column("is_read", sa.Boolean()),
+    )
+    op.execute(
+        counters.insert().from_select(
+            ["user_id", "unread_count"],
+            sa.select(notifications.c.recipient_id, sa.func.count())
+            .where(notifications.c.is_read == sa.false())
+            .group_by(notifications.c.recipient_id)
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("notification_counters")
@@ -0,0 +1,61 @@
+"""add notification archive
+
+Revision ID: 5e1a7b3c9d24
+Revises: 7c2d4e8f1a93
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1a7b3c9d24'
+down_revision: Union[str, None] = '7c2d4e8f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("notifications"):
+        return
+
+    if not inspector.has_table("notification_archive"):
+        op.create_table(
+            "notification_archive",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("recipient_id", sa.Integer(), nullable=False),
+            sa.Column("type", sa.String(50), nullable=False),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("is_read", sa.Boolean(), nullable=False, server_default=sa.false()),
+            sa.Column("related_module_id", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True)),
+            sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index(
+            "ix_notification_archive_recipient_created",
+            "notification_archive",
+            ["recipient_id", "created_at"],
+        )
+
+    indexes = {index["name"] for index in inspector.get_indexes("notifications")}
+    if "ix_notifications_read_created" not in indexes:
+        op.create_index(
+            "ix_notifications_read_created",
+            "notifications",
+            ["created_at"],
+            postgresql_where=sa.text("is_read = true"),
+            sqlite_where=sa.text("is_read = 1"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_read_created", table_name="notifications")
+    op.drop_index("ix_notification_archive_recipient_created", table_name="notification_archive")
+    op.drop_table("notification_archive")
@@ -0,0 +1,36 @@
+"""add module deadline reminders
+
+Revision ID: 9a4f6c2e8b17
+Revises: 5e1a7b3c9d24
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f6c2e8b17'
+down_revision: Union[str, None] = '5e1a7b3c9d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("modules"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("modules")}
+    if "last_reminder_minutes" not in columns:
+        with op.batch_alter_table("modules") as batch_op:
+            batch_op.add_column(sa.Column("last_reminder_minutes", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("modules") as batch_op:
+        batch_op.drop_column("last_reminder_minutes")
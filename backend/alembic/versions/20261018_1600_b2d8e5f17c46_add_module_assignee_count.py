@@ -0,0 +1,49 @@
+"""add module assignee count
+
+Revision ID: b2d8e5f17c46
+Revises: 9a4f6c2e8b17
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d8e5f17c46'
+down_revision: Union[str, None] = '9a4f6c2e8b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("modules"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("modules")}
+    if "assignee_count" in columns:
+        return
+
+    with op.batch_alter_table("modules") as batch_op:
+        batch_op.add_column(sa.Column("assignee_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # 用现有承接记录初始化计数
+    modules = sa.table("modules", sa.column("id", sa.Integer()), sa.column("assignee_count", sa.Integer()))
+    assignees = sa.table("module_assignees", sa.column("module_id", sa.Integer()))
+    op.execute(
+        modules.update().values(
+            assignee_count=sa.select(sa.func.count())
+            .where(assignees.c.module_id == modules.c.id)
+            .scalar_subquery()
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("modules") as batch_op:
+        batch_op.drop_column("assignee_count")
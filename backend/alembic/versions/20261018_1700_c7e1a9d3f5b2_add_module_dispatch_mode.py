@@ -0,0 +1,38 @@
+"""add module dispatch mode
+
+Revision ID: c7e1a9d3f5b2
+Revises: b2d8e5f17c46
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1a9d3f5b2'
+down_revision: Union[str, None] = 'b2d8e5f17c46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("modules"):
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("modules")}
+    if "dispatch_mode" not in columns:
+        with op.batch_alter_table("modules") as batch_op:
+            batch_op.add_column(
+                sa.Column("dispatch_mode", sa.String(20), nullable=False, server_default="immediate")
+            )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("modules") as batch_op:
+        batch_op.drop_column("dispatch_mode")
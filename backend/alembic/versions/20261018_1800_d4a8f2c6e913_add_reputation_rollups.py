@@ -0,0 +1,45 @@
+"""add reputation rollups
+
+Revision ID: d4a8f2c6e913
+Revises: c7e1a9d3f5b2
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8f2c6e913'
+down_revision: Union[str, None] = 'c7e1a9d3f5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("users"):
+        return
+
+    if inspector.has_table("reputation_rollups"):
+        return
+
+    # 已有信誉记录的汇总由 python -m app.services.reputation_rollups 回填
+    op.create_table(
+        "reputation_rollups",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("granularity", sa.String(10), primary_key=True),
+        sa.Column("bucket_start", sa.Date(), primary_key=True),
+        sa.Column("score_change", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("gains", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("losses", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("event_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reputation_rollups")
@@ -0,0 +1,94 @@
+"""use trigram matching for knowledge search (CJK substrings)
+
+Revision ID: e5b9c3d7a1f4
+Revises: d4a8f2c6e913
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c3d7a1f4'
+down_revision: Union[str, None] = 'd4a8f2c6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_TEXT_SQL = "(coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(content_text, ''))"
+
+POSTGRESQL_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_knowledge_items_search_trgm ON knowledge_items "
+    f"USING GIN ({SEARCH_TEXT_SQL} gin_trgm_ops)",
+]
+
+SQLITE_TRIGGERS = ("knowledge_items_fts_ai", "knowledge_items_fts_ad", "knowledge_items_fts_au")
+SQLITE_COLUMNS = "title, description, content_text"
+
+
+def _sqlite_fts(tokenize: str) -> list:
+    options = f", tokenize='{tokenize}'" if tokenize else ""
+    statements = [f"DROP TRIGGER IF EXISTS {trigger}" for trigger in SQLITE_TRIGGERS]
+    statements += [
+        "DROP TABLE IF EXISTS knowledge_items_fts",
+        f"""
+    CREATE VIRTUAL TABLE knowledge_items_fts USING fts5(
+        {SQLITE_COLUMNS}, content='knowledge_items', content_rowid='id'{options}
+    )
+    """,
+        f"""
+    CREATE TRIGGER knowledge_items_fts_ai AFTER INSERT ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(rowid, {SQLITE_COLUMNS})
+        VALUES (new.id, new.title, new.description, new.content_text);
+    END
+    """,
+        f"""
+    CREATE TRIGGER knowledge_items_fts_ad AFTER DELETE ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, {SQLITE_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.description, old.content_text);
+    END
+    """,
+        f"""
+    CREATE TRIGGER knowledge_items_fts_au AFTER UPDATE OF {SQLITE_COLUMNS} ON knowledge_items BEGIN
+        INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, {SQLITE_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.description, old.content_text);
+        INSERT INTO knowledge_items_fts(rowid, {SQLITE_COLUMNS})
+        VALUES (new.id, new.title, new.description, new.content_text);
+    END
+    """,
+        # 按新的分词方式重建已有数据的索引
+        "INSERT INTO knowledge_items_fts(knowledge_items_fts) VALUES ('rebuild')",
+    ]
+    return statements
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # 全新数据库由 init_db 的 create_all 建表，建表时会一并创建检索结构
+    if not inspector.has_table("knowledge_items"):
+        return
+
+    if bind.dialect.name == "postgresql":
+        statements = POSTGRESQL_UPGRADE
+    elif bind.dialect.name == "sqlite":
+        statements = _sqlite_fts("trigram")
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_knowledge_items_search_trgm")
+    elif bind.dialect.name == "sqlite":
+        for statement in _sqlite_fts(""):
+            op.execute(statement)
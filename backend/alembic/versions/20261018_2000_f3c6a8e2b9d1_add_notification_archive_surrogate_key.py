@@ -0,0 +1,87 @@
+"""give notification_archive its own primary key
+
+Revision ID: f3c6a8e2b9d1
+Revises: e5b9c3d7a1f4
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c6a8e2b9d1'
+down_revision: Union[str, None] = 'e5b9c3d7a1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = "recipient_id, type, title, content, is_read, related_module_id, created_at, archived_at"
+
+
+def _create_archive(*id_columns: sa.Column) -> None:
+    op.create_table(
+        "notification_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        *id_columns,
+        sa.Column("recipient_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("related_module_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index(
+        "ix_notification_archive_recipient_created",
+        "notification_archive",
+        ["recipient_id", "created_at"],
+    )
+
+
+def _rename_old_archive() -> None:
+    # SQLite 的索引名全局唯一，先删掉旧表上的索引
+    op.drop_index("ix_notification_archive_recipient_created", table_name="notification_archive")
+    op.rename_table("notification_archive", "notification_archive_old")
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # 全新数据库由 init_db 的 create_all 建表
+    if not inspector.has_table("notification_archive"):
+        return
+    columns = {column["name"] for column in inspector.get_columns("notification_archive")}
+    if "notification_id" in columns:
+        return
+
+    # 归档表原来以通知 id 作主键；SQLite 会复用已删除的最大通知 id，
+    # 复用的 id 再次归档时主键冲突。重建为自增主键，原 id 存入 notification_id
+    _rename_old_archive()
+    _create_archive(sa.Column("notification_id", sa.Integer(), nullable=False))
+    op.create_index(
+        "ix_notification_archive_notification_id",
+        "notification_archive",
+        ["notification_id"],
+    )
+    op.execute(
+        f"INSERT INTO notification_archive (notification_id, {COLUMNS}) "
+        f"SELECT id, {COLUMNS} FROM notification_archive_old ORDER BY id"
+    )
+    op.drop_table("notification_archive_old")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_archive_notification_id", table_name="notification_archive")
+    _rename_old_archive()
+    _create_archive()
+    # 原通知 id 重复时只保留最早归档的一行
+    op.execute(
+        f"INSERT INTO notification_archive (id, {COLUMNS}) "
+        f"SELECT notification_id, {COLUMNS} FROM notification_archive_old "
+        "WHERE id IN (SELECT MIN(id) FROM notification_archive_old GROUP BY notification_id)"
+    )
+    op.drop_table("notification_archive_old")
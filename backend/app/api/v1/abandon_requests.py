@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from app.db.session import get_db
@@ -11,7 +11,13 @@ from app.models.abandon_request import ModuleAbandonRequest
 from app.models.user import User
 from app.models.module import Module
 from app.core.deps import get_current_user, get_current_commander
+from app.core.pagination import keyset_paginate, build_page, estimate_total
+from app.core.query_cache import query_cache, module_tag, project_tag
 from app.models.module_assignee import ModuleAssignee
+from app.models.notification import NotificationType
+from app.services.notifications import notify_users
+from app.services.assignments import remove_assignment
+from app.services.dispatch import dispatch_queue
 
 router = APIRouter()
 
@@ -90,11 +96,15 @@ async def create_abandon_request(
 
 @router.get("/", response_model=List[AbandonRequestResponse])
 async def list_abandon_requests(
+    response: Response,
     status: str = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    with_total: bool = False,
     current_user: User = Depends(get_current_commander),
     db: AsyncSession = Depends(get_db)
 ):
-    """指挥官查看所有放弃申请"""
+    """指挥官查看所有放弃申请（游标分页，下一页游标见 X-Next-Cursor 响应头）"""
     # 构建查询，预加载用户关系
     query = select(ModuleAbandonRequest).options(
         selectinload(ModuleAbandonRequest.requester)
@@ -105,8 +115,11 @@ async def list_abandon_requests(
     if status:
         query = query.where(ModuleAbandonRequest.status == status)
 
-    result = await db.execute(query.order_by(ModuleAbandonRequest.created_at.desc()))
-    abandon_requests = result.scalars().all()
+    if with_total:
+        await estimate_total(db, query, response)
+
+    result = await db.execute(keyset_paginate(query, ModuleAbandonRequest, cursor, limit))
+    abandon_requests = build_page(result.scalars().all(), limit, response)
 
     # 获取模块标题
     module_ids = [ar.module_id for ar in abandon_requests]
@@ -170,15 +183,10 @@ async def review_abandon_request(
     abandon_request.reviewer_comment = review_data.reviewer_comment
 
     if review_data.approve:
-        # 批准：释放任务槽位（删除承接记录）
-        await db.execute(
-            delete(ModuleAssignee)
-            .where(
-                ModuleAssignee.module_id == abandon_request.module_id,
-                ModuleAssignee.user_id == abandon_request.user_id
-            )
-        )
+        # 批准：删除承接记录，释放模块名额和申请人的任务槽位
+        await remove_assignment(db, abandon_request.module_id, abandon_request.user_id)
         await db.commit()
+        dispatch_queue.forget(abandon_request.module_id)
 
         # 检查是否还有其他承接人
         remaining_result = await db.execute(
@@ -193,30 +201,30 @@ async def review_abandon_request(
             module.status = "open"
         elif module and module.status == "in_progress":
             module.status = "open"
+        if module:
+            query_cache.invalidate_on_commit(db, module_tag(module.id), project_tag(module.project_id))
 
         # 发送通知给申请人
-        from app.models.notification import Notification, NotificationType
-        notification = Notification(
-            recipient_id=abandon_request.user_id,
+        await notify_users(
+            db,
+            [abandon_request.user_id],
             type=NotificationType.ABANDON_APPROVED,
-            title=f"放弃任务已批准",
+            title="放弃任务已批准",
             content=f"您对任务「{module.title if module else abandon_request.module_id}」的放弃申请已被批准。{review_data.reviewer_comment or ''}",
             related_module_id=abandon_request.module_id
         )
-        db.add(notification)
 
     else:
         # 拒绝：只更新状态和评论
         # 发送通知给申请人
-        from app.models.notification import Notification, NotificationType
-        notification = Notification(
-            recipient_id=abandon_request.user_id,
+        await notify_users(
+            db,
+            [abandon_request.user_id],
             type=NotificationType.ABANDON_REJECTED,
-            title=f"放弃任务被拒绝",
+            title="放弃任务被拒绝",
             content=f"您对任务「{module.title if module else abandon_request.module_id}」的放弃申请已被拒绝。{review_data.reviewer_comment or ''}",
             related_module_id=abandon_request.module_id
         )
-        db.add(notification)
 
     await db.commit()
     await db.refresh(abandon_request)
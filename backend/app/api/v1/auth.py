@@ -4,7 +4,7 @@ from sqlalchemy import select
 from app.db.session import get_db
 from app.schemas import UserCreate, UserLogin, Token, UserResponse
 from app.models import User
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token
 from app.core.deps import get_current_user
 
 router = APIRouter()
@@ -26,7 +26,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # 创建新用户
     new_user = User(
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         role=user_data.role if user_data.role in ["commander", "node"] else "node",
         reputation_score=100.0,
         concurrent_task_count=0
@@ -52,7 +52,7 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == credentials.username))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
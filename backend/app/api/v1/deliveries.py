@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from typing import List
 from app.db.session import get_db
 from app.schemas import DeliveryCreate, DeliveryResponse
 from app.models import Delivery, Module, ModuleAssignee, User
+from app.models.notification import NotificationType
 from app.core.deps import get_current_user, get_current_commander
+from app.core.query_cache import query_cache, module_tag, project_tag
+from app.services.notifications import notify_commanders
 
 router = APIRouter()
 
@@ -72,26 +75,18 @@ async def submit_delivery(
     )
 
     db.add(new_delivery)
+    query_cache.invalidate_on_commit(db, module_tag(module.id), project_tag(module.project_id))
     await db.commit()
     await db.refresh(new_delivery)
 
-    # 发送通知给指挥官
-    from app.models.notification import Notification, NotificationType
-    # 查找所有指挥官
-    commanders_result = await db.execute(
-        select(User).where(func.lower(User.role) == "commander")
+    # 发送通知给指挥官（一条多行 INSERT）
+    await notify_commanders(
+        db,
+        type=NotificationType.DELIVERY_SUBMITTED,
+        title="任务已提交交付",
+        content=f"节点「{current_user.username}」已提交任务「{module.title}」的交付物，请及时验收",
+        related_module_id=delivery_data.module_id
     )
-    commanders = commanders_result.scalars().all()
-
-    for commander in commanders:
-        notification = Notification(
-            recipient_id=commander.id,
-            type=NotificationType.DELIVERY_SUBMITTED,
-            title=f"任务已提交交付",
-            content=f"节点「{current_user.username}」已提交任务「{module.title}」的交付物，请及时验收",
-            related_module_id=delivery_data.module_id
-        )
-        db.add(notification)
 
     await db.commit()
 
@@ -1,7 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from sqlalchemy.orm import selectinload
 from typing import Optional, List
 from pathlib import Path
@@ -9,15 +8,28 @@ from app.db.session import get_db
 from app.models.knowledge_item import KnowledgeItem
 from app.models.knowledge_link import KnowledgeLink
 from app.models.user import User
-from app.schemas.knowledge import KnowledgeCreate, KnowledgeResponse, KnowledgeLink as KnowledgeLinkSchema
-from app.core.file_storage import save_upload_file, delete_file, format_file_size
-from app.core.deps import get_current_user
+from app.schemas.knowledge import (
+    KnowledgeCreate, KnowledgeResponse, KnowledgeFromHash, BlobStatus, ExtractionStatus,
+    KnowledgeLink as KnowledgeLinkSchema
+)
+from app.core.file_storage import (
+    save_upload_file, discard_file, delete_file, format_file_size, validate_file_type, is_valid_content_hash
+)
+from app.core.file_download import build_file_response
+from app.services.blob_store import get_blob, acquire_blob, release_blob
+from app.services.knowledge_search import apply_search, search_paginate, build_search_page
+from app.services.text_extraction import run_extraction
+from app.core.deps import get_current_user, get_current_commander
+from app.core.pagination import keyset_paginate, build_page, estimate_total
+from app.core.conditional import weak_etag, not_modified
+from app.core.query_cache import query_cache, knowledge_tag, module_tag
 
 router = APIRouter()
 
 
 @router.post("/", response_model=KnowledgeResponse)
 async def upload_knowledge(
+    background_tasks: BackgroundTasks,
     title: str = Query(..., description="知识标题"),
     description: Optional[str] = Query(None, description="知识描述"),
     file: UploadFile = File(..., description="知识文件"),
@@ -29,18 +41,108 @@ async def upload_knowledge(
 
     支持的文件类型：zip, md, pdf, png, jpg, jpeg, gif, doc, docx, txt
     文件大小限制：≤30MB
+    相同内容的文件只存储一份
+    提交后在后台提取文件文本用于全文检索
     """
-    # Validate and save file
-    file_path, file_size = await save_upload_file(file, current_user.id)
+    # Validate and stream the file to a temporary file
+    temp_path, file_size, content_hash = await save_upload_file(file, current_user.id)
+
+    try:
+        # Moves the temporary file into the blob store (or discards it) under the blob row lock
+        file_path = await acquire_blob(db, content_hash, file_size, temp_path)
+
+        # Create knowledge item
+        knowledge = KnowledgeItem(
+            title=title,
+            description=description,
+            file_url=file_path,
+            file_name=file.filename or "unknown",
+            file_size=file_size,
+            file_type=file.content_type or "application/octet-stream",
+            content_hash=content_hash,
+            uploader_id=current_user.id
+        )
+
+        db.add(knowledge)
+        await db.commit()
+        await db.refresh(knowledge)
+    finally:
+        await discard_file(temp_path)
+
+    # Extract file text for search after the item is committed
+    background_tasks.add_task(run_extraction, knowledge.id)
+
+    return KnowledgeResponse(
+        id=knowledge.id,
+        title=knowledge.title,
+        description=knowledge.description,
+        file_name=knowledge.file_name,
+        file_size=knowledge.file_size,
+        file_type=knowledge.file_type,
+        uploader_id=knowledge.uploader_id,
+        uploader_name=current_user.username,
+        created_at=knowledge.created_at,
+        linked_modules_count=0,
+        is_owned=True
+    )
+
+
+@router.get("/blobs/{content_hash}", response_model=BlobStatus)
+async def check_blob(
+    content_hash: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    检查文件内容是否已存在
+
+    客户端先计算文件 SHA-256，已存在时可直接调用 /from-hash 创建知识，无需重复上传
+    """
+    content_hash = content_hash.lower()
+    if not is_valid_content_hash(content_hash):
+        raise HTTPException(status_code=400, detail="无效的文件哈希")
+
+    blob = await get_blob(db, content_hash)
+    return BlobStatus(
+        content_hash=content_hash,
+        exists=blob is not None,
+        file_size=blob.file_size if blob else None
+    )
+
+
+@router.post("/from-hash", response_model=KnowledgeResponse)
+async def create_knowledge_from_hash(
+    data: KnowledgeFromHash,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    引用已存储的文件创建知识
+
+    文件内容必须已存在于服务器（见 /blobs/{content_hash}）
+    """
+    content_hash = data.content_hash.lower()
+    if not is_valid_content_hash(content_hash):
+        raise HTTPException(status_code=400, detail="无效的文件哈希")
+
+    validate_file_type(data.file_name)
+
+    blob = await get_blob(db, content_hash)
+    if not blob:
+        raise HTTPException(status_code=404, detail="文件不存在，请上传文件")
+
+    # Fails with 404 if a concurrent delete removed the last reference in the meantime
+    file_path = await acquire_blob(db, content_hash, blob.file_size)
 
-    # Create knowledge item
     knowledge = KnowledgeItem(
-        title=title,
-        description=description,
+        title=data.title,
+        description=data.description,
         file_url=file_path,
-        file_name=file.filename or "unknown",
-        file_size=file_size,
-        file_type=file.content_type or "application/octet-stream",
+        file_name=data.file_name,
+        file_size=blob.file_size,
+        file_type=data.file_type or "application/octet-stream",
+        content_hash=content_hash,
         uploader_id=current_user.id
     )
 
@@ -48,6 +150,8 @@ async def upload_knowledge(
     await db.commit()
     await db.refresh(knowledge)
 
+    background_tasks.add_task(run_extraction, knowledge.id)
+
     return KnowledgeResponse(
         id=knowledge.id,
         title=knowledge.title,
@@ -63,53 +167,101 @@ async def upload_knowledge(
     )
 
 
+@router.post("/reindex")
+async def reindex_all_knowledge(
+    background_tasks: BackgroundTasks,
+    status: List[str] = Query(["pending", "failed"], description="要重新提取的状态"),
+    limit: int = Query(500, ge=1, le=5000, description="本次最多处理的条目数"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_commander)
+):
+    """批量重新提取知识文件文本（仅指挥官）"""
+    condition = KnowledgeItem.extraction_status.in_(status)
+    if "pending" in status:
+        # 文本提取上线前上传的条目没有状态
+        condition = condition | KnowledgeItem.extraction_status.is_(None)
+
+    result = await db.execute(
+        select(KnowledgeItem.id).where(condition).order_by(KnowledgeItem.id).limit(limit)
+    )
+    knowledge_ids = result.scalars().all()
+
+    if knowledge_ids:
+        await db.execute(
+            update(KnowledgeItem)
+            .where(KnowledgeItem.id.in_(knowledge_ids))
+            .values(extraction_status="pending", extraction_error=None)
+        )
+        await db.commit()
+
+    for knowledge_id in knowledge_ids:
+        background_tasks.add_task(run_extraction, knowledge_id)
+
+    return {"message": f"已安排 {len(knowledge_ids)} 个知识条目重新提取"}
+
+
 @router.get("/", response_model=List[KnowledgeResponse])
 async def list_knowledge(
-    skip: int = Query(0, ge=0, description="跳过的记录数"),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="分页游标（上一页响应头 X-Next-Cursor）"),
     limit: int = Query(50, ge=1, le=100, description="返回的记录数"),
-    search: Optional[str] = Query(None, description="搜索关键词（标题或描述）"),
+    search: Optional[str] = Query(None, description="全文搜索（标题、描述或文件内容），支持 \"短语\" 和 前缀*"),
     file_type: Optional[str] = Query(None, description="文件类型筛选"),
+    with_total: bool = Query(False, description="是否在 X-Total-Count 响应头返回估算总数"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     获取知识列表
 
-    支持按标题/描述搜索
+    支持按标题/描述/文件内容全文搜索，结果按相关度排序
     支持按文件类型筛选
+    游标分页，下一页游标见 X-Next-Cursor 响应头
+    支持 If-None-Match：当前页未变化时返回 304
     """
     # Build query with eager loading of uploader
     query = select(KnowledgeItem).options(selectinload(KnowledgeItem.uploader))
 
-    # Search filter
+    # Full-text search filter
+    search_score = None
     if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            (KnowledgeItem.title.ilike(search_term)) |
-            (KnowledgeItem.description.ilike(search_term))
-        )
+        searched = apply_search(db, query, search)
+        if searched is not None:
+            query, search_score = searched
 
     # File type filter
     if file_type:
         query = query.where(KnowledgeItem.file_type == file_type)
 
-    # Order by upload time (newest first)
-    query = query.order_by(KnowledgeItem.created_at.desc())
-
-    # Pagination
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    items = result.scalars().all()
+    if with_total:
+        await estimate_total(db, query, response)
+
+    if search_score is not None:
+        # Order by relevance
+        result = await db.execute(search_paginate(query, search_score, cursor, limit))
+        items = build_search_page(result.all(), limit, response)
+    else:
+        # Order by upload time (newest first), keyset pagination
+        result = await db.execute(keyset_paginate(query, KnowledgeItem, cursor, limit))
+        items = build_page(result.scalars().all(), limit, response)
+
+    # Linked modules count (and latest link id) per item, cached by knowledge tag
+    link_stats = await _get_link_stats(db, [item.id for item in items])
+
+    # 知识条目创建后不再修改；is_owned 因用户而异，ETag 带上用户 id
+    etag = weak_etag(
+        current_user.id,
+        [(item.id, item.created_at, link_stats.get(item.id)) for item in items],
+        response.headers.get("X-Total-Count"),
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
 
-    # Get linked modules count for each item
     responses = []
     for item in items:
-        # Count linked modules
-        count_query = select(func.count(KnowledgeLink.id)).where(
-            KnowledgeLink.knowledge_id == item.id
-        )
-        count_result = await db.execute(count_query)
-        linked_count = count_result.scalar() or 0
+        linked_count = link_stats[item.id][0]
 
         responses.append(KnowledgeResponse(
             id=item.id,
@@ -128,6 +280,29 @@ async def list_knowledge(
     return responses
 
 
+async def _get_link_stats(db: AsyncSession, item_ids: List[int]) -> dict:
+    """返回 知识 id -> [关联任务数, 最新关联 id]，未命中缓存的条目用一条分组查询补齐"""
+    if not item_ids:
+        return {}
+
+    async def load(missing: List[str]) -> dict:
+        missing_ids = [int(key.rsplit(":", 1)[1]) for key in missing]
+        result = await db.execute(
+            select(KnowledgeLink.knowledge_id, func.count(KnowledgeLink.id), func.max(KnowledgeLink.id))
+            .where(KnowledgeLink.knowledge_id.in_(missing_ids))
+            .group_by(KnowledgeLink.knowledge_id)
+        )
+        # 缓存列表而不是元组：redis 后端以 JSON 存储，读回的也是列表
+        stats = {knowledge_id: [count, latest] for knowledge_id, count, latest in result.all()}
+        return {f"knowledge_links:{item_id}": stats.get(item_id, [0, None]) for item_id in missing_ids}
+
+    cached = await query_cache.get_or_load_many(
+        {f"knowledge_links:{item_id}": [knowledge_tag(item_id)] for item_id in item_ids},
+        load
+    )
+    return {item_id: cached[f"knowledge_links:{item_id}"] for item_id in item_ids}
+
+
 @router.get("/{knowledge_item_id}", response_model=KnowledgeResponse)
 async def get_knowledge(
     knowledge_item_id: int,
@@ -167,6 +342,7 @@ async def get_knowledge(
 @router.get("/{knowledge_item_id}/download")
 async def download_knowledge(
     knowledge_item_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -174,6 +350,7 @@ async def download_knowledge(
     下载知识文件
 
     所有用户都可以下载知识文件
+    支持 ETag / Last-Modified 条件请求（304）和 Range 断点续传（206）
     """
     query = select(KnowledgeItem).where(KnowledgeItem.id == knowledge_item_id)
     result = await db.execute(query)
@@ -188,10 +365,73 @@ async def download_knowledge(
         raise HTTPException(status_code=404, detail="文件不存在")
 
     # Return file
-    return FileResponse(
-        path=str(file_path),
+    return build_file_response(
+        request,
+        file_path,
         filename=knowledge.file_name,
-        media_type=knowledge.file_type
+        media_type=knowledge.file_type,
+        content_hash=knowledge.content_hash
+    )
+
+
+@router.get("/{knowledge_item_id}/extraction", response_model=ExtractionStatus)
+async def get_extraction_status(
+    knowledge_item_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """获取知识文件的文本提取状态"""
+    knowledge = await db.get(KnowledgeItem, knowledge_item_id)
+    if not knowledge:
+        raise HTTPException(status_code=404, detail="知识不存在")
+
+    return ExtractionStatus(
+        knowledge_id=knowledge.id,
+        status=knowledge.extraction_status or "pending",
+        error=knowledge.extraction_error,
+        extracted_at=knowledge.extracted_at,
+        content_length=await _content_length(db, knowledge.id)
+    )
+
+
+async def _content_length(db: AsyncSession, knowledge_item_id: int) -> int:
+    """提取文本的长度（在数据库中计算，不读出 content_text）"""
+    length = await db.scalar(
+        select(func.length(KnowledgeItem.content_text)).where(KnowledgeItem.id == knowledge_item_id)
+    )
+    return length or 0
+
+
+@router.post("/{knowledge_item_id}/reindex", response_model=ExtractionStatus)
+async def reindex_knowledge(
+    knowledge_item_id: int,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    重新提取知识文件文本
+
+    权限：上传者本人或指挥官
+    """
+    knowledge = await db.get(KnowledgeItem, knowledge_item_id)
+    if not knowledge:
+        raise HTTPException(status_code=404, detail="知识不存在")
+
+    if knowledge.uploader_id != current_user.id and current_user.role != 'commander':
+        raise HTTPException(status_code=403, detail="无权重建此知识的索引")
+
+    knowledge.extraction_status = "pending"
+    knowledge.extraction_error = None
+    await db.commit()
+
+    background_tasks.add_task(run_extraction, knowledge.id)
+
+    return ExtractionStatus(
+        knowledge_id=knowledge.id,
+        status=knowledge.extraction_status,
+        extracted_at=knowledge.extracted_at,
+        content_length=await _content_length(db, knowledge.id)
     )
 
 
@@ -217,13 +457,25 @@ async def delete_knowledge(
     if knowledge.uploader_id != current_user.id and current_user.role != 'commander':
         raise HTTPException(status_code=403, detail="无权删除此知识")
 
-    # Delete file from disk
-    delete_file(knowledge.file_url)
+    content_hash = knowledge.content_hash
+    # Legacy items without a content hash own their file
+    file_to_delete = knowledge.file_url if not content_hash else None
 
     # Delete from database (cascade will delete links)
     await db.delete(knowledge)
+    query_cache.invalidate_on_commit(db, knowledge_tag(knowledge_item_id))
+    await db.flush()
+
+    # Release the blob reference; only the last reference removes the file (after commit)
+    if content_hash:
+        await release_blob(db, content_hash)
+
     await db.commit()
 
+    # Delete file from disk after the database change is committed
+    if file_to_delete:
+        delete_file(file_to_delete)
+
     return {"message": "知识已删除"}
 
 
@@ -272,6 +524,7 @@ async def link_knowledge_to_module(
     )
 
     db.add(new_link)
+    query_cache.invalidate_on_commit(db, knowledge_tag(knowledge_item_id), module_tag(link_data.module_id))
     await db.commit()
     await db.refresh(new_link)
 
@@ -303,6 +556,7 @@ async def unlink_knowledge_from_module(
 
     # Delete link
     await db.delete(link)
+    query_cache.invalidate_on_commit(db, knowledge_tag(knowledge_item_id), module_tag(module_id))
     await db.commit()
 
     return {"message": "关联已解除"}
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.db.session import get_db
+from app.models import User
+from app.core.deps import get_current_user
+from app.schemas.leaderboard import LeaderboardEntry, LeaderboardPosition
+from app.services.leaderboard import leaderboard
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """信誉分排行榜（按名次分页）"""
+    await leaderboard.ensure_loaded(db)
+    return leaderboard.top(limit, offset)
+
+
+@router.get("/me", response_model=LeaderboardPosition)
+async def get_my_position(
+    radius: int = Query(5, ge=0, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """当前用户的名次及前后各 radius 名"""
+    return await _position(db, current_user.id, radius)
+
+
+@router.get("/users/{user_id}", response_model=LeaderboardPosition)
+async def get_user_position(
+    user_id: int,
+    radius: int = Query(5, ge=0, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """指定用户的名次及前后各 radius 名"""
+    position = await _position(db, user_id, radius)
+    if position.rank is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    return position
+
+
+async def _position(db: AsyncSession, user_id: int, radius: int) -> LeaderboardPosition:
+    await leaderboard.ensure_loaded(db)
+    return LeaderboardPosition(
+        rank=leaderboard.rank_of(user_id),
+        total=len(leaderboard),
+        neighbours=leaderboard.around(user_id, radius)
+    )
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from typing import List
-from datetime import datetime
+from typing import List, Optional
+from datetime import datetime, timezone
 from app.db.session import get_db
 from app.schemas import ModuleCreate, ModuleUpdate, ModuleResponse
 from app.models import Module, ModuleAssignee, User, Project, Delivery, Review
+from app.models.notification import NotificationType
 from app.core.deps import get_current_user, get_current_commander
+from app.core.pagination import keyset_paginate, build_page, estimate_total
+from app.core.conditional import weak_etag, not_modified
+from app.core.query_cache import query_cache, module_tag, project_tag
+from app.core.config import settings
+from app.services.notifications import notify_commanders
+from app.services.module_timeouts import scan_module_timeouts
+from app.services.deadline_timer import deadline_timer, to_utc
+from app.services.assignments import grab_module
+from app.services.dispatch import dispatch_queue, IMMEDIATE
+from app.services.recommendations import recommend_modules
 
 router = APIRouter()
 
@@ -16,28 +27,14 @@ async def check_timeouts(
     current_user: User = Depends(get_current_commander),
     db: AsyncSession = Depends(get_db)
 ):
-    """检查并更新所有超时模块（仅指挥官）"""
-    now = datetime.utcnow()
-
-    # 查找所有有截止日期且未完成的模块
-    result = await db.execute(
-        select(Module).where(
-            Module.deadline.isnot(None),
-            Module.status.in_(["open", "in_progress"]),
-            Module.is_timeout == False
-        )
+    """立即执行一次超时扫描（仅指挥官），与定时任务相同，会发送超时通知"""
+    run = await scan_module_timeouts(
+        db,
+        batch_size=settings.TIMEOUT_SCAN_BATCH_SIZE,
+        max_batches=settings.TIMEOUT_SCAN_MAX_BATCHES
     )
-    modules = result.scalars().all()
-
-    timeout_count = 0
-    for module in modules:
-        if module.deadline and module.deadline < now:
-            module.is_timeout = True
-            timeout_count += 1
 
-    await db.commit()
-
-    return {"message": f"检查完成，发现 {timeout_count} 个超时模块"}
+    return {"message": f"检查完成，发现 {run['marked']} 个超时模块", **run}
 
 
 @router.post("/", response_model=ModuleResponse, status_code=status.HTTP_201_CREATED)
@@ -54,130 +51,249 @@ async def create_module(
         creator_id=current_user.id,
         deadline=module_data.deadline,
         bounty=module_data.bounty,
+        dispatch_mode=module_data.dispatch_mode,
         status="open"
     )
 
     db.add(new_module)
+    query_cache.invalidate_on_commit(db, project_tag(new_module.project_id))
     await db.commit()
     await db.refresh(new_module)
+    deadline_timer.schedule_module(new_module.id, new_module.deadline)
 
     return await _get_module_response(new_module, db)
 
 
 @router.get("/", response_model=List[ModuleResponse])
 async def list_modules(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
     project_id: int = None,
+    with_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取模块列表"""
+    """获取模块列表（游标分页，下一页游标见 X-Next-Cursor 响应头）"""
     query = select(Module)
 
     if project_id:
         query = query.where(Module.project_id == project_id)
 
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    modules = result.scalars().all()
+    if with_total:
+        await estimate_total(db, query, response)
+
+    result = await db.execute(keyset_paginate(query, Module, cursor, limit))
+    modules = build_page(result.scalars().all(), limit, response)
 
-    responses = []
-    for module in modules:
-        response = await _get_module_response(module, db)
-        responses.append(response)
+    return await _get_module_responses(modules, db)
 
-    return responses
+
+@router.get("/recommended", response_model=List[ModuleResponse])
+async def recommended_modules(
+    limit: int = Query(20, ge=1, le=100),
+    user_id: Optional[int] = Query(None, description="指挥官可查看指定节点的推荐"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """为节点推荐可承接的模块（调度器），按匹配度降序"""
+    node = current_user
+    if user_id is not None and user_id != current_user.id:
+        if current_user.role.lower() != "commander":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="需要指挥官权限"
+            )
+        node = await db.get(User, user_id)
+        if node is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="用户不存在"
+            )
+
+    module_ids = await recommend_modules(db, node, limit)
+    if not module_ids:
+        return []
+
+    result = await db.execute(select(Module).where(Module.id.in_(module_ids)))
+    modules = {module.id: module for module in result.scalars().all()}
+    return await _get_module_responses([modules[i] for i in module_ids if i in modules], db)
 
 
 @router.get("/{module_id}", response_model=ModuleResponse)
 async def get_module(
     module_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取模块详情"""
-    result = await db.execute(select(Module).where(Module.id == module_id))
-    module = result.scalar_one_or_none()
-
-    if not module:
+    """获取模块详情（支持 If-None-Match，未变化时返回 304）"""
+    stamps = (await db.execute(_module_stamps_query(module_id))).first()
+    if stamps is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="模块不存在"
         )
-
-    return await _get_module_response(module, db)
+    cached = not_modified(request, response, weak_etag(tuple(stamps)))
+    if cached is not None:
+        return cached
+
+    async def load() -> Optional[dict]:
+        result = await db.execute(select(Module).where(Module.id == module_id))
+        module = result.scalar_one_or_none()
+        if not module:
+            return None
+        return (await _get_module_response(module, db)).model_dump(mode="json")
+
+    # 响应包含项目名称，同时带上项目标签
+    cached_response = await query_cache.get_or_load(
+        f"module_detail:{module_id}",
+        [module_tag(module_id), project_tag(stamps.project_id)],
+        load
+    )
+    if cached_response is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="模块不存在"
+        )
+    return ModuleResponse.model_validate(cached_response)
+
+
+def _module_stamps_query(module_id: int):
+    """模块详情的版本戳：模块和项目的 updated_at 及可编辑的列、承接/交付/验收记录的数量和最大 id
+
+    updated_at 由 func.now() 生成，在 SQLite 上只精确到秒，同一秒内的两次修改
+    靠可编辑的列（标题、描述、赏金、截止时间、派单方式、项目名称）区分；
+    交付和验收记录创建后不会修改，数量和最大 id 足以反映变化。
+    """
+    def latest(model, *conditions):
+        return select(func.max(model.id)).where(*conditions).scalar_subquery()
+
+    def count(model, *conditions):
+        return select(func.count(model.id)).where(*conditions).scalar_subquery()
+
+    delivery_ids = select(Delivery.id).where(Delivery.module_id == Module.id)
+    return (
+        select(
+            Module.project_id,
+            Module.created_at,
+            Module.updated_at,
+            Module.status,
+            Module.is_timeout,
+            Module.assignee_count,
+            Module.title,
+            Module.description,
+            Module.bounty,
+            Module.deadline,
+            Module.dispatch_mode,
+            Project.updated_at,
+            Project.name,
+            latest(ModuleAssignee, ModuleAssignee.module_id == Module.id),
+            latest(Delivery, Delivery.module_id == Module.id),
+            count(Delivery, Delivery.module_id == Module.id),
+            latest(Review, Review.delivery_id.in_(delivery_ids)),
+            count(Review, Review.delivery_id.in_(delivery_ids)),
+        )
+        .outerjoin(Project, Project.id == Module.project_id)
+        .where(Module.id == module_id)
+    )
 
 
 async def _get_module_response(module: Module, db: AsyncSession) -> ModuleResponse:
     """构建完整的模块响应"""
-    # Get project name
-    project_result = await db.execute(select(Project).where(Project.id == module.project_id))
-    project = project_result.scalar_one_or_none()
+    responses = await _get_module_responses([module], db)
+    return responses[0]
+
+
+async def _get_module_responses(modules: List[Module], db: AsyncSession) -> List[ModuleResponse]:
+    """批量构建模块响应
+
+    整页模块共用固定数量的 IN (...) 查询加载项目、创建者、承接人和交付，
+    查询次数不随模块数量增长。
+    """
+    if not modules:
+        return []
 
-    # Get creator name
-    creator_result = await db.execute(select(User).where(User.id == module.creator_id))
-    creator = creator_result.scalar_one_or_none()
+    from app.schemas.module import ModuleAssigneeInfo, DeliveryInfo
+
+    module_ids = [module.id for module in modules]
+    project_ids = {module.project_id for module in modules}
+    creator_ids = {module.creator_id for module in modules}
+
+    # Get project names
+    projects_result = await db.execute(
+        select(Project.id, Project.name).where(Project.id.in_(project_ids))
+    )
+    project_names = {pid: name for pid, name in projects_result.all()}
+
+    # Get creator names
+    creators_result = await db.execute(
+        select(User.id, User.username).where(User.id.in_(creator_ids))
+    )
+    creator_names = {uid: username for uid, username in creators_result.all()}
 
     # Get assignees
     assignees_result = await db.execute(
         select(ModuleAssignee, User)
         .join(User, ModuleAssignee.user_id == User.id)
-        .where(ModuleAssignee.module_id == module.id)
+        .where(ModuleAssignee.module_id.in_(module_ids))
+        .order_by(ModuleAssignee.id)
     )
-    assignees_data = assignees_result.all()
+    assignees_by_module = {module_id: [] for module_id in module_ids}
+    for assignee, user in assignees_result.all():
+        assignees_by_module[assignee.module_id].append(
+            ModuleAssigneeInfo(
+                id=assignee.id,
+                user_id=assignee.user_id,
+                username=user.username,
+                role=user.role,
+                score_share=assignee.score_share
+            )
+        )
 
     # Get deliveries with reviews
     deliveries_result = await db.execute(
         select(Delivery, Review, User)
         .outerjoin(Review, Delivery.id == Review.delivery_id)
         .join(User, Delivery.assignee_id == User.id)
-        .where(Delivery.module_id == module.id)
+        .where(Delivery.module_id.in_(module_ids))
+        .order_by(Delivery.id)
     )
-    deliveries_data = deliveries_result.all()
-
-    from app.schemas.module import ModuleAssigneeInfo, DeliveryInfo
-
-    assignees = [
-        ModuleAssigneeInfo(
-            id=assignee.id,
-            user_id=assignee.user_id,
-            username=user.username,
-            role=user.role,
-            score_share=assignee.score_share
+    deliveries_by_module = {module_id: [] for module_id in module_ids}
+    for delivery, review, user in deliveries_result.all():
+        deliveries_by_module[delivery.module_id].append(
+            DeliveryInfo(
+                id=delivery.id,
+                content=delivery.content,
+                submitter_name=user.username,
+                review_decision=review.decision if review else None,
+                created_at=delivery.submitted_at
+            )
         )
-        for assignee, user in assignees_data
-    ]
 
-    deliveries = [
-        DeliveryInfo(
-            id=delivery.id,
-            content=delivery.content,
-            submitter_name=user.username,
-            review_decision=review.decision if review else None,
-            created_at=delivery.submitted_at
+    return [
+        ModuleResponse(
+            id=module.id,
+            project_id=module.project_id,
+            project_name=project_names.get(module.project_id),
+            creator_id=module.creator_id,
+            creator_name=creator_names.get(module.creator_id),
+            status=module.status,
+            is_timeout=module.is_timeout,
+            created_at=module.created_at,
+            updated_at=module.updated_at,
+            title=module.title,
+            description=module.description,
+            deadline=module.deadline,
+            bounty=module.bounty,
+            dispatch_mode=module.dispatch_mode,
+            assignees=assignees_by_module[module.id],
+            deliveries=deliveries_by_module[module.id]
         )
-        for delivery, review, user in deliveries_data
+        for module in modules
     ]
 
-    return ModuleResponse(
-        id=module.id,
-        project_id=module.project_id,
-        project_name=project.name if project else None,
-        creator_id=module.creator_id,
-        creator_name=creator.username if creator else None,
-        status=module.status,
-        is_timeout=module.is_timeout,
-        created_at=module.created_at,
-        updated_at=module.updated_at,
-        title=module.title,
-        description=module.description,
-        deadline=module.deadline,
-        bounty=module.bounty,
-        assignees=assignees,
-        deliveries=deliveries
-    )
-
 
 @router.post("/{module_id}/assign", status_code=status.HTTP_201_CREATED)
 async def assign_module(
@@ -185,84 +301,32 @@ async def assign_module(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """承接模块（抢单）"""
-    # 检查模块是否存在
-    result = await db.execute(select(Module).where(Module.id == module_id))
-    module = result.scalar_one_or_none()
-
-    if not module:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="模块不存在"
-        )
-
-    if module.status != "open":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="模块不可承接"
-        )
+    """承接模块（抢单）
 
-    # 检查用户并发任务限制（最多3个）
-    if current_user.concurrent_task_count >= 3:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="已达到最大并发任务数（3个）"
-        )
-
-    # 检查是否已承接该模块
-    existing_assign = await db.execute(
-        select(ModuleAssignee).where(
-            ModuleAssignee.module_id == module_id,
-            ModuleAssignee.user_id == current_user.id
-        )
-    )
-    if existing_assign.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="已承接该模块"
-        )
-
-    # 检查模块人数限制（最多5人）
-    assignee_count = await db.execute(
-        select(func.count(ModuleAssignee.id)).where(ModuleAssignee.module_id == module_id)
-    )
-    if assignee_count.scalar() >= 5:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="模块承接人数已满（最多5人）"
-        )
-
-    # 创建承接记录
-    new_assign = ModuleAssignee(
-        module_id=module_id,
-        user_id=current_user.id
-    )
+    用户任务槽位和模块名额都由条件 UPDATE 原子占用，高并发下也不会超过上限
+    （见 app.services.assignments）。dispatch_mode 不为 immediate 的模块进入批量派单窗口，
+    窗口结束后按策略统一结算（见 app.services.dispatch）。
+    """
+    dispatch_mode = dispatch_queue.active_policy(module_id)
+    if dispatch_mode is None:
+        dispatch_mode = await db.scalar(select(Module.dispatch_mode).where(Module.id == module_id))
+    if dispatch_mode is not None and dispatch_mode != IMMEDIATE:
+        await dispatch_queue.submit(module_id, dispatch_mode, current_user)
+        return {"message": "承接成功"}
 
-    # 更新用户任务计数
-    current_user.concurrent_task_count += 1
+    module_title = await grab_module(db, module_id, current_user.id)
 
     # 注意：不在承接时改变模块状态，允许多人承接（最多5人）
     # 模块状态由指挥官手动控制或通过验收流程改变
 
-    db.add(new_assign)
-
-    # 发送通知给指挥官
-    from app.models.notification import Notification, NotificationType
-    # 查找所有指挥官
-    commanders_result = await db.execute(
-        select(User).where(func.lower(User.role) == "commander")
+    # 发送通知给指挥官（一条多行 INSERT）
+    await notify_commanders(
+        db,
+        type=NotificationType.MODULE_ASSIGNED,
+        title="任务已被承接",
+        content=f"节点「{current_user.username}」已承接任务「{module_title}」",
+        related_module_id=module_id
     )
-    commanders = commanders_result.scalars().all()
-
-    for commander in commanders:
-        notification = Notification(
-            recipient_id=commander.id,
-            type=NotificationType.MODULE_ASSIGNED,
-            title=f"任务已被承接",
-            content=f"节点「{current_user.username}」已承接任务「{module.title}」",
-            related_module_id=module_id
-        )
-        db.add(notification)
 
     await db.commit()
 
@@ -291,14 +355,27 @@ async def update_module(
         module.title = module_data.title
     if module_data.description is not None:
         module.description = module_data.description
-    if module_data.deadline is not None:
+    deadline_changed = (
+        module_data.deadline is not None
+        and (module.deadline is None or to_utc(module_data.deadline) != to_utc(module.deadline))
+    )
+    if deadline_changed:
         module.deadline = module_data.deadline
+        # 新的截止时间重新计时：重新发送提醒，延期到未来的模块不再算超时
+        module.last_reminder_minutes = None
+        if module.is_timeout and to_utc(module_data.deadline) > datetime.now(timezone.utc):
+            module.is_timeout = False
     if module_data.bounty is not None:
         module.bounty = module_data.bounty
     if module_data.status is not None:
         module.status = module_data.status
+    if module_data.dispatch_mode is not None:
+        module.dispatch_mode = module_data.dispatch_mode
 
+    query_cache.invalidate_on_commit(db, module_tag(module.id), project_tag(module.project_id))
     await db.commit()
     await db.refresh(module)
+    if deadline_changed:
+        deadline_timer.schedule_module(module.id, module.deadline)
 
     return await _get_module_response(module, db)
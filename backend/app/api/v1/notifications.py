@@ -1,63 +1,124 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List
-from app.db.session import get_db
-from app.models import Notification, User
-from app.core.deps import get_current_user
+from sqlalchemy import select, update
+from typing import AsyncIterator, List, Optional, Tuple
+from app.core.config import settings
+from app.db.session import get_db, AsyncSessionLocal
+from app.models import Notification, NotificationArchive, User
+from app.core.deps import get_current_user, authenticate_token
+from app.core.pagination import keyset_paginate, build_page, estimate_total
+from app.services.notification_bus import notification_bus, Subscription
+from app.schemas.notification import NotificationBulkFilter, NotificationBulkDelete, NotificationBulkResult
+from app.services.notifications import (
+    notification_payload, adjust_unread_counts, get_unread_count as read_unread_count,
+    notification_filter, mark_read, delete_notifications, archive_notifications
+)
 
 router = APIRouter()
 
+optional_security = HTTPBearer(auto_error=False)
+
 
 @router.get("/")
 async def get_notifications(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 50,
     unread_only: bool = False,
+    with_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取当前用户的通知列表"""
+    """获取当前用户的通知列表（游标分页，下一页游标见 X-Next-Cursor 响应头）"""
     query = select(Notification).where(Notification.recipient_id == current_user.id)
 
     if unread_only:
         query = query.where(Notification.is_read == False)
 
-    query = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
-    result = await db.execute(query)
-    notifications = result.scalars().all()
+    if with_total:
+        await estimate_total(db, query, response)
+
+    result = await db.execute(keyset_paginate(query, Notification, cursor, limit))
+    notifications = build_page(result.scalars().all(), limit, response)
 
     # 转换为响应格式
+    return [notification_payload(n) for n in notifications]
+
+
+@router.get("/unread-count")
+async def get_unread_count(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取未读通知数量（读取物化计数）"""
+    return {"unread_count": await read_unread_count(db, current_user.id)}
+
+
+@router.get("/archived")
+async def get_archived_notifications(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取当前用户已归档的通知（游标分页）"""
+    query = select(NotificationArchive).where(NotificationArchive.recipient_id == current_user.id)
+    result = await db.execute(keyset_paginate(query, NotificationArchive, cursor, limit))
+    notifications = build_page(result.scalars().all(), limit, response)
     return [
-        {
-            "id": n.id,
-            "type": n.type,
-            "title": n.title,
-            "content": n.content,
-            "is_read": n.is_read,
-            "related_module_id": n.related_module_id,
-            "created_at": n.created_at,
-        }
+        {**notification_payload(n), "id": n.notification_id, "archived_at": n.archived_at}
         for n in notifications
     ]
 
 
-@router.get("/unread-count")
-async def get_unread_count(
+@router.post("/bulk/read", response_model=NotificationBulkResult)
+async def bulk_mark_as_read(
+    data: NotificationBulkFilter,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取未读通知数量"""
-    result = await db.execute(
-        select(func.count(Notification.id))
-        .where(
-            Notification.recipient_id == current_user.id,
-            Notification.is_read == False
-        )
+    """按 ID 列表、类型或时间批量标记已读"""
+    count = await mark_read(
+        db, current_user.id, notification_filter(current_user.id, data.ids, data.type, data.before)
     )
-    count = result.scalar()
+    await db.commit()
+    return NotificationBulkResult(message=f"已标记 {count} 条通知为已读", count=count)
+
 
-    return {"unread_count": count}
+@router.post("/bulk/delete", response_model=NotificationBulkResult)
+async def bulk_delete(
+    data: NotificationBulkDelete,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按 ID 列表、类型或时间批量删除通知（默认只删除已读通知）"""
+    conditions = notification_filter(current_user.id, data.ids, data.type, data.before)
+    if data.read_only:
+        conditions.append(Notification.is_read == True)
+    count = await delete_notifications(db, conditions)
+    await db.commit()
+    return NotificationBulkResult(message=f"已删除 {count} 条通知", count=count)
+
+
+@router.post("/bulk/archive", response_model=NotificationBulkResult)
+async def bulk_archive(
+    data: NotificationBulkDelete,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按 ID 列表、类型或时间批量归档通知（默认只归档已读通知）"""
+    conditions = notification_filter(current_user.id, data.ids, data.type, data.before)
+    if data.read_only:
+        conditions.append(Notification.is_read == True)
+    count = await archive_notifications(db, conditions)
+    await db.commit()
+    return NotificationBulkResult(message=f"已归档 {count} 条通知", count=count)
 
 
 @router.post("/{notification_id}/read")
@@ -67,21 +128,32 @@ async def mark_as_read(
     db: AsyncSession = Depends(get_db)
 ):
     """标记通知为已读"""
+    # 条件更新：并发重复标记时只有一次会减少未读计数
     result = await db.execute(
-        select(Notification).where(
+        update(Notification)
+        .where(
             Notification.id == notification_id,
-            Notification.recipient_id == current_user.id
+            Notification.recipient_id == current_user.id,
+            Notification.is_read == False
         )
+        .values(is_read=True)
     )
-    notification = result.scalar_one_or_none()
 
-    if not notification:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="通知不存在"
+    if result.rowcount == 0:
+        exists = await db.scalar(
+            select(Notification.id).where(
+                Notification.id == notification_id,
+                Notification.recipient_id == current_user.id
+            )
         )
+        if exists is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="通知不存在"
+            )
+    else:
+        await adjust_unread_counts(db, {current_user.id: -1})
 
-    notification.is_read = True
     await db.commit()
 
     return {"message": "已标记为已读"}
@@ -92,18 +164,150 @@ async def mark_all_as_read(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """标记所有通知为已读"""
-    result = await db.execute(
-        select(Notification).where(
-            Notification.recipient_id == current_user.id,
-            Notification.is_read == False
+    """标记所有通知为已读（单条 UPDATE）"""
+    count = await mark_read(db, current_user.id, notification_filter(current_user.id))
+    await db.commit()
+
+    return {"message": f"已标记 {count} 条通知为已读"}
+
+
+# ---------------------------------------------------------------------------
+# 实时推送（SSE / WebSocket）
+# ---------------------------------------------------------------------------
+
+async def _open_stream(token: str, last_event_id: Optional[int]) -> Tuple[Subscription, list]:
+    """认证并订阅，返回订阅和连接建立时要发送的事件
+
+    先订阅再补发，避免补发期间产生的通知丢失。推送连接是长连接，
+    不持有请求级数据库会话。
+    """
+    async with AsyncSessionLocal() as db:
+        user = await authenticate_token(db, token)
+        subscription = notification_bus.subscribe(user.id, settings.NOTIFICATION_STREAM_BUFFER_SIZE)
+        try:
+            initial = []
+            if last_event_id is not None:
+                # 断线续传：补发 Last-Event-ID 之后的通知
+                result = await db.execute(
+                    select(Notification)
+                    .where(Notification.recipient_id == user.id, Notification.id > last_event_id)
+                    .order_by(Notification.id)
+                    .limit(settings.NOTIFICATION_STREAM_REPLAY_LIMIT + 1)
+                )
+                missed = result.scalars().all()
+                if len(missed) > settings.NOTIFICATION_STREAM_REPLAY_LIMIT:
+                    # 缺失太多，让客户端重新拉取列表
+                    initial.append({"event": "resync", "id": None, "data": {}})
+                else:
+                    initial += [
+                        {"event": "notification", "id": n.id, "data": notification_payload(n)}
+                        for n in missed
+                    ]
+
+            unread_count = await read_unread_count(db, user.id)
+            initial.append({"event": "unread", "id": None, "data": {"unread_count": unread_count}})
+        except BaseException:
+            notification_bus.unsubscribe(subscription)
+            raise
+
+    return subscription, initial
+
+
+async def _iter_events(subscription: Subscription, initial: list) -> AsyncIterator[Optional[dict]]:
+    """依次产出初始事件和总线事件，空闲时产出 None 作为心跳；队列溢出时产出 resync 并结束"""
+    last_id = max((e["id"] for e in initial if e["id"] is not None), default=0)
+    for event in initial:
+        yield event
+
+    while True:
+        if subscription.overflowed:
+            # 重连后通过 Last-Event-ID 从数据库补齐
+            yield {"event": "resync", "id": None, "data": {}}
+            return
+        try:
+            event = await asyncio.wait_for(
+                subscription.queue.get(), timeout=settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        if event["id"] is not None and event["id"] <= last_id:
+            # 补发过的通知
+            continue
+        yield event
+
+
+def _format_sse(event: Optional[dict]) -> str:
+    if event is None:
+        return ": ping\n\n"
+    lines = []
+    if event["id"] is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append("data: " + json.dumps(jsonable_encoder(event["data"]), ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def stream_notifications(
+    access_token: Optional[str] = Query(None, description="EventSource 无法设置请求头时通过参数传递 token"),
+    last_event_id: Optional[int] = Header(None, description="断线重连时浏览器自动携带"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """
+    通知推送（Server-Sent Events）
+
+    事件：notification（新通知）、unread（未读数快照 unread_count 或变化量 delta）、
+    resync（客户端应重新拉取通知列表）；空闲时发送注释行心跳
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭证",
+            headers={"WWW-Authenticate": "Bearer"},
         )
+
+    subscription, initial = await _open_stream(token, last_event_id)
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n"
+            async for event in _iter_events(subscription, initial):
+                yield _format_sse(event)
+        finally:
+            notification_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    notifications = result.scalars().all()
 
-    for notification in notifications:
-        notification.is_read = True
 
-    await db.commit()
+@router.websocket("/ws")
+async def notifications_websocket(
+    websocket: WebSocket,
+    token: str = Query(..., description="access token"),
+    last_event_id: Optional[int] = Query(None, description="断线重连时最后收到的通知 id")
+):
+    """通知推送（WebSocket），消息格式为 {"event", "id", "data"}，事件同 /stream，心跳为 {"event": "ping"}"""
+    try:
+        subscription, initial = await _open_stream(token, last_event_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
 
-    return {"message": f"已标记 {len(notifications)} 条通知为已读"}
+    try:
+        await websocket.accept()
+        async for event in _iter_events(subscription, initial):
+            if event is None:
+                event = {"event": "ping", "id": None, "data": {}}
+            await websocket.send_text(json.dumps(jsonable_encoder(event), ensure_ascii=False))
+            if event["event"] == "resync" and subscription.overflowed:
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notification_bus.unsubscribe(subscription)
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
 from app.db.session import get_db
 from app.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
+from app.schemas.project import ProjectStats, ProjectWithStats
 from app.models import Project, User
 from app.core.deps import get_current_user, get_current_commander
+from app.core.pagination import keyset_paginate, build_page, estimate_total
+from app.core.conditional import weak_etag, not_modified
+from app.core.query_cache import query_cache, project_tag
+from app.services.project_stats import get_project_stats
 
 router = APIRouter()
 
@@ -31,17 +36,60 @@ async def create_project(
     return ProjectResponse.model_validate(new_project)
 
 
-@router.get("/", response_model=List[ProjectResponse])
+@router.get("/", response_model=List[ProjectWithStats])
 async def list_projects(
-    skip: int = 0,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 100,
+    with_total: bool = False,
+    with_stats: bool = False,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """获取项目列表"""
-    result = await db.execute(select(Project).offset(skip).limit(limit))
-    projects = result.scalars().all()
-    return [ProjectResponse.model_validate(p) for p in projects]
+    """获取项目列表（游标分页，下一页游标见 X-Next-Cursor 响应头；with_stats 时附带每个项目的统计）
+
+    支持 If-None-Match：当前页未变化时返回 304。
+    """
+    if with_total:
+        await estimate_total(db, select(Project), response)
+
+    # 先只取当前页的版本戳；updated_at 在 SQLite 上只精确到秒，同一秒内的两次修改
+    # 靠可编辑的列区分
+    stamps_query = select(
+        Project.id, Project.created_at, Project.updated_at, Project.status,
+        Project.name, Project.description
+    )
+    result = await db.execute(keyset_paginate(stamps_query, Project, cursor, limit))
+    stamps = build_page(result.all(), limit, response)
+    project_ids = [row.id for row in stamps]
+
+    stats = {}
+    if with_stats and project_ids:
+        # 整页一条统计查询（有缓存）
+        stats = await get_project_stats(db, project_ids)
+
+    etag = weak_etag(
+        [tuple(row) for row in stamps],
+        [sorted(stats[project_id].items()) for project_id in project_ids] if stats else None,
+        response.headers.get("X-Total-Count"),
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(Project).where(Project.id.in_(project_ids)))
+    projects = {project.id: project for project in result.scalars().all()}
+
+    items = []
+    for project_id in project_ids:
+        if project_id not in projects:
+            continue
+        item = ProjectWithStats.model_validate(projects[project_id])
+        if project_id in stats:
+            item.stats = ProjectStats(**stats[project_id])
+        items.append(item)
+    return items
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -63,6 +111,24 @@ async def get_project(
     return ProjectResponse.model_validate(project)
 
 
+@router.get("/{project_id}/stats", response_model=ProjectStats)
+async def get_project_stats_detail(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取项目统计：各状态模块数、超时数、赏金、承接和交付数"""
+    exists = await db.scalar(select(Project.id).where(Project.id == project_id))
+    if exists is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="项目不存在"
+        )
+
+    stats = await get_project_stats(db, [project_id])
+    return ProjectStats(**stats[project_id])
+
+
 @router.put("/{project_id}", response_model=ProjectResponse)
 async def update_project(
     project_id: int,
@@ -88,6 +154,7 @@ async def update_project(
     if project_data.status is not None:
         project.status = project_data.status
 
+    query_cache.invalidate_on_commit(db, project_tag(project.id))
     await db.commit()
     await db.refresh(project)
 
@@ -111,6 +178,7 @@ async def delete_project(
         )
 
     await db.delete(project)
+    query_cache.invalidate_on_commit(db, project_tag(project.id))
     await db.commit()
 
     return None
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db
+from app.models import User
+from app.core.deps import get_current_user
+from app.schemas.reputation import ReputationGranularity, ReputationSeries
+from app.services.reputation_rollups import bucket_start, reputation_series
+
+router = APIRouter()
+
+# 未指定起始日期时默认展示的桶数
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 12}
+# 单次请求最多返回的桶数
+MAX_BUCKETS = 400
+
+
+@router.get("/me/series", response_model=ReputationSeries)
+async def get_my_series(
+    granularity: ReputationGranularity = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """当前用户的信誉曲线"""
+    # current_user 可能来自进程内缓存，当前信誉分需从数据库读取
+    return await _series(db, await _load_user(db, current_user.id), granularity, start, end)
+
+
+@router.get("/users/{user_id}/series", response_model=ReputationSeries)
+async def get_user_series(
+    user_id: int,
+    granularity: ReputationGranularity = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """指定用户的信誉曲线"""
+    return await _series(db, await _load_user(db, user_id), granularity, start, end)
+
+
+async def _load_user(db: AsyncSession, user_id: int) -> User:
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    return user
+
+
+async def _series(
+    db: AsyncSession,
+    user: User,
+    granularity: str,
+    start: Optional[date],
+    end: Optional[date]
+) -> ReputationSeries:
+    end = end or datetime.now(timezone.utc).date()
+    if start is None:
+        start = end
+        for _ in range(DEFAULT_BUCKETS[granularity] - 1):
+            start = bucket_start(start - timedelta(days=1), granularity)
+
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="起始日期不能晚于结束日期"
+        )
+    span_days = (end - start).days
+    if {"day": span_days, "week": span_days // 7, "month": span_days // 28}[granularity] >= MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"时间范围过大（最多{MAX_BUCKETS}个时间段）"
+        )
+
+    points = await reputation_series(db, user, granularity, start, end)
+    return ReputationSeries(
+        user_id=user.id,
+        granularity=granularity,
+        start=start,
+        end=end,
+        current_score=user.reputation_score,
+        points=points
+    )
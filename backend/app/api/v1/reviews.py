@@ -7,6 +7,9 @@ from app.db.session import get_db
 from app.schemas import ReviewCreate, ReviewResponse
 from app.models import Review, Delivery, Module, ModuleAssignee, User, ReputationHistory
 from app.core.deps import get_current_commander
+from app.core.query_cache import query_cache, module_tag, project_tag
+from app.services.assignments import release_task_slots
+from app.services.reputation_rollups import record_reputation_history
 
 router = APIRouter()
 
@@ -91,22 +94,22 @@ async def create_review(
             module.status = "completed"
 
         # 释放承接人的任务槽位
+        await release_task_slots(db, [assignee.user_id])
+
         # 需要重新查询user对象以避免lazy loading问题
         user_result = await db.execute(select(User).where(User.id == assignee.user_id))
         assignee_user = user_result.scalar_one_or_none()
         if assignee_user:
-            assignee_user.concurrent_task_count = max(0, assignee_user.concurrent_task_count - 1)
             # 更新信誉分
             assignee_user.reputation_score += review_data.reputation_change
 
             # 记录信誉变化历史
-            reputation_history = ReputationHistory(
+            await record_reputation_history(db, [ReputationHistory(
                 user_id=assignee.user_id,
                 score_change=review_data.reputation_change,
                 reason=f"完成模块: {module.title}",
                 related_module_id=module.id
-            )
-            db.add(reputation_history)
+            )])
 
     elif review_data.decision == "reject":
         delivery.status = "rejected"
@@ -115,10 +118,10 @@ async def create_review(
     elif review_data.decision == "close":
         delivery.status = "closed"
         # 关闭任务，释放槽位，但不改变信誉分
-        if assignee.user:
-            assignee.user.concurrent_task_count = max(0, assignee.user.concurrent_task_count - 1)
+        await release_task_slots(db, [assignee.user_id])
 
     db.add(new_review)
+    query_cache.invalidate_on_commit(db, module_tag(module.id), project_tag(module.project_id))
     await db.commit()
     await db.refresh(new_review)
 
@@ -182,7 +185,12 @@ async def create_review_with_scores(
         delivery.status = "accepted"
 
         # 分配分数给各承接人
+        # 一次查出承接人对应的用户，避免逐个懒加载
+        users_result = await db.execute(select(User).where(User.id.in_([a.user_id for a in assignees])))
+        users = {user.id: user for user in users_result.scalars().all()}
+
         total_allocated = 0
+        histories = []
         for allocation in review_data.score_allocations:
             assignee = next((a for a in assignees if a.id == allocation.assignee_id), None)
             if assignee:
@@ -190,26 +198,25 @@ async def create_review_with_scores(
                 total_allocated += allocation.score
 
                 # 更新用户信誉分
-                if assignee.user:
-                    assignee.user.reputation_score += allocation.score
+                assignee_user = users.get(assignee.user_id)
+                if assignee_user:
+                    assignee_user.reputation_score += allocation.score
 
                     # 记录信誉变化历史
-                    reputation_history = ReputationHistory(
+                    histories.append(ReputationHistory(
                         user_id=assignee.user_id,
-                        change=allocation.score,
+                        score_change=allocation.score,
                         reason=f"完成模块: {module.title}",
-                        reviewer_id=current_user.id
-                    )
-                    db.add(reputation_history)
+                        related_module_id=module.id
+                    ))
+        await record_reputation_history(db, histories)
 
         # 更新模块状态
         if module.status != "completed":
             module.status = "completed"
 
         # 释放所有承接人的任务槽位
-        for assignee in assignees:
-            if assignee.user:
-                assignee.user.concurrent_task_count = max(0, assignee.user.concurrent_task_count - 1)
+        await release_task_slots(db, [a.user_id for a in assignees])
 
     elif review_data.decision == "reject":
         delivery.status = "rejected"
@@ -218,11 +225,10 @@ async def create_review_with_scores(
     elif review_data.decision == "close":
         delivery.status = "closed"
         # 释放所有承接人的任务槽位
-        for assignee in assignees:
-            if assignee.user:
-                assignee.user.concurrent_task_count = max(0, assignee.user.concurrent_task_count - 1)
+        await release_task_slots(db, [a.user_id for a in assignees])
 
     db.add(new_review)
+    query_cache.invalidate_on_commit(db, module_tag(module.id), project_tag(module.project_id))
     await db.commit()
 
     return {"message": "验收成功", "total_allocated": total_allocated if review_data.decision == "pass" else 0}
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends
+from app.models import User
+from app.core.deps import get_current_commander
+from app.core.security import password_hasher
+from app.core.principal_cache import principal_cache
+from app.core.query_cache import query_cache
+from app.core.leader import leader_elector
+from app.tasks import scheduler
+from app.services.notifications import commander_cache, reconcile_metrics, retention_metrics
+from app.services.notification_bus import notification_bus
+from app.services.module_timeouts import timeout_scan_metrics
+from app.services.deadline_timer import deadline_timer
+from app.services.dispatch import dispatch_queue
+from app.services.recommendations import module_features
+from app.services.leaderboard import leaderboard
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics(current_user: User = Depends(get_current_commander)):
+    """获取运行指标（仅指挥官）"""
+    return {
+        "password_hashing": password_hasher.metrics(),
+        "principal_cache": principal_cache.metrics(),
+        "commander_cache": commander_cache.metrics(),
+        "notification_bus": notification_bus.metrics(),
+        "unread_counter_reconcile": reconcile_metrics,
+        "notification_retention": retention_metrics,
+        "timeout_scanner": timeout_scan_metrics,
+        "deadline_timer": deadline_timer.metrics(),
+        "dispatch": dispatch_queue.metrics(),
+        "recommendations": module_features.metrics(),
+        "leaderboard": leaderboard.metrics(),
+        "query_cache": query_cache.metrics(),
+    }
+
+
+@router.get("/scheduler")
+async def get_scheduler_status(current_user: User = Depends(get_current_commander)):
+    """获取定时任务调度状态：当前进程、当前 leader 和任务的下次执行时间（仅指挥官）"""
+    return {
+        "election": await leader_elector.status(),
+        "jobs": [
+            {"id": job.id, "next_run_time": job.next_run_time}
+            for job in scheduler.get_jobs()
+        ],
+    }
@@ -0,0 +1,43 @@
+"""
+条件请求（ETag / If-None-Match）
+
+读多写少的接口先用一条轻量查询取出决定响应内容的版本戳（updated_at、计数、最大 id 等），
+由版本戳计算弱 ETag；与请求头 If-None-Match 匹配时直接返回 304，不加载 ORM 对象、
+不构建响应体。
+
+响应带 Cache-Control: private, no-cache，浏览器每次都会带上 If-None-Match 重新验证。
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*stamps) -> str:
+    """由版本戳计算弱 ETag（版本戳需可稳定转为字符串）"""
+    digest = hashlib.blake2b(repr(stamps).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match 使用弱比较：忽略 W/ 前缀
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """设置 ETag 响应头；客户端缓存仍有效时返回 304 响应，否则返回 None
+
+    304 响应会带上 response 上已设置的响应头（如 X-Next-Cursor）。
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    return None
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -11,6 +11,80 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
 
+    # Password hashing (bcrypt runs in a bounded thread pool off the event loop)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32  # 超过 workers + queue 的请求直接返回 503
+
+    # Authenticated-principal cache (per process)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+
+    # Shared Redis for multi-worker deployments. When set, notification push events
+    # are relayed between processes; without it SSE / WebSocket push only reaches
+    # connections on the writing process, so run a single worker.
+    REDIS_URL: Optional[str] = None
+
+    # Query result cache with tag invalidation (module detail, project stats,
+    # knowledge link counts, commander ids). Unset means "memory"; setting REDIS_URL
+    # does not switch it, choose "redis" explicitly. The memory backend invalidates
+    # only within its own process: with several workers the others serve stale
+    # entries for up to QUERY_CACHE_TTL_SECONDS, so use it with a single worker only.
+    QUERY_CACHE_BACKEND: Optional[Literal["memory", "redis", "none"]] = None
+    QUERY_CACHE_REDIS_URL: Optional[str] = None  # defaults to REDIS_URL
+    QUERY_CACHE_TTL_SECONDS: int = 300
+    QUERY_CACHE_MAX_SIZE: int = 10000
+
+    # Commander id set used for notification fan-out
+    COMMANDER_CACHE_TTL_SECONDS: int = 60
+
+    # Notification push (SSE / WebSocket)
+    NOTIFICATION_STREAM_HEARTBEAT_SECONDS: int = 15
+    NOTIFICATION_STREAM_BUFFER_SIZE: int = 100
+    NOTIFICATION_STREAM_REPLAY_LIMIT: int = 200
+    NOTIFICATION_STREAM_RETRY_MS: int = 3000
+
+    # Scheduler leader election (advisory lock on PostgreSQL, file lock on SQLite)
+    SCHEDULER_LEADER_ELECTION: bool = True
+    SCHEDULER_ELECTION_INTERVAL_SECONDS: int = 5
+    SCHEDULER_LOCK_FILE: Optional[str] = None
+
+    # Module timeout scanner
+    TIMEOUT_SCAN_INTERVAL_SECONDS: int = 3600
+    TIMEOUT_SCAN_BATCH_SIZE: int = 500
+    TIMEOUT_SCAN_MAX_BATCHES: int = 100
+
+    # Batched dispatch window for modules whose dispatch_mode is not "immediate"
+    DISPATCH_WINDOW_MS: int = 500
+    DISPATCH_FULL_CACHE_SECONDS: int = 5
+
+    # Reputation leaderboard: full rebuild interval of the in-memory ranking
+    LEADERBOARD_REBUILD_MINUTES: int = 10
+
+    # Module recommendations: full rebuild interval of the in-memory feature matrix
+    RECOMMENDATION_REBUILD_SECONDS: int = 300
+
+    # In-memory deadline timer (fires timeouts at the deadline and sends reminders
+    # the given number of minutes before it; the periodic scan remains as a safety net)
+    DEADLINE_TIMER_ENABLED: bool = True
+    DEADLINE_REMINDER_MINUTES: List[int] = [1440, 60]
+    DEADLINE_TIMER_REFRESH_SECONDS: int = 60
+    DEADLINE_TIMER_HORIZON_MINUTES: int = 120
+
+    # Interval of the unread counter reconciliation job
+    UNREAD_COUNTER_RECONCILE_MINUTES: int = 15
+
+    # Retention of read notifications (0 days disables pruning; mode is delete or archive)
+    NOTIFICATION_RETENTION_DAYS: int = 90
+    NOTIFICATION_RETENTION_MODE: Literal["delete", "archive"] = "delete"
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 1000
+    NOTIFICATION_RETENTION_MAX_BATCHES: int = 100
+    NOTIFICATION_RETENTION_INTERVAL_HOURS: int = 24
+
+    # Knowledge text extraction (runs in a process pool)
+    TEXT_EXTRACTION_WORKERS: int = 2
+    TEXT_EXTRACTION_MAX_CHARS: int = 200000
+
     # Upload
     UPLOAD_DIR: str = "/app/uploads"
     MAX_FILE_SIZE: int = 31457280  # 30MB in bytes
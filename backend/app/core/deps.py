@@ -5,22 +5,19 @@ from sqlalchemy import select
 from app.db.session import get_db
 from app.models import User
 from app.core.security import decode_access_token
+from app.core.principal_cache import principal_cache
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """获取当前登录用户"""
+async def authenticate_token(db: AsyncSession, token: str) -> User:
+    """根据 access token 加载用户，无效时抛出 401"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭证",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = credentials.credentials
     payload = decode_access_token(token)
 
     if payload is None:
@@ -30,15 +27,30 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
 
+    # 优先从进程内缓存加载（游离快照，不进入会话），未命中再查询数据库
+    user = principal_cache.load(user_id)
+    if user is not None:
+        return user
+
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
 
     if user is None:
         raise credentials_exception
 
+    principal_cache.put(user)
+
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """获取当前登录用户"""
+    return await authenticate_token(db, credentials.credentials)
+
+
 async def get_current_commander(current_user: User = Depends(get_current_user)) -> User:
     """验证当前用户是否为指挥官"""
     if current_user.role.lower() != "commander":
@@ -0,0 +1,232 @@
+"""
+File download responses with validators, conditional GET and byte ranges
+
+- Strong ETag: the content hash for content-addressed blobs, otherwise
+  derived from file size and mtime
+- If-None-Match / If-Modified-Since answered with 304
+- Range: single range (206) and multiple ranges (multipart/byteranges),
+  guarded by If-Range. Overlapping and adjacent ranges are coalesced and at
+  most MAX_RANGES ranges are accepted, so a response never repeats bytes
+- Content-addressed blobs never change, so they get long-lived immutable
+  cache headers
+"""
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.core.file_storage import CHUNK_SIZE
+
+# Downloads require authentication, so only private (browser) caches may store them
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+# A Range header with more parts is ignored and the full file is sent (200)
+MAX_RANGES = 16
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    bare = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == bare for tag in candidates)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+
+    return False
+
+
+def _range_applies(request: Request, etag: str, last_modified: str) -> bool:
+    """If-Range: only honour Range when the client's copy is current"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison; weak tags never match
+        return not if_range.startswith("W/") and if_range == etag
+    return if_range == last_modified
+
+
+def parse_range_header(header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into sorted, non-overlapping inclusive (start, end) pairs
+
+    Overlapping and adjacent ranges are merged, so ``bytes=0-,0-,0-`` yields
+    the file once. Returns None when the header is malformed or has more than
+    MAX_RANGES parts (the Range is then ignored) and an empty list when no
+    range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        part = part.strip()
+        if not part or "-" not in part:
+            return None
+        start_text, _, end_text = part.partition("-")
+        start_text, end_text = start_text.strip(), end_text.strip()
+        try:
+            if not start_text:
+                # Suffix range: last N bytes
+                length = int(end_text)
+                if length <= 0 or file_size == 0:
+                    continue
+                start, end = max(file_size - length, 0), file_size - 1
+            else:
+                start = int(start_text)
+                end = int(end_text) if end_text else file_size - 1
+                if start < 0 or (end_text and start > end):
+                    return None
+                if start >= file_size:
+                    # Unsatisfiable range
+                    continue
+                end = min(end, file_size - 1)
+        except ValueError:
+            return None
+        ranges.append((start, end))
+
+    return _coalesce_ranges(ranges)
+
+
+def _coalesce_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping and adjacent ranges (sent in ascending order)"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+async def _iter_file_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def _iter_multipart(
+    path: Path,
+    ranges: List[Tuple[int, int]],
+    boundary: str,
+    media_type: str,
+    file_size: int
+) -> AsyncIterator[bytes]:
+    for start, end in ranges:
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{file_size}\r\n\r\n"
+        ).encode("latin-1")
+        async for chunk in _iter_file_range(path, start, end):
+            yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("latin-1")
+
+
+def build_file_response(
+    request: Request,
+    path: Path,
+    filename: str,
+    media_type: str,
+    content_hash: Optional[str] = None
+) -> Response:
+    """Build a download response honouring conditional and range headers"""
+    stat = os.stat(path)
+    file_size = stat.st_size
+
+    if content_hash:
+        etag = f'"{content_hash}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{file_size:x}-{stat.st_mtime_ns:x}"'
+        cache_control = REVALIDATE_CACHE_CONTROL
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    headers = {
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header and _range_applies(request, etag, last_modified):
+        ranges = parse_range_header(range_header, file_size)
+
+        if ranges == []:
+            headers["content-range"] = f"bytes */{file_size}"
+            return Response(status_code=416, headers=headers)
+
+        if ranges:
+            headers["content-disposition"] = _content_disposition(filename)
+
+            if len(ranges) == 1:
+                start, end = ranges[0]
+                headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+                headers["content-length"] = str(end - start + 1)
+                return StreamingResponse(
+                    _iter_file_range(path, start, end),
+                    status_code=206,
+                    media_type=media_type,
+                    headers=headers
+                )
+
+            boundary = uuid.uuid4().hex
+            return StreamingResponse(
+                _iter_multipart(path, ranges, boundary, media_type, file_size),
+                status_code=206,
+                media_type=f"multipart/byteranges; boundary={boundary}",
+                headers=headers
+            )
+
+    return FileResponse(
+        path=str(path),
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat
+    )
@@ -1,6 +1,9 @@
 import os
 import uuid
+import hashlib
 from pathlib import Path
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, HTTPException
 from typing import Optional
 
@@ -12,9 +15,17 @@ ALLOWED_EXTENSIONS = {
 # File size limit: 30MB
 MAX_FILE_SIZE = 30 * 1024 * 1024
 
+# Streaming chunk size: 1MB
+CHUNK_SIZE = 1024 * 1024
+
 # Upload directory
 UPLOAD_DIR = Path(__file__).parent.parent.parent / 'uploads'
 
+# Content-addressed blobs live under UPLOAD_DIR/blobs/<ab>/<cd>/<sha256>,
+# in-flight uploads under UPLOAD_DIR/tmp (same filesystem, so rename is atomic)
+BLOB_SUBDIR = 'blobs'
+TEMP_SUBDIR = 'tmp'
+
 # Ensure upload directory exists
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -39,6 +50,16 @@ def validate_file_size(file_size: int) -> None:
         )
 
 
+def is_valid_content_hash(content_hash: str) -> bool:
+    """Check that a string is a lowercase hex SHA-256 digest"""
+    return len(content_hash) == 64 and all(c in '0123456789abcdef' for c in content_hash)
+
+
+def get_blob_path(content_hash: str) -> Path:
+    """Get the sharded on-disk path of a blob"""
+    return UPLOAD_DIR / BLOB_SUBDIR / content_hash[:2] / content_hash[2:4] / content_hash
+
+
 def validate_file_type(filename: str) -> None:
     """Validate file type"""
     if not is_allowed_file(filename):
@@ -52,32 +73,111 @@ def validate_file_type(filename: str) -> None:
 async def save_upload_file(
     upload_file: UploadFile,
     user_id: int
-) -> tuple[str, int]:
+) -> tuple[str, int, str]:
     """
-    Save uploaded file to disk
+    Stream uploaded file into a temporary file of the blob store
+
+    The file is copied in chunks while its SHA-256 is computed and the size
+    limit is enforced. The temporary file is not moved to its blob path
+    here: app.services.blob_store.acquire_blob does that (or discards it
+    when the content is already stored) while holding the blob row lock,
+    so a concurrent delete of the same content cannot remove the file in
+    between. Callers remove the temporary file with discard_file if the
+    blob is never acquired.
 
     Returns:
-        tuple: (file_path, file_size)
+        tuple: (temp_path, file_size, sha256_hex)
     """
     # Validate file type
     validate_file_type(upload_file.filename or "unknown")
 
-    # Read file content to validate size
-    content = await upload_file.read()
+    # Reject early when the client declared the size
+    if upload_file.size is not None:
+        validate_file_size(upload_file.size)
 
-    # Validate file size
-    validate_file_size(len(content))
+    temp_path = await _new_temp_path("part")
 
-    # Generate unique filename
-    ext = get_file_extension(upload_file.filename or "unknown")
-    unique_filename = f"{uuid.uuid4()}.{ext}"
-    file_path = UPLOAD_DIR / unique_filename
+    hasher = hashlib.sha256()
+    file_size = 0
+
+    try:
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while True:
+                chunk = await upload_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                file_size += len(chunk)
+                validate_file_size(file_size)
+
+                hasher.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        # Never leave partial files behind
+        await discard_file(str(temp_path))
+        raise
+
+    return str(temp_path), file_size, hasher.hexdigest()
+
+
+async def _new_temp_path(suffix: str) -> Path:
+    temp_dir = UPLOAD_DIR / TEMP_SUBDIR
+    await aiofiles.os.makedirs(temp_dir, exist_ok=True)
+    return temp_dir / f"{uuid.uuid4()}.{suffix}"
+
+
+async def place_blob(content_hash: str, temp_path: Optional[str]) -> Optional[str]:
+    """
+    Make sure the blob file exists at its content-addressed path
 
-    # Save file
-    with open(file_path, 'wb') as f:
-        f.write(content)
+    Moves temp_path into place when the blob file is missing and discards
+    it otherwise. Call while holding the blob row lock.
 
-    return str(file_path), len(content)
+    Returns:
+        The blob path, or None if the file is missing and no temp_path was given
+    """
+    blob_path = get_blob_path(content_hash)
+
+    if await aiofiles.os.path.exists(blob_path):
+        # Same content already stored
+        if temp_path:
+            await discard_file(temp_path)
+        return str(blob_path)
+
+    if not temp_path:
+        return None
+
+    await aiofiles.os.makedirs(blob_path.parent, exist_ok=True)
+    await aiofiles.os.replace(temp_path, blob_path)
+    return str(blob_path)
+
+
+async def trash_blob(file_path: str) -> Optional[str]:
+    """
+    Move a blob file out of its content-addressed path
+
+    Used when the last reference is released, while holding the blob row
+    lock: from then on new references see the file as missing and store
+    their own copy. The returned trash path is deleted after commit, or
+    moved back on rollback (see app.services.blob_store).
+
+    Returns:
+        The trash path, or None if the file did not exist
+    """
+    trash_path = await _new_temp_path("deleted")
+    try:
+        await aiofiles.os.replace(file_path, trash_path)
+    except FileNotFoundError:
+        return None
+    return str(trash_path)
+
+
+async def discard_file(file_path: str) -> None:
+    """Remove a temporary file if it still exists"""
+    try:
+        await aiofiles.os.remove(file_path)
+    except OSError:
+        pass
 
 
 def delete_file(file_path: str) -> bool:
@@ -0,0 +1,221 @@
+"""
+定时任务的主节点选举
+
+多个 worker / 副本同时运行时，只有持有锁的进程（leader）执行定时任务：
+- PostgreSQL：会话级 advisory lock，由一条专用连接持有；进程退出或连接断开时锁自动释放
+- SQLite：对锁文件加 flock，进程退出时由操作系统释放
+
+每个进程每隔 SCHEDULER_ELECTION_INTERVAL_SECONDS 尝试获取锁（leader 则检查锁仍然有效），
+leader 失效后其他进程在一个选举间隔内接管。
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.db.session import engine
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# advisory lock 的键（"NEXS"），小于 2^31，pg_locks 中 classid 为 0、objid 为该值
+ADVISORY_LOCK_KEY = 0x4E455853
+APPLICATION_NAME_PREFIX = "nexus-scheduler:"
+
+
+class LeaderElector:
+    def __init__(self, interval_seconds: float, enabled: bool = True, lock_file: Optional[str] = None):
+        self.interval_seconds = interval_seconds
+        self.enabled = enabled
+        self.lock_file = lock_file or os.path.join(tempfile.gettempdir(), "nexus-scheduler.lock")
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self.leader_since: Optional[datetime] = None
+        self.promotions = 0
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[AsyncConnection] = None
+        self._file = None
+
+    @property
+    def backend(self) -> str:
+        if not self.enabled:
+            return "disabled"
+        if engine.dialect.name == "postgresql":
+            return "advisory_lock"
+        return "file_lock" if fcntl is not None else "single_process"
+
+    async def start(self) -> None:
+        if self.backend in ("disabled", "single_process"):
+            # 未启用选举或无法加锁时，每个进程都执行定时任务
+            self._promote()
+            return
+        await self._tick()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._release()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self._tick()
+
+    async def _tick(self) -> None:
+        try:
+            if self.is_leader:
+                if not await self._still_held():
+                    logger.warning(f"Scheduler leadership lost by {self.identity}")
+                    await self._release()
+            elif await self._try_acquire():
+                self._promote()
+        except Exception as e:
+            logger.warning(f"Leader election error on {self.identity}: {e}")
+            await self._release()
+
+    def _promote(self) -> None:
+        self.is_leader = True
+        self.leader_since = datetime.now(timezone.utc)
+        self.promotions += 1
+        logger.info(f"Scheduler leader is now {self.identity} ({self.backend})")
+
+    # -- PostgreSQL advisory lock / 文件锁 -----------------------------------
+
+    async def _try_acquire(self) -> bool:
+        if self.backend == "advisory_lock":
+            connection = await engine.connect()
+            try:
+                acquired = await connection.scalar(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+                )
+                if acquired:
+                    # 通过 application_name 让其他进程查到当前 leader
+                    await connection.execute(
+                        text("SELECT set_config('application_name', :name, false)"),
+                        {"name": APPLICATION_NAME_PREFIX + self.identity}
+                    )
+                await connection.commit()
+            except Exception:
+                await connection.close()
+                raise
+            if acquired:
+                self._connection = connection
+                return True
+            await connection.close()
+            return False
+
+        lock = open(self.lock_file, "a+")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        lock.seek(0)
+        lock.truncate()
+        json.dump({"identity": self.identity, "since": datetime.now(timezone.utc).isoformat()}, lock)
+        lock.flush()
+        self._file = lock
+        return True
+
+    async def _still_held(self) -> bool:
+        if self._connection is not None:
+            try:
+                await self._connection.scalar(text("SELECT 1"))
+                await self._connection.commit()
+                return True
+            except Exception:
+                return False
+        return self._file is not None or self.backend in ("disabled", "single_process")
+
+    async def _release(self) -> None:
+        self.is_leader = False
+        self.leader_since = None
+
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                await connection.execute(text("RESET application_name"))
+                await connection.commit()
+                await connection.close()
+            except Exception:
+                # 连接已失效：丢弃连接，服务端随会话结束释放锁
+                await connection.invalidate()
+                await connection.close()
+
+        if self._file is not None:
+            lock, self._file = self._file, None
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            lock.close()
+
+    # -- 状态 --------------------------------------------------------------------
+
+    async def current_leader(self) -> Optional[str]:
+        """查询当前 leader 的标识（主机名:进程号），没有 leader 时返回 None"""
+        if self.is_leader:
+            return self.identity
+
+        if self.backend == "advisory_lock":
+            async with engine.connect() as connection:
+                name = await connection.scalar(
+                    text(
+                        "SELECT a.application_name FROM pg_locks l "
+                        "JOIN pg_stat_activity a ON a.pid = l.pid "
+                        "WHERE l.locktype = 'advisory' AND l.granted "
+                        "AND l.classid = 0 AND l.objid::bigint = :key"
+                    ),
+                    {"key": ADVISORY_LOCK_KEY}
+                )
+            return name.removeprefix(APPLICATION_NAME_PREFIX) if name else None
+
+        if self.backend == "file_lock" and os.path.exists(self.lock_file):
+            with open(self.lock_file) as lock:
+                try:
+                    # 能加锁说明没有进程持有锁，文件内容是过期的
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                    return None
+                except OSError:
+                    pass
+                try:
+                    return json.load(lock)["identity"]
+                except (ValueError, KeyError):
+                    return None
+
+        return None
+
+    async def status(self) -> dict:
+        return {
+            "backend": self.backend,
+            "identity": self.identity,
+            "is_leader": self.is_leader,
+            "leader_since": self.leader_since,
+            "leader": await self.current_leader(),
+            "promotions": self.promotions,
+            "election_interval_seconds": self.interval_seconds,
+        }
+
+
+leader_elector = LeaderElector(
+    interval_seconds=settings.SCHEDULER_ELECTION_INTERVAL_SECONDS,
+    enabled=settings.SCHEDULER_LEADER_ELECTION,
+    lock_file=settings.SCHEDULER_LOCK_FILE,
+)
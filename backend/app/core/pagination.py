@@ -0,0 +1,118 @@
+"""
+游标分页（keyset pagination）
+
+列表按 (created_at, id) 倒序排列，游标编码上一页最后一行的 (created_at, id)，
+下一页只需沿索引继续向后扫描，深翻页的代价与第一页相同。
+下一页游标和可选的估算总数通过响应头返回，响应体仍然是列表。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, select, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_payload(payload: dict) -> str:
+    """将游标内容编码为不透明字符串"""
+    raw = json.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_payload(cursor: str) -> dict:
+    """解码游标内容，格式错误时返回 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return payload
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    """将 (created_at, id) 编码为不透明游标"""
+    return encode_payload({
+        "t": created_at.isoformat() if created_at else None,
+        "i": row_id,
+    })
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """解码 (created_at, id) 游标，格式错误时返回 400"""
+    payload = decode_payload(cursor)
+    try:
+        created_at = datetime.fromisoformat(payload["t"]) if payload["t"] else None
+        return created_at, int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def keyset_paginate(query: Select, model, cursor: Optional[str], limit: int) -> Select:
+    """为查询加上稳定排序、游标条件和 limit
+
+    多取一行用于判断是否还有下一页，配合 build_page 使用。
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # 以游标行在库中的 created_at 作为锚点（主键查找），
+        # 避免不同方言下时间戳精度与参数格式不一致导致的重复或遗漏；
+        # 游标行已被删除时，取不晚于游标时间戳的最近一行在库中的 created_at，
+        # 同样避免直接拿参数与库中值比较（SQLite 中 "…05:00:00" < "…05:00:00.000000"）
+        anchor = func.coalesce(
+            select(model.created_at).where(model.id == row_id).scalar_subquery(),
+            select(func.max(model.created_at)).where(model.created_at <= created_at).scalar_subquery(),
+            created_at,
+        )
+        query = query.where(
+            or_(
+                model.created_at < anchor,
+                and_(model.created_at == anchor, model.id < row_id),
+            )
+        )
+
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def build_page(rows: Sequence, limit: int, response: Response) -> list:
+    """截取当前页，并在还有下一页时设置下一页游标响应头"""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
+
+
+async def estimate_total(db: AsyncSession, query: Select, response: Response) -> int:
+    """估算查询结果总数并写入响应头
+
+    PostgreSQL 读取查询计划中的估算行数，不执行 COUNT(*)；
+    其他数据库（本地开发用的 SQLite）数据量小，直接计数。
+    """
+    inner = query.order_by(None).limit(None).offset(None)
+
+    if db.bind.dialect.name == "postgresql":
+        compiled = inner.compile(
+            dialect=db.bind.dialect,
+            compile_kwargs={"literal_binds": True},
+        )
+        # 已内联参数，直接交给驱动执行，避免 text() 把内容里的冒号当作绑定参数
+        connection = await db.connection()
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        total = int(plan[0]["Plan"]["Plan Rows"])
+    else:
+        result = await db.execute(select(func.count()).select_from(inner.subquery()))
+        total = result.scalar() or 0
+
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    return total
@@ -0,0 +1,133 @@
+"""
+已认证用户（principal）的进程内缓存
+
+get_current_user 每个请求都要按 id 查询 users 表。这里按用户 id 缓存用户列值
+（TTL + LRU），命中时直接重建 User 实例，不访问数据库。
+
+重建的实例是游离（detached）的只读快照，不加入请求的会话：缓存值可能比数据库旧，
+放进 identity map 会让同一请求中之后的 select(User) 也拿到旧值（例如信誉分的读改写）。
+快照只用于身份和权限判断（id、username、role），需要最新值或要修改用户时另行查询。
+
+失效：
+- ORM 修改或删除 User 后，在 flush 和 commit 时自动失效
+- 使用批量 UPDATE 语句修改 users 表时，需调用 principal_cache.invalidate()
+
+缓存是进程内的，多进程部署时其他进程最多在 TTL 内看到旧值；
+可通过 PRINCIPAL_CACHE_ENABLED 关闭。
+"""
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import User
+
+_PENDING_KEY = "principal_cache_pending"
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float, max_size: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return values
+
+    def put(self, user: User) -> None:
+        if not self.enabled:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        self._entries[user.id] = (time.monotonic() + self.ttl_seconds, values)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int) -> None:
+        for user_id in user_ids:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_on_commit(self, session: AsyncSession, *user_ids: int) -> None:
+        """用批量 UPDATE 修改用户后调用：立即失效，并在提交后再失效一次"""
+        self.invalidate(*user_ids)
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+    def load(self, user_id: int) -> Optional[User]:
+        """从缓存中重建用户的游离快照（不加入任何会话），未命中返回 None"""
+        if not self.enabled:
+            return None
+
+        values = self.get(user_id)
+        if values is None:
+            return None
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    enabled=settings.PRINCIPAL_CACHE_ENABLED,
+)
+
+
+def _changed_user_ids(objects: Iterable) -> set:
+    return {obj.id for obj in objects if isinstance(obj, User) and obj.id is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_after_flush(session, flush_context):
+    user_ids = _changed_user_ids(session.dirty) | _changed_user_ids(session.deleted)
+    if user_ids:
+        principal_cache.invalidate(*user_ids)
+        # 提交前其他请求可能又缓存了旧值，提交后再失效一次
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if user_ids:
+        principal_cache.invalidate(*user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
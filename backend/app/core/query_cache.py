@@ -0,0 +1,350 @@
+"""
+读查询结果缓存（按实体标签失效）
+
+开销较大的读查询（模块详情、项目统计、知识关联数、指挥官列表）通过 query_cache 缓存，
+每个条目带若干实体标签（如 module:42、project:7）：
+
+    value = await query_cache.get_or_load(key, [module_tag(42)], loader)
+
+失效按标签进行。每个标签有一个版本号，条目保存写入时各标签的版本，读取时版本不一致即视为过期：
+- 加载前先取标签版本，加载期间发生的写入会使这次加载的结果直接过期，不会把旧数据写回缓存
+- 写接口调用 query_cache.invalidate_on_commit(db, *tags)，提交后递增标签版本；
+  同一进程内之后的读取会先等待这些失效完成，写入者随后的请求不会读到旧数据
+
+后端（QUERY_CACHE_BACKEND，默认 memory；设置 REDIS_URL 不会自动切换）：
+- memory：进程内 LRU，失效只作用于本进程，仅适用于单 worker 部署
+  （多 worker 时其他进程在 TTL 内仍会返回旧数据）
+- redis：进程外共享（需要安装 redis 包），各进程共享标签版本
+- none：关闭缓存，每次都执行查询
+
+缓存的值必须能以 JSON 表示（dict / list / str / 数字 / None）：redis 后端以 JSON 存储，
+不反序列化任意对象。pydantic 模型用 model_dump(mode="json") 缓存、读取后重建；
+元组读回时是列表，因此直接缓存列表，两个后端返回的值保持一致。
+
+两个后端实现相同的接口（MemoryBackend / RedisBackend），测试中可以传入任意兼容
+redis.asyncio 接口的本地替身，例如 QueryCache(RedisBackend(fake_client))。
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "query_cache_pending_tags"
+
+COMMANDERS_TAG = "commanders"
+
+
+def module_tag(module_id: int) -> str:
+    return f"module:{module_id}"
+
+
+def project_tag(project_id: int) -> str:
+    return f"project:{project_id}"
+
+
+def knowledge_tag(knowledge_id: int) -> str:
+    return f"knowledge:{knowledge_id}"
+
+
+# 条目：(值, {标签: 写入时的版本})
+_Entry = Tuple[Any, Dict[str, int]]
+
+
+class CacheBackend:
+    """缓存后端接口"""
+
+    name = "base"
+
+    async def get_many(self, keys: List[str]) -> Dict[str, _Entry]:
+        raise NotImplementedError
+
+    async def set_many(self, entries: Dict[str, _Entry], ttl_seconds: float) -> None:
+        raise NotImplementedError
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        raise NotImplementedError
+
+    async def bump_tags(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def metrics(self) -> dict:
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """进程内 LRU"""
+
+    name = "memory"
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[float, _Entry]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get_many(self, keys: List[str]) -> Dict[str, _Entry]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            item = self._entries.get(key)
+            if item is None:
+                continue
+            expires_at, entry = item
+            if expires_at < now:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            found[key] = entry
+        return found
+
+    async def set_many(self, entries: Dict[str, _Entry], ttl_seconds: float) -> None:
+        expires_at = time.monotonic() + ttl_seconds
+        for key, entry in entries.items():
+            self._entries[key] = (expires_at, entry)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    async def bump_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "tags": len(self._versions),
+        }
+
+
+class RedisBackend(CacheBackend):
+    """进程外共享缓存，client 为 redis.asyncio.Redis 或兼容的替身"""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "nexus:qc:"):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("QUERY_CACHE_BACKEND=redis 需要安装 redis 包（pip install redis）")
+        return cls(Redis.from_url(url))
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self._prefix}e:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self._prefix}t:{tag}"
+
+    async def get_many(self, keys: List[str]) -> Dict[str, _Entry]:
+        if not keys:
+            return {}
+        raw = await self._client.mget([self._entry_key(key) for key in keys])
+        found = {}
+        for key, value in zip(keys, raw):
+            if value is not None:
+                cached, versions = json.loads(value)
+                found[key] = (cached, versions)
+        return found
+
+    async def set_many(self, entries: Dict[str, _Entry], ttl_seconds: float) -> None:
+        if not entries:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        for key, entry in entries.items():
+            pipe.set(self._entry_key(key), json.dumps(entry, separators=(",", ":")), ex=max(int(ttl_seconds), 1))
+        await pipe.execute()
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        raw = await self._client.mget([self._tag_key(tag) for tag in tags])
+        return {tag: int(value) if value is not None else 0 for tag, value in zip(tags, raw)}
+
+    async def bump_tags(self, tags: Iterable[str]) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(self._tag_key(tag))
+        await pipe.execute()
+
+
+class QueryCache:
+    def __init__(self, backend: Optional[CacheBackend], ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        # 已提交、尚未写入后端的标签失效
+        self._pending: set = set()
+        self._flush_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: Optional[float] = None
+    ) -> Any:
+        """返回缓存的查询结果，未命中或已失效时调用 loader 加载并写入缓存"""
+        async def load_many(missing: List[str]) -> Dict[str, Any]:
+            return {key: await loader()}
+
+        values = await self.get_or_load_many({key: list(tags)}, load_many, ttl_seconds)
+        return values[key]
+
+    async def get_or_load_many(
+        self,
+        keys: Dict[str, List[str]],
+        loader: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        ttl_seconds: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """批量版本：keys 为 {键: 标签列表}，loader 接收未命中的键、返回 {键: 值}
+
+        loader 返回中缺少的键视为没有值，不写入缓存。
+        """
+        if not self.enabled:
+            return await loader(list(keys))
+
+        await self._flush_pending()
+        found: Dict[str, Any] = {}
+        try:
+            entries = await self.backend.get_many(list(keys))
+            all_tags = {tag for _, versions in entries.values() for tag in versions}
+            current = await self.backend.tag_versions(all_tags)
+            for key, (value, versions) in entries.items():
+                if all(current.get(tag, 0) == version for tag, version in versions.items()):
+                    found[key] = value
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Query cache read failed: {e}")
+
+        missing = [key for key in keys if key not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+        if not missing:
+            return found
+
+        try:
+            # 加载前记录标签版本：加载期间的写入会使本次结果过期
+            versions = await self.backend.tag_versions({tag for key in missing for tag in keys[key]})
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Query cache read failed: {e}")
+            versions = None
+
+        loaded = await loader(missing)
+        found.update(loaded)
+
+        if versions is not None and loaded:
+            try:
+                await self.backend.set_many(
+                    {key: (value, {tag: versions[tag] for tag in keys[key]}) for key, value in loaded.items()},
+                    ttl_seconds or self.ttl_seconds
+                )
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Query cache write failed: {e}")
+        return found
+
+    async def invalidate(self, *tags: str) -> None:
+        """立即使标签失效（已提交的批量修改等场景）"""
+        if not self.enabled or not tags:
+            return
+        self._pending.update(tags)
+        await self._flush_pending()
+
+    def invalidate_on_commit(self, session: AsyncSession, *tags: str) -> None:
+        """登记当前事务修改的实体标签，提交后失效"""
+        session.info.setdefault(_PENDING_KEY, set()).update(tags)
+
+    def _invalidate_committed(self, tags: set) -> None:
+        if not self.enabled:
+            return
+        self._pending.update(tags)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # 后端是异步的，提交钩子中无法等待；之后的读取会先等待 _flush_pending
+        loop.create_task(self._flush_pending())
+
+    async def _flush_pending(self) -> None:
+        if not self._pending and not self._flush_lock.locked():
+            return
+        # 其他协程正在写入失效时也要等它完成，才能保证之后读到的是新版本
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            tags, self._pending = self._pending, set()
+            try:
+                await self.backend.bump_tags(sorted(tags))
+                self.invalidations += len(tags)
+            except Exception as e:
+                # 失效失败时放回队列，下次读取前重试
+                self._pending.update(tags)
+                self.errors += 1
+                logger.warning(f"Query cache invalidation failed: {e}")
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        metrics = {
+            "backend": self.backend.name if self.backend else "none",
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "pending_invalidations": len(self._pending),
+            "errors": self.errors,
+        }
+        if self.backend:
+            metrics.update(self.backend.metrics())
+        return metrics
+
+
+def _create_backend() -> Optional[CacheBackend]:
+    backend = settings.QUERY_CACHE_BACKEND or "memory"
+    if backend == "redis":
+        url = settings.QUERY_CACHE_REDIS_URL or settings.REDIS_URL or "redis://localhost:6379/0"
+        return RedisBackend.from_url(url)
+    if backend == "memory":
+        return MemoryBackend(max_size=settings.QUERY_CACHE_MAX_SIZE)
+    return None
+
+
+query_cache = QueryCache(backend=_create_backend(), ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    tags = session.info.pop(_PENDING_KEY, None)
+    if tags:
+        query_cache._invalidate_committed(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -1,5 +1,10 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 import bcrypt
 from app.core.config import settings
@@ -20,6 +25,88 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+class PasswordHasher:
+    """在有界线程池中执行 bcrypt，避免阻塞事件循环
+
+    bcrypt 计算期间释放 GIL，线程池即可并行。排队请求数超过上限时
+    立即返回 503，而不是让请求无限堆积。
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._hash_seconds_total = 0.0
+        self._wait_seconds_total = 0.0
+        self._recent_hash_seconds = deque(maxlen=1000)
+
+    @staticmethod
+    def _timed(func, args, submitted_at: float):
+        started_at = time.perf_counter()
+        result = func(*args)
+        finished_at = time.perf_counter()
+        return result, started_at - submitted_at, finished_at - started_at
+
+    async def run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.queue_limit:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="服务繁忙，请稍后重试",
+                headers={"Retry-After": "1"},
+            )
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_seconds, hash_seconds = await loop.run_in_executor(
+                self._executor, self._timed, func, args, time.perf_counter()
+            )
+        finally:
+            self._in_flight -= 1
+
+        self._completed += 1
+        self._wait_seconds_total += wait_seconds
+        self._hash_seconds_total += hash_seconds
+        self._recent_hash_seconds.append(hash_seconds)
+        return result
+
+    def metrics(self) -> dict:
+        recent = sorted(self._recent_hash_seconds)
+        p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+        completed = self._completed or 1
+        return {
+            "workers": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._wait_seconds_total / completed * 1000, 2),
+            "avg_hash_ms": round(self._hash_seconds_total / completed * 1000, 2),
+            "p99_hash_ms": round(p99 * 1000, 2),
+        }
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在哈希线程池中验证密码"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在哈希线程池中生成密码哈希"""
+    return await password_hasher.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """创建 JWT access token"""
     to_encode = data.copy()
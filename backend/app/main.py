@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.tasks import start_scheduler, stop_scheduler
+from app.services.text_extraction import shutdown_extraction_pool
+from app.services.notification_bus import notification_bus
 
 
 @asynccontextmanager
@@ -10,9 +12,12 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时执行
     await start_scheduler()
+    await notification_bus.start()
     yield
     # 关闭时执行
+    await notification_bus.stop()
     await stop_scheduler()
+    shutdown_extraction_pool()
 
 
 def create_app():
@@ -30,10 +35,11 @@ def create_app():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
     )
 
     # Include routers
-    from app.api.v1 import auth, projects, modules, deliveries, reviews, notifications, abandon_requests, knowledge
+    from app.api.v1 import auth, projects, modules, deliveries, reviews, notifications, abandon_requests, knowledge, system, leaderboard, reputation
 
     app.include_router(auth.router, prefix="/api/v1/auth", tags=["认证"])
     app.include_router(projects.router, prefix="/api/v1/projects", tags=["项目"])
@@ -43,6 +49,9 @@ def create_app():
     app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["通知"])
     app.include_router(abandon_requests.router, prefix="/api/v1/abandon-requests", tags=["放弃请求"])
     app.include_router(knowledge.router, prefix="/api/v1/knowledge", tags=["知识库"])
+    app.include_router(leaderboard.router, prefix="/api/v1/leaderboard", tags=["排行榜"])
+    app.include_router(reputation.router, prefix="/api/v1/reputation", tags=["信誉"])
+    app.include_router(system.router, prefix="/api/v1/system", tags=["系统"])
 
     @app.get("/")
     async def root():
@@ -5,11 +5,14 @@ from app.models.module import Module
 from app.models.module_assignee import ModuleAssignee
 from app.models.delivery import Delivery
 from app.models.review import Review, ReviewDecision
+from app.models.file_blob import FileBlob
 from app.models.knowledge_item import KnowledgeItem
 from app.models.knowledge_link import KnowledgeLink
 from app.models.reputation_history import ReputationHistory
+from app.models.reputation_rollup import ReputationRollup
 from app.models.agent_call import AgentCall
-from app.models.notification import Notification, NotificationType
+from app.models.notification import Notification, NotificationArchive, NotificationType
+from app.models.notification_counter import NotificationCounter
 from app.models.abandon_request import ModuleAbandonRequest
 
 __all__ = [
@@ -22,12 +25,15 @@ __all__ = [
     "Delivery",
     "Review",
     "ReviewDecision",
+    "FileBlob",
     "KnowledgeItem",
     "KnowledgeLink",
     "ReputationHistory",
+    "ReputationRollup",
     "AgentCall",
     "Notification",
+    "NotificationArchive",
     "NotificationType",
+    "NotificationCounter",
     "ModuleAbandonRequest",
-    "AbandonRequestStatus",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -16,6 +16,11 @@ class ModuleAbandonRequest(Base):
     reviewed_at = Column(DateTime(timezone=True), nullable=True)
     reviewer_comment = Column(Text, nullable=True)
 
+    __table_args__ = (
+        Index("ix_module_abandon_requests_module_user_status", "module_id", "user_id", "status"),
+        Index("ix_module_abandon_requests_status_created", "status", "created_at"),
+    )
+
     # Relationships
     module = relationship("Module", back_populates="abandon_requests")
     requester = relationship("User", back_populates="abandon_requests", foreign_keys=[user_id])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -14,6 +14,12 @@ class Delivery(Base):
     attachments = Column(JSON, nullable=True)  # 多个附件 [{"name": "...", "url": "..."}]
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # 每个承接人对同一模块只能提交一次交付
+        UniqueConstraint("module_id", "assignee_id", name="uq_deliveries_module_assignee"),
+        Index("ix_deliveries_assignee_id", "assignee_id"),
+    )
+
     # Relationships
     module = relationship("Module", back_populates="deliveries")
     assignee = relationship("User", foreign_keys=[assignee_id])
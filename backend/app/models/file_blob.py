@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class FileBlob(Base):
+    __tablename__ = "file_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256（十六进制）
+    file_path = Column(String(500), nullable=False)  # 分片存储路径
+    file_size = Column(Integer, nullable=False)  # 文件大小（字节）
+    ref_count = Column(Integer, default=0, nullable=False)  # 引用该文件的知识条目数
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, DDL, event
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from app.db.session import Base
 
 
@@ -14,9 +14,86 @@ class KnowledgeItem(Base):
     file_name = Column(String(255), nullable=False)  # 原始文件名
     file_size = Column(Integer, nullable=False)  # 文件大小（字节）
     file_type = Column(String(50), nullable=False)  # 文件类型
+    content_hash = Column(String(64), ForeignKey("file_blobs.content_hash"), nullable=True)  # 内容哈希（去重存储）
     uploader_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # 文件文本提取（见 app.services.text_extraction）
+    # 提取出的文件文本（最多 TEXT_EXTRACTION_MAX_CHARS 字符），参与全文检索；
+    # 延迟加载且禁止隐式加载，列表和详情查询不会读出整段文本
+    content_text = deferred(Column(Text, nullable=True), raiseload=True)
+    extraction_status = Column(String(20), default="pending", nullable=True)  # pending/processing/done/skipped/failed
+    extraction_error = Column(Text, nullable=True)
+    extracted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_knowledge_items_created_at", "created_at"),
+        Index("ix_knowledge_items_file_type_created", "file_type", "created_at"),
+        Index("ix_knowledge_items_uploader_id", "uploader_id"),
+        Index("ix_knowledge_items_content_hash", "content_hash"),
+    )
+
     # Relationships
     uploader = relationship("User", back_populates="knowledge_items")
     links = relationship("KnowledgeLink", back_populates="knowledge_item", cascade="all, delete-orphan")
+
+
+# 全文检索：PostgreSQL 使用 tsvector 生成列 + GIN 索引，SQLite 使用 FTS5 外部内容表 + 触发器。
+# search_vector / knowledge_items_fts 不映射到 ORM，由 app.services.knowledge_search 查询。
+#
+# 'simple' 分词不切分中文（整段汉字是一个词），PostgreSQL 上含中日韩字符的检索词改为
+# 对 SEARCH_TEXT_SQL 做子串匹配，由 pg_trgm 的 GIN 索引加速；
+# SQLite 的 FTS5 使用 trigram 分词，本身就按子串匹配。
+SEARCH_TEXT_SQL = "(coalesce(title, '') || ' ' || coalesce(description, '') || ' ' || coalesce(content_text, ''))"
+
+SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE knowledge_items ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(content_text, '')), 'C')
+        ) STORED
+        """,
+        "CREATE INDEX ix_knowledge_items_search_vector ON knowledge_items USING GIN (search_vector)",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX ix_knowledge_items_search_trgm ON knowledge_items USING GIN ({SEARCH_TEXT_SQL} gin_trgm_ops)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE knowledge_items_fts USING fts5(
+            title, description, content_text, content='knowledge_items', content_rowid='id',
+            tokenize='trigram'
+        )
+        """,
+        """
+        CREATE TRIGGER knowledge_items_fts_ai AFTER INSERT ON knowledge_items BEGIN
+            INSERT INTO knowledge_items_fts(rowid, title, description, content_text)
+            VALUES (new.id, new.title, new.description, new.content_text);
+        END
+        """,
+        """
+        CREATE TRIGGER knowledge_items_fts_ad AFTER DELETE ON knowledge_items BEGIN
+            INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, title, description, content_text)
+            VALUES ('delete', old.id, old.title, old.description, old.content_text);
+        END
+        """,
+        """
+        CREATE TRIGGER knowledge_items_fts_au AFTER UPDATE OF title, description, content_text ON knowledge_items BEGIN
+            INSERT INTO knowledge_items_fts(knowledge_items_fts, rowid, title, description, content_text)
+            VALUES ('delete', old.id, old.title, old.description, old.content_text);
+            INSERT INTO knowledge_items_fts(rowid, title, description, content_text)
+            VALUES (new.id, new.title, new.description, new.content_text);
+        END
+        """,
+    ],
+}
+
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(
+            KnowledgeItem.__table__,
+            "after_create",
+            DDL(_statement).execute_if(dialect=_dialect)
+        )
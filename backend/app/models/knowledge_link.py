@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -12,6 +12,12 @@ class KnowledgeLink(Base):
     module_id = Column(Integer, ForeignKey("modules.id"), nullable=False)
     linked_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # 同一知识与同一任务只能关联一次
+        UniqueConstraint("knowledge_id", "module_id", name="uq_knowledge_links_knowledge_module"),
+        Index("ix_knowledge_links_module_id", "module_id"),
+    )
+
     # Relationships
     knowledge_item = relationship("KnowledgeItem", back_populates="links")
     module = relationship("Module", back_populates="knowledge_links")
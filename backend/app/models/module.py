@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Boolean, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 from app.db.session import Base
 
 
+# 每个模块最多承接人数
+MAX_MODULE_ASSIGNEES = 5
+
+
 class ModuleStatus(str, enum.Enum):
     DRAFT = "draft"  # 草稿
     OPEN = "open"  # 已发布，可承接
@@ -27,9 +31,24 @@ class Module(Base):
     deadline = Column(DateTime(timezone=True), nullable=True)
     bounty = Column(Float, nullable=True)  # 赏金/分数
     is_timeout = Column(Boolean, default=False, nullable=False)  # 是否超时
+    dispatch_mode = Column(String(20), default="immediate", server_default="immediate", nullable=False)  # 派单方式
+    assignee_count = Column(Integer, default=0, server_default="0", nullable=False)  # 承接人数（抢单名额计数）
+    last_reminder_minutes = Column(Integer, nullable=True)  # 当前截止时间下已发送的最近一次截止提醒（提前分钟数）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_modules_project_id", "project_id"),
+        Index("ix_modules_status_timeout_deadline", "status", "is_timeout", "deadline"),
+        # 超时扫描只关心尚未标记超时且设置了截止时间的模块
+        Index(
+            "ix_modules_pending_deadline",
+            deadline,
+            postgresql_where=(is_timeout == False) & deadline.isnot(None),
+            sqlite_where=(is_timeout == False) & deadline.isnot(None),
+        ),
+    )
+
     # Relationships
     creator = relationship("User", foreign_keys=[creator_id])
     project = relationship("Project", back_populates="modules")
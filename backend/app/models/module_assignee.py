@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -13,6 +13,12 @@ class ModuleAssignee(Base):
     score_share = Column(Integer, default=100)  # 分数分配
     assigned_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # 每个用户对同一模块只能承接一次
+        UniqueConstraint("module_id", "user_id", name="uq_module_assignees_module_user"),
+        Index("ix_module_assignees_user_id", "user_id"),
+    )
+
     # Relationships
     module = relationship("Module", back_populates="assignees")
     user = relationship("User", back_populates="module_assignments")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -12,6 +12,7 @@ class NotificationType(str, enum.Enum):
     REVIEW_RESULT = "review_result"  # 验收结果
     MODULE_CLOSED = "module_closed"  # 模块关闭
     MODULE_TIMEOUT = "module_timeout"  # 模块超时
+    DEADLINE_REMINDER = "deadline_reminder"  # 截止时间提醒
     ABANDON_REQUEST = "abandon_request"  # 放弃任务申请（待审批）
     ABANDON_APPROVED = "abandon_approved"  # 放弃任务已批准
     ABANDON_REJECTED = "abandon_rejected"  # 放弃任务被拒绝
@@ -31,5 +32,47 @@ class Notification(Base):
     related_module_id = Column(Integer, ForeignKey("modules.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_notifications_recipient_read_created", recipient_id, is_read, created_at),
+        # 未读数查询只扫描未读行
+        Index(
+            "ix_notifications_recipient_unread",
+            recipient_id,
+            postgresql_where=(is_read == False),
+            sqlite_where=(is_read == False),
+        ),
+        # 保留期清理只扫描已读行
+        Index(
+            "ix_notifications_read_created",
+            created_at,
+            postgresql_where=(is_read == True),
+            sqlite_where=(is_read == True),
+        ),
+    )
+
     # Relationships
     recipient = relationship("User", back_populates="received_notifications")
+
+
+class NotificationArchive(Base):
+    """归档的通知（从 notifications 表移出）
+
+    使用自己的主键，原通知 id 存在 notification_id 中：SQLite 的 notifications.id
+    没有 AUTOINCREMENT，删除最大 id 后会被复用，不能直接作归档表主键。
+    """
+    __tablename__ = "notification_archive"
+
+    id = Column(Integer, primary_key=True)
+    notification_id = Column(Integer, nullable=False, index=True)
+    recipient_id = Column(Integer, nullable=False)
+    type = Column(String(50), nullable=False)
+    title = Column(String(200), nullable=False)
+    content = Column(Text, nullable=False)
+    is_read = Column(Boolean, default=False, nullable=False)
+    related_module_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_notification_archive_recipient_created", recipient_id, created_at),
+    )
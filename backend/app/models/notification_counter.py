@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.db.session import Base
+
+
+class NotificationCounter(Base):
+    """每个用户的未读通知数（与通知写入、已读标记在同一事务中维护）"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, default=0, nullable=False)  # 没有记录等同于 0
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -14,5 +14,9 @@ class ReputationHistory(Base):
     related_module_id = Column(Integer, ForeignKey("modules.id"), nullable=True)
     changed_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_reputation_history_user_changed", "user_id", "changed_at"),
+    )
+
     # Relationships
     user = relationship("User", back_populates="reputation_history")
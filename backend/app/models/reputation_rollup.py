@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey
+from app.db.session import Base
+
+
+class ReputationRollup(Base):
+    """按日/周/月汇总的信誉变化（与信誉记录在同一事务中维护）"""
+    __tablename__ = "reputation_rollups"
+
+    # 主键 (user_id, granularity, bucket_start) 即曲线查询所用的索引
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String(10), primary_key=True)  # day, week, month
+    bucket_start = Column(Date, primary_key=True)  # 桶的起始日期（UTC，周从周一开始）
+    score_change = Column(Float, default=0.0, nullable=False)  # 净变化
+    gains = Column(Float, default=0.0, nullable=False)  # 增加合计
+    losses = Column(Float, default=0.0, nullable=False)  # 减少合计（正数）
+    event_count = Column(Integer, default=0, nullable=False)
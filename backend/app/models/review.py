@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -22,6 +22,11 @@ class Review(Base):
     reputation_change = Column(Integer, nullable=True)  # 信誉分变化
     reviewed_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # 每个交付只能验收一次
+        UniqueConstraint("delivery_id", name="uq_reviews_delivery_id"),
+    )
+
     # Relationships
     delivery = relationship("Delivery", back_populates="reviews")
     reviewer = relationship("User", back_populates="reviews")
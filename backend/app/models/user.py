@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
 
+# 每个用户最多同时承接的任务数
+MAX_CONCURRENT_TASKS = 3
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -16,6 +20,11 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        # 指挥官查询使用 lower(role) 过滤
+        Index("ix_users_role_lower", func.lower(role)),
+    )
+
     # Relationships
     created_projects = relationship("Project", back_populates="creator", foreign_keys="Project.creator_id")
     created_modules = relationship("Module", back_populates="creator", foreign_keys="Module.creator_id")
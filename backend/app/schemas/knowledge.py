@@ -25,6 +25,28 @@ class KnowledgeUpdate(BaseModel):
     description: Optional[str] = Field(None, max_length=1000)
 
 
+class KnowledgeFromHash(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200, description="知识标题")
+    description: Optional[str] = Field(None, max_length=1000, description="知识描述")
+    content_hash: str = Field(..., min_length=64, max_length=64, description="文件 SHA-256（十六进制）")
+    file_name: str = Field(..., min_length=1, max_length=255, description="原始文件名")
+    file_type: Optional[str] = Field(None, max_length=50, description="文件 MIME 类型")
+
+
+class BlobStatus(BaseModel):
+    content_hash: str
+    exists: bool
+    file_size: Optional[int] = None
+
+
+class ExtractionStatus(BaseModel):
+    knowledge_id: int
+    status: str
+    error: Optional[str] = None
+    extracted_at: Optional[datetime] = None
+    content_length: int = 0
+
+
 class KnowledgeLink(BaseModel):
     module_id: int = Field(..., description="要关联的任务ID")
 
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    role: str
+    reputation_score: float
+
+
+class LeaderboardPosition(BaseModel):
+    rank: Optional[int] = None
+    total: int
+    neighbours: List[LeaderboardEntry] = []
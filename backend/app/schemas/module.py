@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
 
@@ -25,11 +25,16 @@ class DeliveryInfo(BaseModel):
         from_attributes = True
 
 
+# immediate：先到先得；其余为批量派单窗口的结算策略
+DispatchMode = Literal["immediate", "fifo", "reputation", "lottery"]
+
+
 class ModuleBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=300)
     description: str = Field(..., min_length=1)
     deadline: Optional[datetime] = None
     bounty: Optional[float] = None
+    dispatch_mode: DispatchMode = "immediate"
 
 
 class ModuleCreate(ModuleBase):
@@ -42,6 +47,7 @@ class ModuleUpdate(BaseModel):
     deadline: Optional[datetime] = None
     bounty: Optional[float] = None
     status: Optional[str] = None
+    dispatch_mode: Optional[DispatchMode] = None
 
 
 class ModuleResponse(BaseModel):
@@ -58,6 +64,7 @@ class ModuleResponse(BaseModel):
     description: str
     deadline: Optional[datetime] = None
     bounty: Optional[float] = None
+    dispatch_mode: str = "immediate"
     assignees: List[ModuleAssigneeInfo] = []
     deliveries: List[DeliveryInfo] = []
 
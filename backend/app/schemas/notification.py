@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+
+class NotificationBulkFilter(BaseModel):
+    """批量操作的筛选条件，多个条件同时生效；都不填表示当前用户的全部通知"""
+    ids: Optional[List[int]] = Field(None, max_length=1000, description="通知ID列表")
+    type: Optional[str] = Field(None, description="通知类型")
+    before: Optional[datetime] = Field(None, description="只处理此时间之前创建的通知")
+
+
+class NotificationBulkDelete(NotificationBulkFilter):
+    read_only: bool = Field(True, description="只处理已读通知")
+
+
+class NotificationBulkResult(BaseModel):
+    message: str
+    count: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -27,3 +27,18 @@ class ProjectResponse(ProjectBase):
 
     class Config:
         from_attributes = True
+
+
+class ProjectStats(BaseModel):
+    module_count: int = 0
+    modules_by_status: Dict[str, int] = {}
+    timed_out_count: int = 0
+    total_bounty: float = 0.0
+    allocated_bounty: float = 0.0  # 已被承接或已完成模块的赏金
+    assignee_count: int = 0
+    delivery_count: int = 0
+    reviewed_delivery_count: int = 0
+
+
+class ProjectWithStats(ProjectResponse):
+    stats: Optional[ProjectStats] = None
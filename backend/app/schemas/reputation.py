@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List, Literal
+
+ReputationGranularity = Literal["day", "week", "month"]
+
+
+class ReputationPoint(BaseModel):
+    bucket_start: date
+    score_change: float
+    gains: float
+    losses: float
+    event_count: int
+    score: float  # 桶结束时的信誉分
+
+
+class ReputationSeries(BaseModel):
+    user_id: int
+    granularity: ReputationGranularity
+    start: date
+    end: date
+    current_score: float
+    points: List[ReputationPoint] = []
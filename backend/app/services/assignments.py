@@ -0,0 +1,144 @@
+"""
+模块承接（抢单）与任务槽位
+
+承接上限由数据库中的计数器保证，不在 Python 中先查后写：
+- users.concurrent_task_count：条件 UPDATE（< MAX_CONCURRENT_TASKS）占用用户的任务槽位
+- modules.assignee_count：条件 UPDATE（status = open 且 < MAX_MODULE_ASSIGNEES）占用模块名额
+- module_assignees 上的 (module_id, user_id) 唯一约束防止重复承接
+
+条件 UPDATE 会锁住该行，并发的抢单在行锁上排队，拿到锁后按最新的值重新判断条件，
+所以任何并发下计数都不会超过上限。任一步失败则回滚整个事务，已占用的槽位一并释放。
+两把行锁总是按“用户 → 模块”的顺序获取，避免抢单之间死锁。
+
+释放槽位同样使用条件 UPDATE（见 release_task_slots / remove_assignment），
+不要在 ORM 对象上读改写计数，否则会覆盖并发抢单的结果。
+"""
+from typing import Iterable
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.principal_cache import principal_cache
+from app.core.query_cache import query_cache, module_tag, project_tag
+from app.models.module import Module, MAX_MODULE_ASSIGNEES
+from app.models.module_assignee import ModuleAssignee
+from app.models.user import User, MAX_CONCURRENT_TASKS
+from app.services.recommendations import module_features
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+async def _raise_grab_rejected(db: AsyncSession, module_id: int, user_id: int) -> None:
+    """抢单失败后（已回滚）查明原因并抛出对应的错误"""
+    module = (await db.execute(
+        select(Module.status, Module.assignee_count).where(Module.id == module_id)
+    )).first()
+    if module is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="模块不存在")
+    if module.status != "open":
+        raise _bad_request("模块不可承接")
+
+    assigned = await db.scalar(
+        select(ModuleAssignee.id).where(
+            ModuleAssignee.module_id == module_id,
+            ModuleAssignee.user_id == user_id
+        )
+    )
+    if assigned is not None:
+        raise _bad_request("已承接该模块")
+
+    task_count = await db.scalar(select(User.concurrent_task_count).where(User.id == user_id))
+    if task_count is not None and task_count >= MAX_CONCURRENT_TASKS:
+        raise _bad_request(f"已达到最大并发任务数（{MAX_CONCURRENT_TASKS}个）")
+    if module.assignee_count >= MAX_MODULE_ASSIGNEES:
+        raise _bad_request(f"模块承接人数已满（最多{MAX_MODULE_ASSIGNEES}人）")
+    # 竞争中名额被释放等情况，请客户端重试
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="承接失败，请重试")
+
+
+async def grab_module(db: AsyncSession, module_id: int, user_id: int) -> str:
+    """
+    原子地承接模块（不提交），返回模块标题
+
+    失败时回滚当前事务并抛出 HTTPException。
+    """
+    user_slot = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.concurrent_task_count < MAX_CONCURRENT_TASKS)
+        .values(concurrent_task_count=User.concurrent_task_count + 1)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    module_slot = None
+    if user_slot.first() is not None:
+        module_slot = (await db.execute(
+            update(Module)
+            .where(
+                Module.id == module_id,
+                Module.status == "open",
+                Module.assignee_count < MAX_MODULE_ASSIGNEES
+            )
+            .values(assignee_count=Module.assignee_count + 1)
+            .returning(Module.title, Module.project_id)
+            .execution_options(synchronize_session=False)
+        )).first()
+
+    if module_slot is not None:
+        try:
+            db.add(ModuleAssignee(module_id=module_id, user_id=user_id))
+            await db.flush()
+        except IntegrityError:
+            module_slot = None
+
+    if module_slot is None:
+        await db.rollback()
+        await _raise_grab_rejected(db, module_id, user_id)
+
+    principal_cache.invalidate_on_commit(db, user_id)
+    module_features.mark_dirty_on_commit(db, [module_id])
+    query_cache.invalidate_on_commit(db, module_tag(module_id), project_tag(module_slot.project_id))
+    return module_slot.title
+
+
+async def release_task_slots(db: AsyncSession, user_ids: Iterable[int]) -> None:
+    """给每个用户释放一个任务槽位（不提交），计数不低于 0"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    await db.execute(
+        update(User)
+        .where(User.id.in_(user_ids), User.concurrent_task_count > 0)
+        .values(concurrent_task_count=User.concurrent_task_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    principal_cache.invalidate_on_commit(db, *user_ids)
+
+
+async def remove_assignment(db: AsyncSession, module_id: int, user_id: int) -> bool:
+    """删除承接记录并释放模块名额和用户槽位（不提交），记录不存在时返回 False"""
+    removed = await db.execute(
+        delete(ModuleAssignee)
+        .where(ModuleAssignee.module_id == module_id, ModuleAssignee.user_id == user_id)
+        .returning(ModuleAssignee.id)
+        .execution_options(synchronize_session=False)
+    )
+    if removed.first() is None:
+        return False
+
+    module = (await db.execute(
+        update(Module)
+        .where(Module.id == module_id, Module.assignee_count > 0)
+        .values(assignee_count=Module.assignee_count - 1)
+        .returning(Module.project_id)
+        .execution_options(synchronize_session=False)
+    )).first()
+    module_features.mark_dirty_on_commit(db, [module_id])
+    query_cache.invalidate_on_commit(db, module_tag(module_id))
+    if module is not None:
+        query_cache.invalidate_on_commit(db, project_tag(module.project_id))
+    await release_task_slots(db, [user_id])
+    return True
@@ -0,0 +1,119 @@
+"""
+内容寻址文件存储的引用计数
+
+磁盘上的文件由 app.core.file_storage 按 SHA-256 去重保存，
+这里维护 file_blobs 表中的引用计数：知识条目创建时引用 +1，
+删除时引用 -1，最后一个引用消失时才删除磁盘文件。
+
+文件的放置和移除都在持有 blob 行锁（PostgreSQL 行锁 / SQLite 写锁）时进行：
+- 释放最后一个引用时，在锁内删除行并把文件移到临时目录，提交后删除，回滚时移回
+- 增加引用时，在锁内确认文件存在，缺失时用本次上传的临时文件补上
+因此并发的上传和删除不会让新条目指向已被删除的文件。
+"""
+import os
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.file_storage import get_blob_path, place_blob, trash_blob
+from app.models.file_blob import FileBlob
+
+_TRASHED_KEY = "blob_store_trashed"
+
+
+async def get_blob(db: AsyncSession, content_hash: str) -> Optional[FileBlob]:
+    """按内容哈希查找已存储的文件"""
+    result = await db.execute(select(FileBlob).where(FileBlob.content_hash == content_hash))
+    return result.scalar_one_or_none()
+
+
+async def acquire_blob(
+    db: AsyncSession,
+    content_hash: str,
+    file_size: int,
+    temp_path: Optional[str] = None
+) -> str:
+    """为一个新的知识条目增加文件引用（单条 upsert，随调用方事务提交）
+
+    temp_path 为本次上传的临时文件，文件已存在时丢弃，缺失时移到 blob 路径；
+    不带上传文件（按哈希引用）且文件已被删除时返回 404。
+
+    Returns:
+        blob 文件路径
+    """
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(FileBlob).values(
+        content_hash=content_hash,
+        file_path=str(get_blob_path(content_hash)),
+        file_size=file_size,
+        ref_count=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FileBlob.content_hash],
+        set_={"ref_count": FileBlob.ref_count + 1}
+    )
+    # upsert 持有行锁直到提交：并发释放最后一个引用的事务要么已完成（文件已移走），要么等待本事务
+    await db.execute(stmt)
+
+    file_path = await place_blob(content_hash, temp_path)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="文件不存在，请上传文件")
+    return file_path
+
+
+async def release_blob(db: AsyncSession, content_hash: str) -> None:
+    """释放一个文件引用
+
+    引用归零时删除行，并在锁内把文件移出 blob 路径；提交后删除文件，回滚时移回。
+    """
+    locked = await db.execute(
+        select(FileBlob.file_path)
+        .where(FileBlob.content_hash == content_hash)
+        .with_for_update()
+    )
+    file_path = locked.scalar_one_or_none()
+    if file_path is None:
+        return
+
+    # SQLite 不支持 FOR UPDATE，UPDATE 取得写锁后再读取计数
+    await db.execute(
+        update(FileBlob)
+        .where(FileBlob.content_hash == content_hash)
+        .values(ref_count=FileBlob.ref_count - 1)
+    )
+    ref_count = await db.scalar(
+        select(FileBlob.ref_count).where(FileBlob.content_hash == content_hash)
+    )
+    if ref_count > 0:
+        return
+
+    await db.execute(delete(FileBlob).where(FileBlob.content_hash == content_hash))
+
+    trash_path = await trash_blob(file_path)
+    if trash_path:
+        db.info.setdefault(_TRASHED_KEY, []).append((file_path, trash_path))
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_trashed(session):
+    for _file_path, trash_path in session.info.pop(_TRASHED_KEY, []):
+        try:
+            os.remove(trash_path)
+        except OSError:
+            pass
+
+
+@event.listens_for(Session, "after_rollback")
+def _restore_trashed(session):
+    # 回滚后行和引用计数恢复，文件也移回原处（同一内容，覆盖并发写入的副本无妨）
+    for file_path, trash_path in session.info.pop(_TRASHED_KEY, []):
+        try:
+            os.replace(trash_path, file_path)
+        except OSError:
+            pass
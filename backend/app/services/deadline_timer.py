@@ -0,0 +1,369 @@
+"""
+模块截止时间定时器
+
+在内存中用最小堆维护即将到期的截止时间，到点即标记超时，并在截止前按
+DEADLINE_REMINDER_MINUTES 给承接人发送提醒，不再依赖整表扫描发现超时：
+- 启动时和每隔 DEADLINE_TIMER_REFRESH_SECONDS 从数据库加载时间窗口内的未超时模块
+  （同时覆盖其他 worker 创建或修改的模块）
+- create_module / update_module 提交后直接调度，无需等待下一次加载
+- 只有定时任务的 leader 触发；标记超时和记录已发提醒都是条件 UPDATE，重复触发不会重复通知
+
+周期性的超时扫描（app.services.module_timeouts）保留作为兜底。
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, or_, exists
+
+from app.core.config import settings
+from app.core.leader import leader_elector
+from app.db.session import AsyncSessionLocal
+from app.models.module import Module
+from app.models.module_assignee import ModuleAssignee
+from app.models.notification import NotificationType
+from app.services.module_timeouts import ACTIVE_STATUSES, mark_timeouts
+from app.services.notifications import build_notifications, insert_notifications
+
+logger = logging.getLogger(__name__)
+
+# 堆条目中表示“截止时触发超时”的提醒偏移
+TIMEOUT = 0
+# 触发失败（如数据库暂时不可用）后重试的间隔
+FIRE_RETRY_SECONDS = 10
+
+
+def to_utc(value: datetime) -> datetime:
+    """截止时间统一为带时区的 UTC（不带时区的按 UTC 处理）"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _db_now() -> datetime:
+    # 与模块截止时间的存储方式保持一致（UTC，不带时区）
+    return datetime.utcnow()
+
+
+def _format_offset(minutes: int) -> str:
+    if minutes % 60 == 0:
+        return f"{minutes // 60} 小时"
+    return f"{minutes} 分钟"
+
+
+class DeadlineTimer:
+    def __init__(
+        self,
+        reminder_minutes: List[int],
+        refresh_seconds: float,
+        horizon_minutes: int,
+        enabled: bool = True
+    ):
+        self.reminder_minutes = sorted({m for m in reminder_minutes if m > 0}, reverse=True)
+        self.refresh_seconds = refresh_seconds
+        self.horizon_minutes = horizon_minutes
+        self.enabled = enabled
+
+        # (触发时间, 序号, 模块 id, 提醒偏移分钟数（0 表示超时）, 截止时间)
+        self._heap: list = []
+        self._queued: set = set()
+        # 模块当前的截止时间，截止时间修改后旧条目据此丢弃
+        self._deadlines: Dict[int, datetime] = {}
+        # 模块当前截止时间下已发送的最小提醒偏移
+        self._reminded: Dict[int, int] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.fired_timeouts = 0
+        self.sent_reminders = 0
+        self.refreshes = 0
+        self.last_refresh: Optional[datetime] = None
+        self.last_lag_ms: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def _longest_offset(self) -> int:
+        return self.reminder_minutes[0] if self.reminder_minutes else 0
+
+    def _window_end(self, now: datetime) -> datetime:
+        """堆中只保留在此时间之前触发的条目，之后的由下一次加载补上"""
+        return now + timedelta(minutes=self.horizon_minutes)
+
+    # -- 调度 --------------------------------------------------------------------
+
+    def schedule_module(
+        self,
+        module_id: int,
+        deadline: Optional[datetime],
+        last_reminder_minutes: Optional[int] = None
+    ) -> None:
+        """调度（或重新调度）一个模块的超时和提醒；deadline 为 None 时取消"""
+        if not self.running:
+            return
+
+        if deadline is None:
+            self._forget(module_id)
+            return
+
+        deadline = to_utc(deadline)
+        if self._deadlines.get(module_id) != deadline:
+            self._reminded.pop(module_id, None)
+        self._deadlines[module_id] = deadline
+        if last_reminder_minutes is not None:
+            self._reminded[module_id] = last_reminder_minutes
+
+        now = datetime.now(timezone.utc)
+        window_end = self._window_end(now)
+        if deadline - timedelta(minutes=self._longest_offset) > window_end:
+            # 都在时间窗口之外，由之后的加载调度
+            self._forget(module_id)
+            return
+
+        reminded = self._reminded.get(module_id)
+        # 已经错过的提醒只补发偏移最小（离截止最近）的一条
+        overdue_reminder = None
+        for offset in self.reminder_minutes:
+            if reminded is not None and offset >= reminded:
+                continue
+            fire_at = deadline - timedelta(minutes=offset)
+            if fire_at <= now:
+                if now < deadline:
+                    overdue_reminder = offset
+            elif fire_at <= window_end:
+                self._push(fire_at, module_id, offset, deadline)
+        if overdue_reminder is not None:
+            self._push(now, module_id, overdue_reminder, deadline)
+        if deadline <= window_end:
+            self._push(deadline, module_id, TIMEOUT, deadline)
+
+    def _forget(self, module_id: int) -> None:
+        self._deadlines.pop(module_id, None)
+        self._reminded.pop(module_id, None)
+
+    def _push(self, fire_at: datetime, module_id: int, offset: int, deadline: datetime) -> None:
+        key = (module_id, offset, deadline)
+        if key in self._queued:
+            return
+        self._queued.add(key)
+        seq = next(self._seq)
+        heapq.heappush(self._heap, (fire_at, seq, module_id, offset, deadline))
+        if self._wakeup is not None and self._heap[0][1] == seq:
+            # 新条目比原来的堆顶更早，唤醒循环重新计算等待时间
+            self._wakeup.set()
+
+    def _pop_due(self, now: datetime) -> list:
+        """取出到期且截止时间未变的条目；记录已触发要等触发成功后由 _settle 完成"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, module_id, offset, deadline = heapq.heappop(self._heap)
+            self._queued.discard((module_id, offset, deadline))
+            if self._deadlines.get(module_id) != deadline:
+                continue
+            due.append((fire_at, module_id, offset, deadline))
+        return due
+
+    def _settle(self, due: list) -> None:
+        """记录已触发的条目（期间截止时间被修改的模块按新的截止时间调度，不受影响）"""
+        for _, module_id, offset, deadline in due:
+            if self._deadlines.get(module_id) != deadline:
+                continue
+            if offset == TIMEOUT:
+                self._forget(module_id)
+            else:
+                self._reminded[module_id] = min(offset, self._reminded.get(module_id, offset))
+
+    def _requeue(self, due: list) -> None:
+        """触发失败：稍后重试这些条目"""
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=FIRE_RETRY_SECONDS)
+        for _, module_id, offset, deadline in due:
+            if self._deadlines.get(module_id) == deadline:
+                self._push(retry_at, module_id, offset, deadline)
+
+    async def refresh(self) -> int:
+        """从数据库加载时间窗口内尚未超时的模块，返回加载数"""
+        now = datetime.now(timezone.utc)
+        until = self._window_end(now) + timedelta(minutes=self._longest_offset)
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Module.id, Module.deadline, Module.last_reminder_minutes).where(
+                    Module.deadline.isnot(None),
+                    Module.deadline <= until.replace(tzinfo=None),
+                    Module.is_timeout == False,
+                    Module.status.in_(ACTIVE_STATUSES),
+                )
+            )
+            modules = result.all()
+
+        for module_id, deadline, last_reminder_minutes in modules:
+            self.schedule_module(module_id, deadline, last_reminder_minutes)
+
+        self.refreshes += 1
+        self.last_refresh = now
+        return len(modules)
+
+    # -- 触发 --------------------------------------------------------------------
+
+    async def _fire(self, due: list) -> bool:
+        """标记超时、发送提醒并提交，返回是否成功"""
+        now = datetime.now(timezone.utc)
+        self.last_lag_ms = round(max((now - fire_at).total_seconds() for fire_at, _, _, _ in due) * 1000, 1)
+
+        timeouts = [module_id for _, module_id, offset, _ in due if offset == TIMEOUT]
+        # 同一模块同时到期多条提醒时只发偏移最小的一条
+        reminders: Dict[int, int] = {}
+        for _, module_id, offset, _ in due:
+            if offset != TIMEOUT and module_id not in timeouts:
+                reminders[module_id] = min(offset, reminders.get(module_id, offset))
+
+        async with AsyncSessionLocal() as db:
+            try:
+                marked = sent = 0
+                if timeouts:
+                    marked, _ = await mark_timeouts(db, _db_now(), timeouts)
+                if reminders:
+                    sent = await self._send_reminders(db, reminders)
+                await db.commit()
+            except Exception as e:
+                logger.error(f"Error firing module deadlines: {e}")
+                await db.rollback()
+                return False
+        self.fired_timeouts += marked
+        self.sent_reminders += sent
+        return True
+
+    async def _send_reminders(self, db, reminders: Dict[int, int]) -> int:
+        """发送截止提醒（不提交），返回实际提醒的模块数"""
+        by_offset = defaultdict(list)
+        for module_id, offset in reminders.items():
+            by_offset[offset].append(module_id)
+
+        now = _db_now()
+        modules = []
+        for offset, module_ids in by_offset.items():
+            # 记录已发送的最小偏移，保证每档提醒只发一次
+            result = await db.execute(
+                update(Module)
+                .where(
+                    Module.id.in_(module_ids),
+                    Module.deadline > now,
+                    Module.is_timeout == False,
+                    Module.status.in_(ACTIVE_STATUSES),
+                    or_(Module.last_reminder_minutes.is_(None), Module.last_reminder_minutes > offset),
+                    # 没有承接人时不记录，之后有人承接还能收到提醒
+                    exists().where(ModuleAssignee.module_id == Module.id),
+                )
+                .values(last_reminder_minutes=offset)
+                .returning(Module.id, Module.title)
+                .execution_options(synchronize_session=False)
+            )
+            modules += [(module_id, title, offset) for module_id, title in result.all()]
+        if not modules:
+            return 0
+
+        assignees_result = await db.execute(
+            select(ModuleAssignee.module_id, ModuleAssignee.user_id)
+            .where(ModuleAssignee.module_id.in_([m[0] for m in modules]))
+        )
+        assignees = defaultdict(list)
+        for module_id, user_id in assignees_result.all():
+            assignees[module_id].append(user_id)
+
+        rows = []
+        for module_id, title, offset in modules:
+            rows += build_notifications(
+                assignees[module_id],
+                type=NotificationType.DEADLINE_REMINDER,
+                title="任务即将截止",
+                content=f"您承接的任务「{title}」将在 {_format_offset(offset)}后截止，请按时提交交付物。",
+                related_module_id=module_id
+            )
+        await insert_notifications(db, rows)
+        return len(modules)
+
+    # -- 生命周期 ----------------------------------------------------------------
+
+    async def start(self) -> None:
+        if not self.enabled or self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._heap.clear()
+        self._queued.clear()
+        self._deadlines.clear()
+        self._reminded.clear()
+
+    async def _run(self) -> None:
+        next_refresh = datetime.now(timezone.utc)
+        was_leader = False
+        while True:
+            self._wakeup.clear()
+            now = datetime.now(timezone.utc)
+            if leader_elector.is_leader and not was_leader:
+                # 刚成为 leader：立即加载，补上此前由其他进程负责的模块
+                next_refresh = now
+            was_leader = leader_elector.is_leader
+
+            if now >= next_refresh:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error(f"Error loading module deadlines: {e}")
+                next_refresh = now + timedelta(seconds=self.refresh_seconds)
+
+            due = self._pop_due(datetime.now(timezone.utc))
+            # 非 leader 只丢弃到期条目，由 leader 触发；触发失败的条目放回堆中重试
+            if due and was_leader and not await self._fire(due):
+                self._requeue(due)
+            else:
+                self._settle(due)
+
+            wake_at = next_refresh
+            if self._heap and self._heap[0][0] < wake_at:
+                wake_at = self._heap[0][0]
+            timeout = max((wake_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def metrics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "heap_size": len(self._heap),
+            "tracked_modules": len(self._deadlines),
+            "next_fire_at": self._heap[0][0] if self._heap else None,
+            "reminder_minutes": self.reminder_minutes,
+            "fired_timeouts": self.fired_timeouts,
+            "sent_reminders": self.sent_reminders,
+            "last_lag_ms": self.last_lag_ms,
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh,
+        }
+
+
+deadline_timer = DeadlineTimer(
+    reminder_minutes=settings.DEADLINE_REMINDER_MINUTES,
+    refresh_seconds=settings.DEADLINE_TIMER_REFRESH_SECONDS,
+    horizon_minutes=settings.DEADLINE_TIMER_HORIZON_MINUTES,
+    enabled=settings.DEADLINE_TIMER_ENABLED,
+)
@@ -0,0 +1,302 @@
+"""
+热门模块的批量派单窗口
+
+dispatch_mode 不为 immediate 的模块不按到达顺序抢单：窗口内的承接请求先在内存中排队，
+窗口结束后按策略选出中签者，在一个事务中批量占用槽位并写入承接记录：
+- fifo：按到达顺序
+- reputation：信誉分高者优先（同分按到达顺序）
+- lottery：随机抽签
+
+未中签的请求直接返回“人数已满”，不访问数据库；模块满员后的短时间内，
+新的请求同样直接拒绝（DISPATCH_FULL_CACHE_SECONDS）。
+
+窗口是进程内的，多 worker 时各自成批；上限仍由条件 UPDATE 保证（见 app.services.assignments）。
+"""
+import asyncio
+import itertools
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, insert
+
+from app.core.config import settings
+from app.core.principal_cache import principal_cache
+from app.core.query_cache import query_cache, module_tag, project_tag
+from app.db.session import AsyncSessionLocal
+from app.models.module import Module, MAX_MODULE_ASSIGNEES
+from app.models.module_assignee import ModuleAssignee
+from app.models.notification import NotificationType
+from app.models.user import User, MAX_CONCURRENT_TASKS
+from app.services.notifications import commander_cache, build_notifications, insert_notifications
+from app.services.recommendations import module_features
+
+logger = logging.getLogger(__name__)
+
+IMMEDIATE = "immediate"
+DISPATCH_POLICIES = ("fifo", "reputation", "lottery")
+
+# 并发修改导致条件 UPDATE 失败时重新计算的次数
+_MAX_ATTEMPTS = 3
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _module_full() -> HTTPException:
+    return _bad_request(f"模块承接人数已满（最多{MAX_MODULE_ASSIGNEES}人）")
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # 客户端断开后没有人等待结果，取出异常以免事件循环报告 "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+@dataclass
+class _Entry:
+    seq: int
+    user_id: int
+    username: str
+    reputation: float
+    future: asyncio.Future
+
+
+@dataclass
+class _Window:
+    policy: str
+    entries: Dict[int, _Entry] = field(default_factory=dict)
+
+
+class DispatchQueue:
+    def __init__(self, window_ms: int, full_cache_seconds: float):
+        self.window_ms = window_ms
+        self.full_cache_seconds = full_cache_seconds
+        self._windows: Dict[int, _Window] = {}
+        # 模块 id -> (满员标记的过期时间, 派单策略)
+        self._full_until: Dict[int, tuple] = {}
+        self._tasks: set = set()
+        self._seq = itertools.count()
+
+        self.batches = 0
+        self.requests = 0
+        self.winners = 0
+        self.fast_rejections = 0
+
+    def active_policy(self, module_id: int) -> Optional[str]:
+        """模块正在排队或刚刚满员时返回其派单策略，调用方据此跳过数据库查询"""
+        window = self._windows.get(module_id)
+        if window is not None:
+            return window.policy
+        if self._is_full(module_id):
+            return self._full_until[module_id][1]
+        return None
+
+    def _is_full(self, module_id: int) -> bool:
+        marker = self._full_until.get(module_id)
+        if marker is None:
+            return False
+        if marker[0] < time.monotonic():
+            del self._full_until[module_id]
+            return False
+        return True
+
+    def forget(self, module_id: int) -> None:
+        """模块释放名额后清除满员标记"""
+        self._full_until.pop(module_id, None)
+
+    async def submit(self, module_id: int, policy: str, user: User) -> None:
+        """排队承接模块，窗口结算后返回；未中签或不可承接时抛出 HTTPException"""
+        self.requests += 1
+        if self._is_full(module_id):
+            self.fast_rejections += 1
+            raise _module_full()
+
+        window = self._windows.get(module_id)
+        if window is None:
+            window = self._windows[module_id] = _Window(policy=policy)
+            task = asyncio.create_task(self._close_window(module_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        entry = window.entries.get(user.id)
+        if entry is None:
+            # 同一用户在一个窗口内重复请求共享同一个结果
+            entry = window.entries[user.id] = _Entry(
+                seq=next(self._seq),
+                user_id=user.id,
+                username=user.username,
+                reputation=user.reputation_score,
+                future=asyncio.get_running_loop().create_future(),
+            )
+            entry.future.add_done_callback(_consume_exception)
+        await asyncio.shield(entry.future)
+
+    async def _close_window(self, module_id: int) -> None:
+        await asyncio.sleep(self.window_ms / 1000)
+        window = self._windows.pop(module_id)
+        entries = [e for e in window.entries.values() if not e.future.done()]
+        if not entries:
+            return
+
+        try:
+            results = await self._resolve(module_id, window.policy, entries)
+        except Exception as e:
+            logger.error(f"Error dispatching module {module_id}: {e}")
+            results = {
+                entry.user_id: HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="承接失败，请重试")
+                for entry in entries
+            }
+
+        self.batches += 1
+        for entry in entries:
+            if entry.future.done():
+                continue
+            # 未出现在结果中的是没有中签的请求
+            result = results[entry.user_id] if entry.user_id in results else _module_full()
+            if result is None:
+                self.winners += 1
+                entry.future.set_result(None)
+            else:
+                entry.future.set_exception(result)
+
+    def _rank(self, policy: str, entries: List[_Entry]) -> List[_Entry]:
+        if policy == "reputation":
+            return sorted(entries, key=lambda e: (-e.reputation, e.seq))
+        if policy == "lottery":
+            ranked = list(entries)
+            random.shuffle(ranked)
+            return ranked
+        return sorted(entries, key=lambda e: e.seq)
+
+    async def _resolve(self, module_id: int, policy: str, entries: List[_Entry]) -> Dict[int, Optional[HTTPException]]:
+        """在一个事务中结算一批承接请求，返回 用户 id -> None（中签）或错误"""
+        async with AsyncSessionLocal() as db:
+            for _ in range(_MAX_ATTEMPTS):
+                module = (await db.execute(
+                    select(Module.title, Module.project_id, Module.status, Module.assignee_count)
+                    .where(Module.id == module_id)
+                    .with_for_update()
+                )).first()
+                if module is None:
+                    return {
+                        e.user_id: HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="模块不存在")
+                        for e in entries
+                    }
+                if module.status != "open":
+                    return {e.user_id: _bad_request("模块不可承接") for e in entries}
+
+                results: Dict[int, Optional[HTTPException]] = {}
+                user_ids = [e.user_id for e in entries]
+                assigned = set((await db.execute(
+                    select(ModuleAssignee.user_id).where(
+                        ModuleAssignee.module_id == module_id,
+                        ModuleAssignee.user_id.in_(user_ids)
+                    )
+                )).scalars().all())
+                # 按 id 顺序锁定用户行，避免并发的批次之间死锁
+                task_counts = dict((await db.execute(
+                    select(User.id, User.concurrent_task_count)
+                    .where(User.id.in_(user_ids))
+                    .order_by(User.id)
+                    .with_for_update()
+                )).all())
+
+                eligible = []
+                for entry in entries:
+                    if entry.user_id in assigned:
+                        results[entry.user_id] = _bad_request("已承接该模块")
+                    elif task_counts.get(entry.user_id, MAX_CONCURRENT_TASKS) >= MAX_CONCURRENT_TASKS:
+                        results[entry.user_id] = _bad_request(f"已达到最大并发任务数（{MAX_CONCURRENT_TASKS}个）")
+                    else:
+                        eligible.append(entry)
+
+                seats = max(MAX_MODULE_ASSIGNEES - module.assignee_count, 0)
+                winners = self._rank(policy, eligible)[:seats]
+                if not winners:
+                    await db.rollback()
+                    if seats == 0:
+                        self._mark_full(module_id, policy)
+                    return results
+
+                if await self._assign(db, module_id, module.project_id, module.title, winners):
+                    await db.commit()
+                    principal_cache.invalidate(*(e.user_id for e in winners))
+                    if len(winners) == seats:
+                        self._mark_full(module_id, policy)
+                    results.update({e.user_id: None for e in winners})
+                    return results
+
+                # 其他 worker 同时修改了槽位，重新读取后再结算
+                await db.rollback()
+
+        raise RuntimeError("dispatch conflicted repeatedly")
+
+    async def _assign(self, db, module_id: int, project_id: int, title: str, winners: List[_Entry]) -> bool:
+        """批量占用槽位并写入承接记录（不提交），条件不满足时返回 False"""
+        winner_ids = [e.user_id for e in winners]
+        taken = await db.execute(
+            update(User)
+            .where(User.id.in_(winner_ids), User.concurrent_task_count < MAX_CONCURRENT_TASKS)
+            .values(concurrent_task_count=User.concurrent_task_count + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if taken.rowcount != len(winner_ids):
+            return False
+
+        seats = await db.execute(
+            update(Module)
+            .where(
+                Module.id == module_id,
+                Module.status == "open",
+                Module.assignee_count + len(winner_ids) <= MAX_MODULE_ASSIGNEES
+            )
+            .values(assignee_count=Module.assignee_count + len(winner_ids))
+            .execution_options(synchronize_session=False)
+        )
+        if seats.rowcount != 1:
+            return False
+        module_features.mark_dirty_on_commit(db, [module_id])
+        query_cache.invalidate_on_commit(db, module_tag(module_id), project_tag(project_id))
+
+        await db.execute(
+            insert(ModuleAssignee),
+            [{"module_id": module_id, "user_id": user_id} for user_id in winner_ids]
+        )
+
+        commander_ids = await commander_cache.get_ids(db)
+        rows = []
+        for entry in winners:
+            rows += build_notifications(
+                commander_ids,
+                type=NotificationType.MODULE_ASSIGNED,
+                title="任务已被承接",
+                content=f"节点「{entry.username}」已承接任务「{title}」",
+                related_module_id=module_id
+            )
+        await insert_notifications(db, rows)
+        return True
+
+    def _mark_full(self, module_id: int, policy: str) -> None:
+        if self.full_cache_seconds > 0:
+            self._full_until[module_id] = (time.monotonic() + self.full_cache_seconds, policy)
+
+    def metrics(self) -> dict:
+        return {
+            "window_ms": self.window_ms,
+            "open_windows": len(self._windows),
+            "batches": self.batches,
+            "requests": self.requests,
+            "winners": self.winners,
+            "fast_rejections": self.fast_rejections,
+        }
+
+
+dispatch_queue = DispatchQueue(
+    window_ms=settings.DISPATCH_WINDOW_MS,
+    full_cache_seconds=settings.DISPATCH_FULL_CACHE_SECONDS,
+)
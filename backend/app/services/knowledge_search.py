@@ -0,0 +1,188 @@
+"""
+知识库全文检索
+
+检索范围：标题、描述和提取出的文件文本（content_text）
+
+- PostgreSQL：knowledge_items.search_vector（tsvector 生成列，GIN 索引），ts_rank_cd 排序；
+  'simple' 分词不切分中文，含中日韩字符的检索词改为子串匹配（pg_trgm GIN 索引）
+- SQLite：knowledge_items_fts（FTS5 外部内容表，trigram 分词，按子串匹配），bm25 排序；
+  trigram 至少需要 3 个字符，更短的检索词退回对原表的 LIKE 子串匹配
+
+查询语法：
+- 普通词：全部词都要匹配
+- "短语"：按顺序相邻匹配
+- 前缀*：前缀匹配
+
+结果按相关度倒序（相同时按 id 倒序），游标编码上一页最后一行的 (score, id)。
+"""
+import re
+from functools import reduce
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, ColumnElement, Float, Integer, select, func, text, literal, literal_column, case, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_payload, decode_payload
+from app.models.knowledge_item import KnowledgeItem, SEARCH_TEXT_SQL
+
+# 以字面量传入 regconfig，避免驱动对 regconfig 参数的类型推断
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+_TOKEN_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+# 中日韩字符（假名、汉字、兼容汉字、谚文）
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]")
+
+# FTS5 trigram 分词只能匹配至少 3 个字符的子串
+TRIGRAM_MIN_CHARS = 3
+
+# 子串匹配的列权重（标题、描述、文件内容），与各方言的全文检索权重一致
+POSTGRES_SUBSTRING_WEIGHTS = (1.0, 0.4, 0.2)  # ts_rank_cd 的 A/B/C 默认权重
+SQLITE_SUBSTRING_WEIGHTS = (10.0, 5.0, 1.0)  # bm25 列权重
+
+
+def parse_search_query(search: str) -> List[Tuple[str, str]]:
+    """将搜索串解析为 [(kind, text)]，kind 为 word / prefix / phrase"""
+    terms = []
+    for phrase, word in _TOKEN_PATTERN.findall(search):
+        if phrase:
+            phrase = " ".join(re.findall(r"\w+", phrase))
+            if phrase:
+                terms.append(("phrase", phrase))
+            continue
+
+        is_prefix = word.endswith("*")
+        for part in re.findall(r"\w+", word):
+            terms.append(("word", part))
+        if is_prefix and terms and terms[-1][0] == "word":
+            terms[-1] = ("prefix", terms[-1][1])
+    return terms
+
+
+def _like_pattern(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _substring_match(values: List[str], weights: Tuple[float, float, float]):
+    """子串匹配：返回 (条件列表, 相关度表达式)，每个词命中标题、描述、文件内容分别计分"""
+    search_text = literal_column(SEARCH_TEXT_SQL)
+    columns = (KnowledgeItem.title, KnowledgeItem.description, KnowledgeItem.content_text)
+
+    conditions, score = [], literal(0.0)
+    for value in values:
+        pattern = _like_pattern(value)
+        conditions.append(search_text.ilike(pattern, escape="\\"))
+        for column, weight in zip(columns, weights):
+            score = score + case((column.ilike(pattern, escape="\\"), weight), else_=0.0)
+    return conditions, score
+
+
+def _postgres_scores(terms: List[Tuple[str, str]]):
+    search_vector = literal_column("knowledge_items.search_vector")
+
+    def to_tsquery(kind: str, value: str):
+        if kind == "phrase":
+            return func.phraseto_tsquery(TS_CONFIG, value)
+        if kind == "prefix":
+            # value 只含 \w 字符，可以安全拼接 tsquery 语法
+            return func.to_tsquery(TS_CONFIG, f"{value}:*")
+        return func.plainto_tsquery(TS_CONFIG, value)
+
+    # 含中日韩字符的词在 tsvector 中不是独立的词，改用子串匹配
+    word_terms = [(kind, value) for kind, value in terms if not _CJK_PATTERN.search(value)]
+    substring_terms = [value for _kind, value in terms if _CJK_PATTERN.search(value)]
+
+    conditions, score = _substring_match(substring_terms, POSTGRES_SUBSTRING_WEIGHTS)
+    if word_terms:
+        tsquery = reduce(lambda a, b: a.op("&&")(b), [to_tsquery(kind, value) for kind, value in word_terms])
+        conditions.append(search_vector.op("@@")(tsquery))
+        score = score + func.ts_rank_cd(search_vector, tsquery)
+
+    return (
+        select(KnowledgeItem.id.label("id"), score.label("score"))
+        .where(*conditions)
+        .subquery("search_scores")
+    )
+
+
+def _sqlite_match_expression(terms: List[Tuple[str, str]]) -> str:
+    def quote(value: str) -> str:
+        return '"' + value.replace('"', '""') + '"'
+
+    parts = []
+    for kind, value in terms:
+        parts.append(quote(value) + ("*" if kind == "prefix" else ""))
+    return " ".join(parts)
+
+
+def _sqlite_scores(terms: List[Tuple[str, str]]):
+    match_terms = [(kind, value) for kind, value in terms if len(value) >= TRIGRAM_MIN_CHARS]
+    short_terms = [value for _kind, value in terms if len(value) < TRIGRAM_MIN_CHARS]
+
+    conditions, score = _substring_match(short_terms, SQLITE_SUBSTRING_WEIGHTS)
+    query = select(KnowledgeItem.id.label("id"))
+    if match_terms:
+        # bm25 越小越相关，取负数使其与 PostgreSQL 一样按 score 倒序；
+        # 列权重：标题 > 描述 > 文件内容，对应 PostgreSQL 的 A/B/C 权重
+        fts = (
+            text(
+                "SELECT rowid AS id, -bm25(knowledge_items_fts, 10.0, 5.0, 1.0) AS score "
+                "FROM knowledge_items_fts WHERE knowledge_items_fts MATCH :match"
+            )
+            .bindparams(match=_sqlite_match_expression(match_terms))
+            .columns(id=Integer, score=Float)
+            .subquery("fts_scores")
+        )
+        query = query.join(fts, fts.c.id == KnowledgeItem.id)
+        score = score + fts.c.score
+
+    return query.add_columns(score.label("score")).where(*conditions).subquery("search_scores")
+
+
+def apply_search(db: AsyncSession, query: Select, search: str) -> Optional[Tuple[Select, ColumnElement]]:
+    """在知识查询上加入全文检索条件
+
+    返回 (加入检索后的查询, 相关度列)，查询会额外返回相关度列；
+    搜索串中没有可检索的词时返回 None。
+    """
+    terms = parse_search_query(search)
+    if not terms:
+        return None
+
+    if db.bind.dialect.name == "postgresql":
+        scores = _postgres_scores(terms)
+    else:
+        scores = _sqlite_scores(terms)
+
+    query = query.join(scores, KnowledgeItem.id == scores.c.id).add_columns(scores.c.score)
+    return query, scores.c.score
+
+
+def search_paginate(query: Select, score: ColumnElement, cursor: Optional[str], limit: int) -> Select:
+    """按相关度倒序排列并应用 (score, id) 游标，多取一行判断是否有下一页"""
+    if cursor:
+        payload = decode_payload(cursor)
+        try:
+            last_score, last_id = float(payload["s"]), int(payload["i"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+        query = query.where(
+            or_(
+                score < last_score,
+                and_(score == last_score, KnowledgeItem.id < last_id),
+            )
+        )
+
+    return query.order_by(score.desc(), KnowledgeItem.id.desc()).limit(limit + 1)
+
+
+def build_search_page(rows, limit: int, response: Response) -> list:
+    """截取当前页的知识条目，并在还有下一页时设置游标响应头"""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_item, last_score = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_payload({"s": last_score, "i": last_item.id})
+    return [item for item, _score in rows]
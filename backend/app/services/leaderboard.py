@@ -0,0 +1,317 @@
+"""
+信誉分排行榜
+
+所有用户按 (信誉分降序, 用户 id) 排列在内存中的可索引跳表里，
+插入、删除、查名次和按名次取用户都是 O(log n)，取 top-K 或某个用户前后的邻居
+只需定位一次再沿底层链表走 K 步，不需要每次请求对 users 表排序。
+
+- 启动时（或第一次请求时）从数据库整体加载
+- User 的 ORM 修改（注册、验收改变信誉分、删除）在提交后增量更新
+- 每隔 LEADERBOARD_REBUILD_MINUTES 整体重建一次，覆盖批量语句和其他 worker 的修改
+
+名次采用竞赛排名（同分同名次，如 1、2、2、4）。
+"""
+import asyncio
+import random
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+
+_PENDING_KEY = "leaderboard_pending"
+_FLUSHING_KEY = "leaderboard_flushing"
+
+_MAX_LEVEL = 32
+_P = 0.25
+
+
+class _Node:
+    __slots__ = ("key", "forward", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        # width[i]：沿第 i 层指针前进一步跨过的底层节点数
+        self.width: List[int] = [1] * level
+
+
+class IndexableSkipList:
+    """有序、可按名次索引的跳表（键需可比较且唯一）"""
+
+    def __init__(self):
+        self._head = _Node(None, _MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_sorted(cls, keys: list) -> "IndexableSkipList":
+        """由已排序的键 O(n) 构建"""
+        skiplist = cls()
+        last = [skiplist._head] * _MAX_LEVEL
+        last_pos = [-1] * _MAX_LEVEL
+        for index, key in enumerate(keys):
+            level = cls._random_level()
+            skiplist._level = max(skiplist._level, level)
+            node = _Node(key, level)
+            for i in range(level):
+                last[i].forward[i] = node
+                last[i].width[i] = index - last_pos[i]
+                last[i], last_pos[i] = node, index
+        # 每层最后一个节点的跨度延伸到表尾之后
+        for i in range(_MAX_LEVEL):
+            last[i].width[i] = len(keys) - last_pos[i]
+        skiplist._size = len(keys)
+        return skiplist
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < _P:
+            level += 1
+        return level
+
+    def _find(self, key) -> Tuple[List[_Node], List[int]]:
+        """返回每层最后一个小于 key 的节点及其底层位置（头节点位置为 -1）"""
+        update = [self._head] * _MAX_LEVEL
+        position = [-1] * _MAX_LEVEL
+        node, pos = self._head, -1
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and node.forward[i].key < key:
+                pos += node.width[i]
+                node = node.forward[i]
+            update[i] = node
+            position[i] = pos
+        return update, position
+
+    def insert(self, key) -> None:
+        update, position = self._find(key)
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                update[i] = self._head
+                position[i] = -1
+                self._head.width[i] = self._size + 1
+            self._level = level
+
+        node = _Node(key, level)
+        index = position[0] + 1
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            before = index - position[i]
+            node.width[i] = update[i].width[i] - before + 1
+            update[i].width[i] = before
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        update, _ = self._find(key)
+        node = update[0].forward[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._size -= 1
+        return True
+
+    def bisect_left(self, key) -> int:
+        """小于 key 的元素个数"""
+        _, position = self._find(key)
+        return position[0] + 1
+
+    def _node_at(self, index: int) -> _Node:
+        node, pos = self._head, -1
+        for i in range(self._level - 1, -1, -1):
+            while node.forward[i] is not None and pos + node.width[i] <= index:
+                pos += node.width[i]
+                node = node.forward[i]
+        return node
+
+    def slice(self, start: int, count: int) -> list:
+        """从名次 start（0 起）开始取 count 个键"""
+        if start < 0:
+            count += start
+            start = 0
+        if count <= 0 or start >= self._size:
+            return []
+        node = self._node_at(start)
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.forward[0]
+        return keys
+
+
+class Leaderboard:
+    def __init__(self, rebuild_minutes: int):
+        self.rebuild_minutes = rebuild_minutes
+        self._ranking = IndexableSkipList()
+        # 用户 id -> (信誉分, 用户名, 角色)
+        self._users: Dict[int, Tuple[float, str, str]] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        # 重建期间提交的修改，重建完成后重放
+        self._replay: Optional[dict] = None
+        self.rebuilds = 0
+        self.updates = 0
+
+    @staticmethod
+    def _key(user_id: int, score: float) -> tuple:
+        return (-score, user_id)
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        async with self._lock:
+            self._replay = {}
+            try:
+                result = await db.execute(select(User.id, User.reputation_score, User.username, User.role))
+                rows = result.all()
+            except BaseException:
+                self._replay = None
+                raise
+
+            users = {user_id: (score, username, role) for user_id, score, username, role in rows}
+            self._ranking = IndexableSkipList.from_sorted(
+                sorted(self._key(user_id, values[0]) for user_id, values in users.items())
+            )
+            self._users = users
+            self._loaded = True
+            self.rebuilds += 1
+
+            replay, self._replay = self._replay, None
+            for user_id, values in replay.items():
+                self._apply(user_id, values)
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self._loaded:
+            await self.rebuild(db)
+
+    def update(self, user_id: int, score: float, username: str, role: str) -> None:
+        """新增或更新一个用户"""
+        self._record(user_id, (score, username, role))
+
+    def remove(self, user_id: int) -> None:
+        self._record(user_id, None)
+
+    def _record(self, user_id: int, values: Optional[tuple]) -> None:
+        if self._replay is not None:
+            self._replay[user_id] = values
+        # 未加载时忽略，加载时会读到最新值
+        if self._loaded:
+            self._apply(user_id, values)
+            self.updates += 1
+
+    def _apply(self, user_id: int, values: Optional[tuple]) -> None:
+        current = self._users.get(user_id)
+        if current is not None and (values is None or current[0] != values[0]):
+            self._ranking.remove(self._key(user_id, current[0]))
+        if values is None:
+            self._users.pop(user_id, None)
+            return
+        if current is None or current[0] != values[0]:
+            self._ranking.insert(self._key(user_id, values[0]))
+        self._users[user_id] = values
+
+    def __len__(self) -> int:
+        return len(self._ranking)
+
+    def rank_of(self, user_id: int) -> Optional[int]:
+        """竞赛排名（1 起），用户不存在时返回 None"""
+        current = self._users.get(user_id)
+        if current is None:
+            return None
+        # 分数更高的用户数 + 1
+        return self._ranking.bisect_left((-current[0], float("-inf"))) + 1
+
+    def _entries(self, keys: list) -> List[dict]:
+        entries = []
+        for neg_score, user_id in keys:
+            score, username, role = self._users[user_id]
+            entries.append({
+                "rank": self._ranking.bisect_left((neg_score, float("-inf"))) + 1,
+                "user_id": user_id,
+                "username": username,
+                "role": role,
+                "reputation_score": score,
+            })
+        return entries
+
+    def top(self, limit: int, offset: int = 0) -> List[dict]:
+        return self._entries(self._ranking.slice(offset, limit))
+
+    def around(self, user_id: int, radius: int) -> List[dict]:
+        """用户本人及其前后各 radius 名"""
+        current = self._users.get(user_id)
+        if current is None:
+            return []
+        index = self._ranking.bisect_left(self._key(user_id, current[0]))
+        return self._entries(self._ranking.slice(index - radius, 2 * radius + 1))
+
+    def metrics(self) -> dict:
+        return {
+            "loaded": self._loaded,
+            "users": len(self._ranking),
+            "rebuilds": self.rebuilds,
+            "updates": self.updates,
+        }
+
+
+leaderboard = Leaderboard(rebuild_minutes=settings.LEADERBOARD_REBUILD_MINUTES)
+
+
+def _ranking_changed(user: User) -> bool:
+    state = inspect(user)
+    return any(state.attrs[attr].history.has_changes() for attr in ("reputation_score", "username", "role"))
+
+
+@event.listens_for(Session, "before_flush")
+def _track_user_changes(session, flush_context, instances):
+    # 属性历史在 flush 后被重置，需在 flush 前判断；新用户的 id 在 flush 后才有值
+    changed = [
+        obj for obj in (*session.new, *session.dirty)
+        if isinstance(obj, User) and (obj in session.new or _ranking_changed(obj))
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, User)]
+    if changed or deleted:
+        session.info[_FLUSHING_KEY] = (changed, deleted)
+
+
+@event.listens_for(Session, "after_flush")
+def _snapshot_user_changes(session, flush_context):
+    flushing = session.info.pop(_FLUSHING_KEY, None)
+    if flushing is None:
+        return
+    changed, deleted = flushing
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for user in changed:
+        pending[user.id] = (user.reputation_score, user.username, user.role)
+    for user in deleted:
+        pending[user.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    for user_id, values in session.info.pop(_PENDING_KEY, {}).items():
+        if values is None:
+            leaderboard.remove(user_id)
+        else:
+            leaderboard.update(user_id, *values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_FLUSHING_KEY, None)
+    session.info.pop(_PENDING_KEY, None)
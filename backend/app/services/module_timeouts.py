@@ -0,0 +1,135 @@
+"""
+模块超时扫描
+
+按批处理已过截止时间的模块：每批先选出候选模块（PostgreSQL 下 FOR UPDATE SKIP LOCKED，
+并发的扫描互不阻塞），再用一条 UPDATE ... RETURNING 标记超时，
+最后用一条多行 INSERT 写入这一批的全部超时通知，每批单独提交，不持有长事务。
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.query_cache import query_cache, module_tag, project_tag
+from app.models.module import Module
+from app.models.module_assignee import ModuleAssignee
+from app.models.notification import NotificationType
+from app.services.notifications import commander_cache, build_notifications, insert_notifications
+from app.services.recommendations import module_features
+
+ACTIVE_STATUSES = ("open", "in_progress")
+
+# 最近一次扫描结果和累计值
+timeout_scan_metrics: dict = {
+    "runs": 0,
+    "total_marked": 0,
+    "total_notified": 0,
+    "last_run": None,
+}
+
+
+def _pending_timeout_conditions(now: datetime) -> list:
+    return [
+        Module.deadline < now,
+        Module.is_timeout == False,
+        Module.status.in_(ACTIVE_STATUSES),
+    ]
+
+
+async def mark_timeouts(db: AsyncSession, now: datetime, module_ids: list) -> tuple:
+    """将给定模块中确实已超时的标记为超时并发送通知（不提交），返回 (标记数, 通知数)"""
+    # 条件与候选查询相同，避免覆盖候选选出后被改变状态的模块
+    marked = await db.execute(
+        update(Module)
+        .where(Module.id.in_(module_ids), *_pending_timeout_conditions(now))
+        .values(is_timeout=True)
+        .returning(Module.id, Module.title, Module.project_id)
+        .execution_options(synchronize_session=False)
+    )
+    modules = marked.all()
+    if not modules:
+        return 0, 0
+    module_features.mark_dirty_on_commit(db, [m.id for m in modules])
+    query_cache.invalidate_on_commit(
+        db,
+        *(module_tag(m.id) for m in modules),
+        *(project_tag(m.project_id) for m in modules)
+    )
+
+    assignees_result = await db.execute(
+        select(ModuleAssignee.module_id, ModuleAssignee.user_id)
+        .where(ModuleAssignee.module_id.in_([m.id for m in modules]))
+    )
+    assignees = defaultdict(list)
+    for module_id, user_id in assignees_result.all():
+        assignees[module_id].append(user_id)
+
+    commander_ids = await commander_cache.get_ids(db)
+
+    rows = []
+    for module in modules:
+        assignee_ids = assignees[module.id]
+        rows += build_notifications(
+            assignee_ids,
+            type=NotificationType.MODULE_TIMEOUT,
+            title="任务超时提醒",
+            content=f"您承接的任务「{module.title}」已超时，请尽快完成或申请放弃。",
+            related_module_id=module.id
+        )
+        rows += build_notifications(
+            commander_ids,
+            type=NotificationType.MODULE_TIMEOUT,
+            title="任务超时提醒",
+            content=f"模块「{module.title}」已超时，当前有 {len(assignee_ids)} 名承接人。",
+            related_module_id=module.id
+        )
+    notified = await insert_notifications(db, rows)
+
+    return len(modules), notified
+
+
+async def _process_batch(db: AsyncSession, now: datetime, batch_size: int) -> tuple:
+    """处理一批超时模块（不提交），返回 (候选数, 标记数, 通知数)"""
+    candidates = await db.execute(
+        select(Module.id)
+        .where(*_pending_timeout_conditions(now))
+        .order_by(Module.deadline, Module.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    candidate_ids = candidates.scalars().all()
+    if not candidate_ids:
+        return 0, 0, 0
+
+    marked, notified = await mark_timeouts(db, now, candidate_ids)
+    return len(candidate_ids), marked, notified
+
+
+async def scan_module_timeouts(db: AsyncSession, batch_size: int = 500, max_batches: int = 100) -> dict:
+    """扫描并标记超时模块、发送通知，每批单独提交；返回本次运行的指标"""
+    started = time.monotonic()
+    # 与模块截止时间的存储方式保持一致（UTC，不带时区）
+    now = datetime.utcnow()
+    run = {"batches": 0, "scanned": 0, "marked": 0, "notified": 0}
+
+    while run["batches"] < max_batches:
+        scanned, marked, notified = await _process_batch(db, now, batch_size)
+        await db.commit()
+
+        run["batches"] += 1
+        run["scanned"] += scanned
+        run["marked"] += marked
+        run["notified"] += notified
+        if scanned < batch_size:
+            break
+
+    run["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    run["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+    timeout_scan_metrics["runs"] += 1
+    timeout_scan_metrics["total_marked"] += run["marked"]
+    timeout_scan_metrics["total_notified"] += run["notified"]
+    timeout_scan_metrics["last_run"] = run
+    return run
@@ -0,0 +1,188 @@
+"""
+进程内通知发布/订阅
+
+通知写入方在事务提交后发布事件（见 app.services.notifications），
+SSE / WebSocket 连接按用户订阅。每个连接有一个有界队列，
+消费过慢导致队列写满时连接被标记为溢出，由推送端通知客户端重新同步。
+
+事件：
+- notification：新通知，id 为通知 id（用于 Last-Event-ID 断线续传）
+- unread：未读数变化，data 为 {"delta": n} 或 {"unread_count": n}
+
+多进程部署（多个 worker / 多台机器）时需设置 REDIS_URL：事件先推送给本进程的连接，
+再经 Redis 频道转发给其他进程，各进程跳过自己发出的消息。
+未设置 REDIS_URL 时总线只在进程内，SSE / WebSocket 需要单 worker 部署，
+否则连接在其他进程上的用户收不到实时事件（重连时通过 Last-Event-ID 从数据库补齐）。
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def offer(self, event: dict) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+
+class RedisRelay:
+    """经 Redis 发布/订阅在进程间转发事件，client 为 redis.asyncio.Redis 或兼容的替身"""
+
+    def __init__(self, client, channel: str = "nexus:notifications", outbox_size: int = 10000):
+        self._client = client
+        self._channel = channel
+        self.origin = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=outbox_size)
+        self._tasks: list = []
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRelay":
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("REDIS_URL 已设置，通知转发需要安装 redis 包（pip install redis）")
+        return cls(Redis.from_url(url))
+
+    def send(self, message: dict) -> None:
+        """登记一条待转发的消息（不阻塞，发送队列写满时丢弃）"""
+        try:
+            self._outbox.put_nowait(json.dumps({"origin": self.origin, **message}))
+        except asyncio.QueueFull:
+            self.errors += 1
+
+    async def start(self, deliver) -> None:
+        self._tasks = [
+            asyncio.create_task(self._send_loop()),
+            asyncio.create_task(self._receive_loop(deliver)),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _send_loop(self) -> None:
+        while True:
+            payload = await self._outbox.get()
+            try:
+                await self._client.publish(self._channel, payload)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Notification relay publish failed: {e}")
+
+    async def _receive_loop(self, deliver) -> None:
+        # 连接断开后重新订阅；断开期间其他进程的事件由客户端重连时从数据库补齐
+        while True:
+            try:
+                pubsub = self._client.pubsub()
+                await pubsub.subscribe(self._channel)
+                async for raw in pubsub.listen():
+                    if raw.get("type") != "message":
+                        continue
+                    message = json.loads(raw["data"])
+                    if message.pop("origin", None) == self.origin:
+                        continue
+                    self.received += 1
+                    deliver(**message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Notification relay receive failed: {e}")
+                await asyncio.sleep(1)
+
+    def metrics(self) -> dict:
+        return {
+            "relay": "redis",
+            "relay_sent": self.sent,
+            "relay_received": self.received,
+            "relay_pending": self._outbox.qsize(),
+            "relay_errors": self.errors,
+        }
+
+
+class NotificationBus:
+    def __init__(self, relay: Optional[RedisRelay] = None):
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self.relay = relay
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    async def start(self) -> None:
+        """启动进程间转发（设置了 relay 时）"""
+        if self.relay:
+            await self.relay.start(self._deliver)
+
+    async def stop(self) -> None:
+        if self.relay:
+            await self.relay.stop()
+
+    def subscribe(self, user_id: int, maxsize: int) -> Subscription:
+        subscription = Subscription(user_id, maxsize)
+        self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: int, event: str, data: dict, event_id: Optional[int] = None) -> None:
+        """向用户的所有连接发布事件（不阻塞）"""
+        self.published += 1
+        self._deliver(user_id, event, data, event_id)
+        if self.relay:
+            self.relay.send({"user_id": user_id, "event": event, "data": data, "event_id": event_id})
+
+    def _deliver(self, user_id: int, event: str, data: dict, event_id: Optional[int] = None) -> None:
+        """推送给本进程中该用户的连接"""
+        for subscription in self._subscriptions.get(user_id, ()):
+            was_overflowed = subscription.overflowed
+            if subscription.offer({"event": event, "id": event_id, "data": data}):
+                self.delivered += 1
+            elif not was_overflowed:
+                self.overflows += 1
+
+    def metrics(self) -> dict:
+        metrics = {
+            "connected_users": len(self._subscriptions),
+            "connections": sum(len(s) for s in self._subscriptions.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+        metrics.update(self.relay.metrics() if self.relay else {"relay": "none"})
+        return metrics
+
+
+notification_bus = NotificationBus(
+    relay=RedisRelay.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+)
@@ -0,0 +1,460 @@
+"""
+通知扇出
+
+所有通知写入都经过这里：一次事件的全部通知行用一条多行 INSERT 写入，
+与接收人数量无关。
+
+每个用户的未读数物化在 notification_counters 中，与通知写入、已读标记在同一事务中更新；
+定时任务 reconcile_unread_counts 修正可能出现的偏差。
+
+写入的通知和未读数变化在事务提交后发布到 notification_bus（实时推送），回滚则丢弃。
+
+指挥官 id 集合缓存在 query_cache 中（标签 commanders），User 新增、删除或修改角色后在提交时失效；
+使用批量 UPDATE 语句修改 users.role 时需调用 commander_cache.invalidate_on_commit()。
+"""
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, func, insert, inspect, literal, select, update, delete, case
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.query_cache import query_cache, COMMANDERS_TAG
+from app.models.notification import Notification, NotificationArchive
+from app.models.notification_counter import NotificationCounter
+from app.models.user import User
+from app.services.notification_bus import notification_bus
+
+# 每条通知行 7 个参数，asyncpg 单条语句最多 32767 个参数
+MAX_ROWS_PER_STATEMENT = 4000
+
+_EVENTS_KEY = "notification_events"
+
+
+class CommanderCache:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.loads = 0
+        self.size = 0
+
+    async def get_ids(self, db: AsyncSession) -> frozenset:
+        """返回全部指挥官 id"""
+        async def load() -> List[int]:
+            self.loads += 1
+            result = await db.execute(
+                select(User.id).where(func.lower(User.role) == "commander")
+            )
+            ids = sorted(set(result.scalars().all()))
+            self.size = len(ids)
+            return ids
+
+        return frozenset(await query_cache.get_or_load("commander_ids", [COMMANDERS_TAG], load, self.ttl_seconds))
+
+    def invalidate_on_commit(self, session) -> None:
+        query_cache.invalidate_on_commit(session, COMMANDERS_TAG)
+
+    def metrics(self) -> dict:
+        # 命中率等见 query_cache 的指标
+        return {
+            "size": self.size,
+            "ttl_seconds": self.ttl_seconds,
+            "loads": self.loads,
+        }
+
+
+commander_cache = CommanderCache(ttl_seconds=settings.COMMANDER_CACHE_TTL_SECONDS)
+
+
+def _role_changed(user: User) -> bool:
+    return inspect(user).attrs.role.history.has_changes()
+
+
+@event.listens_for(Session, "before_flush")
+def _track_commander_changes(session, flush_context, instances):
+    # 角色变更历史在 flush 后被重置，需在 flush 前记录
+    changed = any(
+        isinstance(obj, User) and (obj.role or "").lower() == "commander"
+        for obj in (*session.new, *session.deleted)
+    ) or any(
+        isinstance(obj, User) and _role_changed(obj) for obj in session.dirty
+    )
+    if changed:
+        commander_cache.invalidate_on_commit(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for user_id, event_name, data, event_id in session.info.pop(_EVENTS_KEY, ()):
+        notification_bus.publish(user_id, event_name, data, event_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_EVENTS_KEY, None)
+
+
+def queue_event(db: AsyncSession, user_id: int, event_name: str, data: dict, event_id: Optional[int] = None) -> None:
+    """登记一个推送事件，在当前事务提交后发布"""
+    db.info.setdefault(_EVENTS_KEY, []).append((user_id, event_name, data, event_id))
+
+
+def _dialect_insert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+async def adjust_unread_counts(db: AsyncSession, deltas: Dict[int, int]) -> None:
+    """按 {user_id: 变化量} 更新未读计数（不提交），提交后推送变化量
+
+    增加用一条 upsert 完成；减少只在计数行存在时更新，且不会小于 0。
+    按 user_id 排序写入，保持并发事务的加锁顺序一致。
+    """
+    increments = sorted((user_id, delta) for user_id, delta in deltas.items() if delta > 0)
+    decrements = sorted((user_id, -delta) for user_id, delta in deltas.items() if delta < 0)
+
+    if increments:
+        stmt = _dialect_insert(db)(NotificationCounter).values(
+            [{"user_id": user_id, "unread_count": delta} for user_id, delta in increments]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={"unread_count": NotificationCounter.unread_count + stmt.excluded.unread_count}
+        )
+        await db.execute(stmt)
+
+    for user_id, amount in decrements:
+        await db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(unread_count=case(
+                (NotificationCounter.unread_count > amount, NotificationCounter.unread_count - amount),
+                else_=0
+            ))
+        )
+
+    for user_id, delta in deltas.items():
+        if delta:
+            queue_event(db, user_id, "unread", {"delta": delta})
+
+
+async def get_unread_count(db: AsyncSession, user_id: int) -> int:
+    """读取物化的未读数"""
+    count = await db.scalar(
+        select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id)
+    )
+    return count or 0
+
+
+# ---------------------------------------------------------------------------
+# 批量操作（每个操作一条 UPDATE / DELETE）
+# ---------------------------------------------------------------------------
+
+def notification_filter(
+    user_id: int,
+    ids: Optional[List[int]] = None,
+    type: Optional[str] = None,
+    before: Optional[datetime] = None
+) -> list:
+    """构建某个用户的通知筛选条件"""
+    conditions = [Notification.recipient_id == user_id]
+    if ids is not None:
+        conditions.append(Notification.id.in_(ids))
+    if type:
+        conditions.append(Notification.type == type)
+    if before:
+        conditions.append(Notification.created_at < before)
+    return conditions
+
+
+async def mark_read(db: AsyncSession, user_id: int, conditions: list) -> int:
+    """将符合条件的未读通知标记为已读（不提交），返回标记数"""
+    result = await db.execute(
+        update(Notification)
+        .where(*conditions, Notification.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        await adjust_unread_counts(db, {user_id: -result.rowcount})
+    return result.rowcount
+
+
+async def _release_unread(db: AsyncSession, rows) -> None:
+    """删除或归档的行中仍未读的，从未读计数中扣除"""
+    unread = Counter(row.recipient_id for row in rows if not row.is_read)
+    if unread:
+        await adjust_unread_counts(db, {user_id: -count for user_id, count in unread.items()})
+
+
+async def delete_notifications(db: AsyncSession, conditions: list) -> int:
+    """删除符合条件的通知（不提交），返回删除数"""
+    result = await db.execute(
+        delete(Notification)
+        .where(*conditions)
+        .returning(Notification.recipient_id, Notification.is_read)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    await _release_unread(db, rows)
+    return len(rows)
+
+
+async def archive_notifications(db: AsyncSession, conditions: list) -> int:
+    """将符合条件的通知移入 notification_archive（不提交），返回归档数"""
+    columns = [
+        Notification.id, Notification.recipient_id, Notification.type, Notification.title,
+        Notification.content, Notification.is_read, Notification.related_module_id,
+        Notification.created_at,
+    ]
+    # 原通知 id 写入 notification_id，归档行使用自己的主键
+    names = ["notification_id"] + [column.key for column in columns[1:]]
+    returning = (NotificationArchive.recipient_id, NotificationArchive.is_read)
+
+    if db.bind.dialect.name == "postgresql":
+        # WITH moved AS (DELETE ... RETURNING ...) INSERT INTO notification_archive SELECT ...
+        moved = (
+            delete(Notification)
+            .where(*conditions)
+            .returning(*columns)
+            .cte("moved")
+        )
+        result = await db.execute(
+            insert(NotificationArchive)
+            .from_select(names, select(*[moved.c[column.key] for column in columns]))
+            .returning(*returning)
+        )
+        rows = result.all()
+    else:
+        # SQLite 不支持 CTE 中的 DELETE；写事务串行执行，两条语句之间不会有新写入
+        result = await db.execute(
+            insert(NotificationArchive)
+            .from_select(names, select(*columns).where(*conditions))
+            .returning(*returning)
+        )
+        rows = result.all()
+        await db.execute(
+            delete(Notification)
+            .where(*conditions)
+            .execution_options(synchronize_session=False)
+        )
+
+    await _release_unread(db, rows)
+    return len(rows)
+
+
+# 最近一次保留期清理结果
+retention_metrics: dict = {"last_run_at": None, "mode": None, "removed": 0, "batches": 0, "duration_ms": 0}
+
+
+async def prune_notifications(
+    db: AsyncSession,
+    cutoff: datetime,
+    mode: str = "delete",
+    batch_size: int = 1000,
+    max_batches: int = 100
+) -> int:
+    """按批删除或归档 cutoff 之前创建的已读通知，每批单独提交；返回处理的行数"""
+    removed = 0
+    batches = 0
+    started = time.monotonic()
+
+    while batches < max_batches:
+        batch_ids = (
+            select(Notification.id)
+            .where(Notification.is_read == True, Notification.created_at < cutoff)
+            .order_by(Notification.created_at, Notification.id)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        conditions = [Notification.id.in_(batch_ids)]
+        if mode == "archive":
+            count = await archive_notifications(db, conditions)
+        else:
+            count = await delete_notifications(db, conditions)
+        await db.commit()
+
+        removed += count
+        batches += 1
+        if count < batch_size:
+            break
+
+    retention_metrics.update(
+        last_run_at=datetime.now(timezone.utc).isoformat(),
+        mode=mode,
+        removed=removed,
+        batches=batches,
+        duration_ms=round((time.monotonic() - started) * 1000, 1),
+    )
+    return removed
+
+
+# 最近一次对账结果
+reconcile_metrics: dict = {"last_run_at": None, "checked_users": 0, "corrected": 0, "duration_ms": 0}
+
+
+async def reconcile_unread_counts(db: AsyncSession, batch_size: int = 500) -> int:
+    """将未读计数与 notifications 表的实际未读数对齐，返回修正的用户数（会提交）
+
+    先用两次读取找出可能不一致的用户（不是一致快照，只作为候选），
+    再按批锁定候选用户的计数行后重新计数：并发写入者在同一事务中写通知并增减计数，
+    持有计数行锁时，已提交的写入都已计入，未提交的写入随后在修正后的值上增减，
+    不会被较小的旧计数覆盖。
+    """
+    started = time.monotonic()
+
+    actual_result = await db.execute(
+        select(Notification.recipient_id, func.count(Notification.id))
+        .where(Notification.is_read == False)
+        .group_by(Notification.recipient_id)
+    )
+    actual = dict(actual_result.all())
+
+    stored_result = await db.execute(
+        select(NotificationCounter.user_id, NotificationCounter.unread_count)
+    )
+    stored = dict(stored_result.all())
+    # 结束只读事务，之后每批从写入开始（SQLite 上先取得写锁，避免读快照过期）
+    await db.commit()
+
+    candidates = sorted(
+        user_id for user_id in actual.keys() | stored.keys()
+        if actual.get(user_id, 0) != stored.get(user_id, 0)
+    )
+
+    corrected = 0
+    for start in range(0, len(candidates), batch_size):
+        corrected += await _reconcile_batch(db, candidates[start:start + batch_size])
+        await db.commit()
+
+    reconcile_metrics.update(
+        last_run_at=datetime.now(timezone.utc).isoformat(),
+        checked_users=len(actual.keys() | stored.keys()),
+        corrected=corrected,
+        duration_ms=round((time.monotonic() - started) * 1000, 1),
+    )
+    return corrected
+
+
+async def _reconcile_batch(db: AsyncSession, user_ids: List[int]) -> int:
+    """锁定一批用户的计数行后按实际未读数修正（不提交），返回修正数"""
+    # 补齐缺失的计数行（已删除的用户不再补），保证下面每个用户都有行可锁
+    stmt = _dialect_insert(db)(NotificationCounter).from_select(
+        ["user_id", "unread_count"],
+        select(User.id, literal(0)).where(User.id.in_(user_ids))
+    ).on_conflict_do_nothing(index_elements=[NotificationCounter.user_id])
+    await db.execute(stmt)
+
+    # 按 user_id 顺序加锁，与 adjust_unread_counts 一致
+    locked = dict((await db.execute(
+        select(NotificationCounter.user_id, NotificationCounter.unread_count)
+        .where(NotificationCounter.user_id.in_(user_ids))
+        .order_by(NotificationCounter.user_id)
+        .with_for_update()
+    )).all())
+
+    # 持有锁之后再计数
+    actual = dict((await db.execute(
+        select(Notification.recipient_id, func.count(Notification.id))
+        .where(Notification.recipient_id.in_(locked.keys()), Notification.is_read == False)
+        .group_by(Notification.recipient_id)
+    )).all())
+
+    corrections = [
+        {"user_id": user_id, "unread_count": actual.get(user_id, 0)}
+        for user_id, unread_count in locked.items()
+        if actual.get(user_id, 0) != unread_count
+    ]
+    if corrections:
+        await db.execute(update(NotificationCounter), corrections)
+    for row in corrections:
+        queue_event(db, row["user_id"], "unread", {"unread_count": row["unread_count"]})
+    return len(corrections)
+
+
+def notification_payload(notification) -> dict:
+    """通知的响应 / 推送格式"""
+    return {
+        "id": notification.id,
+        "type": notification.type,
+        "title": notification.title,
+        "content": notification.content,
+        "is_read": notification.is_read,
+        "related_module_id": notification.related_module_id,
+        "created_at": notification.created_at,
+    }
+
+
+def build_notifications(
+    recipient_ids: Iterable[int],
+    type: str,
+    title: str,
+    content: str,
+    related_module_id: Optional[int] = None
+) -> List[dict]:
+    """为一组接收人构建相同内容的通知行"""
+    return [
+        {
+            "recipient_id": recipient_id,
+            "type": type,
+            "title": title,
+            "content": content,
+            "is_read": False,
+            "related_module_id": related_module_id,
+        }
+        for recipient_id in sorted(set(recipient_ids))
+    ]
+
+
+async def insert_notifications(db: AsyncSession, rows: List[dict]) -> int:
+    """用多行 INSERT 写入通知行（不提交），返回写入行数
+
+    同时增加接收人的未读计数，提交后推送新通知和未读数变化。
+    """
+    returning = [
+        Notification.id, Notification.recipient_id, Notification.type, Notification.title,
+        Notification.content, Notification.is_read, Notification.related_module_id,
+        Notification.created_at,
+    ]
+    for start in range(0, len(rows), MAX_ROWS_PER_STATEMENT):
+        result = await db.execute(
+            insert(Notification)
+            .values(rows[start:start + MAX_ROWS_PER_STATEMENT])
+            .returning(*returning)
+        )
+        for row in result.all():
+            queue_event(db, row.recipient_id, "notification", notification_payload(row), row.id)
+
+    await adjust_unread_counts(db, Counter(row["recipient_id"] for row in rows))
+    return len(rows)
+
+
+async def notify_users(
+    db: AsyncSession,
+    recipient_ids: Iterable[int],
+    type: str,
+    title: str,
+    content: str,
+    related_module_id: Optional[int] = None
+) -> int:
+    """给指定用户发送通知（不提交）"""
+    return await insert_notifications(
+        db, build_notifications(recipient_ids, type, title, content, related_module_id)
+    )
+
+
+async def notify_commanders(
+    db: AsyncSession,
+    type: str,
+    title: str,
+    content: str,
+    related_module_id: Optional[int] = None
+) -> int:
+    """给全部指挥官发送通知（不提交）"""
+    commander_ids = await commander_cache.get_ids(db)
+    return await notify_users(db, commander_ids, type, title, content, related_module_id)
@@ -0,0 +1,99 @@
+"""
+项目统计（模块进度、赏金、承接和交付数）
+
+一页项目的统计只用一条 GROUP BY 查询（交付数在按模块预聚合的子查询中计算），
+结果按项目缓存在 query_cache 中（标签 project:<id>）。修改模块、承接、交付或验收的
+地方需使所属项目的标签失效（见 app.core.query_cache）。
+"""
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select, func, case, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.query_cache import query_cache, project_tag
+from app.models.delivery import Delivery
+from app.models.module import Module, ModuleStatus
+from app.models.review import Review
+
+MODULE_STATUSES = [s.value for s in ModuleStatus]
+
+
+def _empty_stats() -> dict:
+    return {
+        "module_count": 0,
+        "modules_by_status": {status: 0 for status in MODULE_STATUSES},
+        "timed_out_count": 0,
+        "total_bounty": 0.0,
+        "allocated_bounty": 0.0,
+        "assignee_count": 0,
+        "delivery_count": 0,
+        "reviewed_delivery_count": 0,
+    }
+
+
+async def _query_stats(db: AsyncSession, project_ids: List[int]) -> Dict[int, dict]:
+    # 交付数先按模块聚合，避免与模块行相乘
+    deliveries = (
+        select(
+            Delivery.module_id,
+            func.count(Delivery.id).label("delivery_count"),
+            func.count(func.distinct(Review.delivery_id)).label("reviewed_count"),
+        )
+        .outerjoin(Review, Review.delivery_id == Delivery.id)
+        .where(Delivery.module_id.in_(select(Module.id).where(Module.project_id.in_(project_ids))))
+        .group_by(Delivery.module_id)
+        .subquery()
+    )
+    # 已被承接或已完成的模块计入已分配赏金
+    allocated = or_(Module.assignee_count > 0, Module.status == ModuleStatus.COMPLETED.value)
+
+    result = await db.execute(
+        select(
+            Module.project_id,
+            func.count(Module.id),
+            func.sum(case((Module.is_timeout == True, 1), else_=0)),
+            func.coalesce(func.sum(Module.bounty), 0.0),
+            func.coalesce(func.sum(case((allocated, Module.bounty), else_=0.0)), 0.0),
+            func.coalesce(func.sum(Module.assignee_count), 0),
+            func.coalesce(func.sum(deliveries.c.delivery_count), 0),
+            func.coalesce(func.sum(deliveries.c.reviewed_count), 0),
+            *[func.sum(case((Module.status == status, 1), else_=0)) for status in MODULE_STATUSES],
+        )
+        .outerjoin(deliveries, deliveries.c.module_id == Module.id)
+        .where(Module.project_id.in_(project_ids))
+        .group_by(Module.project_id)
+    )
+
+    stats = {project_id: _empty_stats() for project_id in project_ids}
+    for row in result.all():
+        project_id, module_count, timed_out, total_bounty, allocated_bounty, assignees, delivered, reviewed = row[:8]
+        stats[project_id] = {
+            "module_count": module_count,
+            "modules_by_status": dict(zip(MODULE_STATUSES, (int(count or 0) for count in row[8:]))),
+            "timed_out_count": int(timed_out or 0),
+            "total_bounty": float(total_bounty),
+            "allocated_bounty": float(allocated_bounty),
+            "assignee_count": int(assignees),
+            "delivery_count": int(delivered),
+            "reviewed_delivery_count": int(reviewed),
+        }
+    return stats
+
+
+def _cache_key(project_id: int) -> str:
+    return f"project_stats:{project_id}"
+
+
+async def get_project_stats(db: AsyncSession, project_ids: Iterable[int]) -> Dict[int, dict]:
+    """返回 项目 id -> 统计；未命中缓存的项目用一条查询补齐"""
+    project_ids = list(project_ids)
+
+    async def load(missing: List[str]) -> Dict[str, dict]:
+        stats = await _query_stats(db, [int(key.rsplit(":", 1)[1]) for key in missing])
+        return {_cache_key(project_id): values for project_id, values in stats.items()}
+
+    cached = await query_cache.get_or_load_many(
+        {_cache_key(project_id): [project_tag(project_id)] for project_id in project_ids},
+        load
+    )
+    return {project_id: cached[_cache_key(project_id)] for project_id in project_ids}
@@ -0,0 +1,298 @@
+"""
+调度器（The Dispatcher）：为节点推荐可承接的模块
+
+可承接模块的特征（项目、赏金、截止时间、剩余名额）以列数组的形式常驻内存，
+打分是对整列的 NumPy 向量运算，不逐个模块循环：
+- 模块的 ORM 修改在提交后自动标记为脏；批量 UPDATE 修改模块时调用 mark_dirty_on_commit
+- 下一次推荐前只重新加载脏的模块行，每隔 RECOMMENDATION_REBUILD_SECONDS 整体重建一次
+  （同时覆盖其他 worker 的修改）
+
+节点特征按请求计算：信誉分在所有节点中的分位、空闲槽位、历史完成数（信誉记录）
+和在各项目中的承接次数（承接记录）。
+"""
+import asyncio
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.module import Module, MAX_MODULE_ASSIGNEES
+from app.models.module_assignee import ModuleAssignee
+from app.models.reputation_history import ReputationHistory
+from app.models.user import User, MAX_CONCURRENT_TASKS
+
+_DIRTY_KEY = "recommendation_dirty_modules"
+
+# 打分权重
+WEIGHT_BOUNTY = 0.35
+WEIGHT_URGENCY = 0.25
+WEIGHT_FIT = 0.2
+WEIGHT_AFFINITY = 0.15
+WEIGHT_SEATS = 0.05
+# 截止时间紧迫度的衰减尺度（小时）
+URGENCY_HOURS = 72.0
+# 完成数达到该值时经验记满
+EXPERIENCED_COMPLETIONS = 10
+
+
+def _timestamp(value: datetime) -> float:
+    # 与模块截止时间的存储方式保持一致：不带时区的按 UTC 处理
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class ModuleFeatureIndex:
+    """可承接模块的特征矩阵（按列存储，容量不足时倍增）"""
+
+    def __init__(self, rebuild_seconds: float):
+        self.rebuild_seconds = rebuild_seconds
+        self._size = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._project_ids = np.empty(0, dtype=np.int64)
+        self._bounty = np.empty(0, dtype=np.float64)
+        self._deadline = np.empty(0, dtype=np.float64)  # Unix 时间戳，无截止时间为 NaN
+        self._seats = np.empty(0, dtype=np.float64)  # 剩余名额
+        self._rows: Dict[int, int] = {}
+        # 所有节点的信誉分（升序），用于计算分位
+        self._reputations = np.empty(0, dtype=np.float64)
+
+        self._dirty: set = set()
+        self._built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+        self.rebuilds = 0
+        self.incremental_updates = 0
+        self.last_score_ms: Optional[float] = None
+
+    # -- 维护 --------------------------------------------------------------------
+
+    def mark_dirty(self, *module_ids: int) -> None:
+        self._dirty.update(module_ids)
+
+    def mark_dirty_on_commit(self, db: AsyncSession, module_ids: Iterable[int]) -> None:
+        """用批量语句修改模块后调用，提交后标记为脏"""
+        db.info.setdefault(_DIRTY_KEY, set()).update(module_ids)
+
+    @staticmethod
+    def _eligible_query():
+        return select(
+            Module.id, Module.project_id, Module.bounty, Module.deadline, Module.assignee_count
+        ).where(Module.status == "open", Module.is_timeout == False)
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        async with self._lock:
+            expired = self._built_at is None or time.monotonic() - self._built_at > self.rebuild_seconds
+            if expired:
+                await self._rebuild(db)
+            elif self._dirty:
+                await self._refresh_dirty(db)
+
+    async def _rebuild(self, db: AsyncSession) -> None:
+        self._dirty.clear()
+        rows = (await db.execute(self._eligible_query())).all()
+
+        self._size = 0
+        self._rows = {}
+        self._grow(max(len(rows), 64))
+        for row in rows:
+            self._upsert(*row)
+
+        reputations = (await db.execute(
+            select(User.reputation_score).where(User.role == "node")
+        )).scalars().all()
+        self._reputations = np.sort(np.asarray(reputations, dtype=np.float64))
+
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    async def _refresh_dirty(self, db: AsyncSession) -> None:
+        module_ids, self._dirty = self._dirty, set()
+        rows = (await db.execute(self._eligible_query().where(Module.id.in_(module_ids)))).all()
+        for row in rows:
+            self._upsert(*row)
+        # 不再可承接（关闭、超时或删除）的模块移出矩阵
+        for module_id in module_ids - {row.id for row in rows}:
+            self._remove(module_id)
+        self.incremental_updates += len(module_ids)
+
+    def _grow(self, capacity: int) -> None:
+        def resized(array: np.ndarray) -> np.ndarray:
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            return grown
+
+        self._ids = resized(self._ids)
+        self._project_ids = resized(self._project_ids)
+        self._bounty = resized(self._bounty)
+        self._deadline = resized(self._deadline)
+        self._seats = resized(self._seats)
+
+    def _upsert(self, module_id, project_id, bounty, deadline, assignee_count) -> None:
+        row = self._rows.get(module_id)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow(max(len(self._ids) * 2, 64))
+            row = self._rows[module_id] = self._size
+            self._size += 1
+
+        self._ids[row] = module_id
+        self._project_ids[row] = project_id
+        self._bounty[row] = max(bounty or 0.0, 0.0)
+        self._deadline[row] = _timestamp(deadline) if deadline is not None else np.nan
+        self._seats[row] = MAX_MODULE_ASSIGNEES - (assignee_count or 0)
+
+    def _remove(self, module_id: int) -> None:
+        row = self._rows.pop(module_id, None)
+        if row is None:
+            return
+        # 用最后一行填补空位
+        last = self._size - 1
+        if row != last:
+            for array in (self._ids, self._project_ids, self._bounty, self._deadline, self._seats):
+                array[row] = array[last]
+            self._rows[int(self._ids[row])] = row
+        self._size = last
+
+    # -- 打分 --------------------------------------------------------------------
+
+    def score(
+        self,
+        reputation: float,
+        completions: int,
+        project_counts: Dict[int, int],
+        exclude_ids: Iterable[int],
+        now: float,
+    ) -> np.ndarray:
+        """对所有可承接模块打分，不可承接的为 -inf"""
+        n = self._size
+        bounty = self._bounty[:n]
+        deadline = self._deadline[:n]
+        seats = self._seats[:n]
+        project_ids = self._project_ids[:n]
+
+        max_bounty = bounty.max(initial=0.0)
+        bounty_norm = np.log1p(bounty) / math.log1p(max_bounty) if max_bounty > 0 else np.zeros(n)
+
+        hours_left = (deadline - now) / 3600
+        # 截止越近越紧迫，没有截止时间的为 0
+        urgency = np.exp(-np.clip(np.nan_to_num(hours_left, nan=np.inf), 0, None) / URGENCY_HOURS)
+
+        # 高信誉、经验丰富的节点匹配高赏金模块
+        rep_pct = 0.5
+        if len(self._reputations):
+            rep_pct = np.searchsorted(self._reputations, reputation, side="right") / len(self._reputations)
+        level = 0.7 * rep_pct + 0.3 * min(completions / EXPERIENCED_COMPLETIONS, 1.0)
+        fit = 1.0 - np.abs(bounty_norm - level)
+
+        affinity = np.zeros(n)
+        if project_counts:
+            keys = np.fromiter(project_counts.keys(), dtype=np.int64)
+            counts = np.fromiter(project_counts.values(), dtype=np.float64)
+            order = np.argsort(keys)
+            keys, counts = keys[order], counts[order]
+            pos = np.clip(np.searchsorted(keys, project_ids), 0, len(keys) - 1)
+            affinity = np.where(keys[pos] == project_ids, counts[pos], 0.0) / counts.sum()
+
+        scores = (
+            WEIGHT_BOUNTY * bounty_norm
+            + WEIGHT_URGENCY * urgency
+            + WEIGHT_FIT * fit
+            + WEIGHT_AFFINITY * affinity
+            + WEIGHT_SEATS * seats / MAX_MODULE_ASSIGNEES
+        )
+
+        unavailable = (seats <= 0) | (hours_left <= 0)
+        exclude = np.fromiter(exclude_ids, dtype=np.int64)
+        if len(exclude):
+            unavailable |= np.isin(self._ids[:n], exclude)
+        return np.where(unavailable, -np.inf, scores)
+
+    def top(self, scores: np.ndarray, limit: int) -> List[int]:
+        available = int(np.isfinite(scores).sum())
+        limit = min(limit, available)
+        if limit <= 0:
+            return []
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [int(module_id) for module_id in self._ids[ranked]]
+
+    def metrics(self) -> dict:
+        return {
+            "modules": self._size,
+            "capacity": len(self._ids),
+            "nodes": len(self._reputations),
+            "dirty": len(self._dirty),
+            "rebuilds": self.rebuilds,
+            "incremental_updates": self.incremental_updates,
+            "last_score_ms": self.last_score_ms,
+        }
+
+
+module_features = ModuleFeatureIndex(rebuild_seconds=settings.RECOMMENDATION_REBUILD_SECONDS)
+
+
+async def recommend_modules(db: AsyncSession, user: User, limit: int = 20) -> List[int]:
+    """为节点推荐可承接的模块，返回按得分降序的模块 id；没有空闲槽位时返回空列表"""
+    if user.concurrent_task_count >= MAX_CONCURRENT_TASKS:
+        return []
+
+    await module_features.ensure_fresh(db)
+
+    completions = await db.scalar(
+        select(func.count(ReputationHistory.id)).where(
+            ReputationHistory.user_id == user.id,
+            ReputationHistory.related_module_id.isnot(None),
+            ReputationHistory.score_change > 0
+        )
+    )
+    project_rows = (await db.execute(
+        select(Module.project_id, func.count(ModuleAssignee.id))
+        .join(Module, Module.id == ModuleAssignee.module_id)
+        .where(ModuleAssignee.user_id == user.id)
+        .group_by(Module.project_id)
+    )).all()
+    assigned = (await db.execute(
+        select(ModuleAssignee.module_id).where(ModuleAssignee.user_id == user.id)
+    )).scalars().all()
+
+    started = time.perf_counter()
+    scores = module_features.score(
+        reputation=user.reputation_score,
+        completions=completions or 0,
+        project_counts=dict(project_rows),
+        exclude_ids=assigned,
+        now=time.time(),
+    )
+    module_ids = module_features.top(scores, limit)
+    module_features.last_score_ms = round((time.perf_counter() - started) * 1000, 3)
+    return module_ids
+
+
+def _changed_module_ids(objects: Iterable) -> set:
+    return {obj.id for obj in objects if isinstance(obj, Module) and obj.id is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _track_module_changes(session, flush_context):
+    module_ids = _changed_module_ids(session.new) | _changed_module_ids(session.dirty) | _changed_module_ids(session.deleted)
+    if module_ids:
+        session.info.setdefault(_DIRTY_KEY, set()).update(module_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_dirty_after_commit(session):
+    module_ids = session.info.pop(_DIRTY_KEY, None)
+    if module_ids:
+        module_features.mark_dirty(*module_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,206 @@
+"""
+信誉变化的时间桶汇总
+
+个人主页的信誉曲线不再扫描用户的全部信誉记录：每条记录写入时，在同一事务中用 upsert
+累加到所在的日、周、月三个桶（reputation_rollups），曲线按 (用户, 粒度, 起始日期)
+主键做一次范围查询即可。
+
+已有数据的回填：python -m app.services.reputation_rollups
+"""
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.reputation_history import ReputationHistory
+from app.models.reputation_rollup import ReputationRollup
+from app.models.user import User
+
+GRANULARITIES = ("day", "week", "month")
+
+# 桶键 (用户 id, 粒度, 起始日期) -> [净变化, 增加, 减少, 次数]
+_Buckets = Dict[Tuple[int, str, date], list]
+
+
+def _to_utc_date(value: datetime) -> date:
+    # 不带时区的按 UTC 处理（SQLite 的 CURRENT_TIMESTAMP 即为 UTC）
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def _accumulate(buckets: _Buckets, user_id: int, changed_at: datetime, score_change: float) -> None:
+    day = _to_utc_date(changed_at)
+    for granularity in GRANULARITIES:
+        values = buckets[(user_id, granularity, bucket_start(day, granularity))]
+        values[0] += score_change
+        if score_change > 0:
+            values[1] += score_change
+        elif score_change < 0:
+            values[2] -= score_change
+        values[3] += 1
+
+
+def _rows(buckets: _Buckets) -> List[dict]:
+    # 按主键排序写入，保持并发事务的加锁顺序一致
+    return [
+        {
+            "user_id": user_id,
+            "granularity": granularity,
+            "bucket_start": start,
+            "score_change": values[0],
+            "gains": values[1],
+            "losses": values[2],
+            "event_count": values[3],
+        }
+        for (user_id, granularity, start), values in sorted(buckets.items())
+    ]
+
+
+def _dialect_insert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+async def record_reputation_history(db: AsyncSession, entries: Iterable[ReputationHistory]) -> None:
+    """添加信誉记录并累加到汇总桶（不提交）
+
+    所有写入 ReputationHistory 的地方都应通过这里，汇总才能与明细保持一致。
+    """
+    buckets: _Buckets = defaultdict(lambda: [0.0, 0.0, 0.0, 0])
+    now = datetime.now(timezone.utc)
+    for entry in entries:
+        # 显式设置时间，保证明细和汇总落在同一个桶
+        if entry.changed_at is None:
+            entry.changed_at = now
+        db.add(entry)
+        _accumulate(buckets, entry.user_id, entry.changed_at, entry.score_change)
+    if not buckets:
+        return
+
+    stmt = _dialect_insert(db)(ReputationRollup).values(_rows(buckets))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ReputationRollup.user_id, ReputationRollup.granularity, ReputationRollup.bucket_start],
+        set_={
+            "score_change": ReputationRollup.score_change + stmt.excluded.score_change,
+            "gains": ReputationRollup.gains + stmt.excluded.gains,
+            "losses": ReputationRollup.losses + stmt.excluded.losses,
+            "event_count": ReputationRollup.event_count + stmt.excluded.event_count,
+        }
+    )
+    await db.execute(stmt)
+
+
+async def reputation_series(
+    db: AsyncSession,
+    user: User,
+    granularity: str,
+    start: date,
+    end: date
+) -> List[dict]:
+    """返回 [start, end] 内每个桶的变化和桶结束时的信誉分，没有变化的桶补 0
+
+    只查询一次汇总表：取 start 所在桶之后的全部桶，由当前信誉分倒推各桶结束时的分数。
+    """
+    first = bucket_start(start, granularity)
+    last = bucket_start(end, granularity)
+    result = await db.execute(
+        select(
+            ReputationRollup.bucket_start,
+            ReputationRollup.score_change,
+            ReputationRollup.gains,
+            ReputationRollup.losses,
+            ReputationRollup.event_count,
+        )
+        .where(
+            ReputationRollup.user_id == user.id,
+            ReputationRollup.granularity == granularity,
+            ReputationRollup.bucket_start >= first,
+        )
+        .order_by(ReputationRollup.bucket_start)
+    )
+    rows = {row.bucket_start: row for row in result.all()}
+
+    # 区间之后的变化从当前分数中扣除，得到区间末尾的分数
+    score = user.reputation_score - sum(row.score_change for day, row in rows.items() if day > last)
+
+    starts = []
+    current = first
+    while current <= last:
+        starts.append(current)
+        current = next_bucket(current, granularity)
+
+    points = []
+    for current in reversed(starts):
+        row = rows.get(current)
+        points.append({
+            "bucket_start": current,
+            "score_change": row.score_change if row else 0.0,
+            "gains": row.gains if row else 0.0,
+            "losses": row.losses if row else 0.0,
+            "event_count": row.event_count if row else 0,
+            "score": score,
+        })
+        if row:
+            score -= row.score_change
+    points.reverse()
+    return points
+
+
+async def backfill_rollups(db: AsyncSession, user_ids: Optional[List[int]] = None, batch_size: int = 200) -> int:
+    """由信誉记录重算汇总（覆盖已有的桶），每批用户单独提交；返回处理的用户数"""
+    if user_ids is None:
+        result = await db.execute(select(ReputationHistory.user_id).distinct().order_by(ReputationHistory.user_id))
+        user_ids = list(result.scalars().all())
+
+    for offset in range(0, len(user_ids), batch_size):
+        batch = user_ids[offset:offset + batch_size]
+        history = await db.execute(
+            select(ReputationHistory.user_id, ReputationHistory.changed_at, ReputationHistory.score_change)
+            .where(ReputationHistory.user_id.in_(batch))
+        )
+        buckets: _Buckets = defaultdict(lambda: [0.0, 0.0, 0.0, 0])
+        for user_id, changed_at, score_change in history.all():
+            if changed_at is not None:
+                _accumulate(buckets, user_id, changed_at, score_change)
+
+        await db.execute(delete(ReputationRollup).where(ReputationRollup.user_id.in_(batch)))
+        if buckets:
+            await db.execute(ReputationRollup.__table__.insert(), _rows(buckets))
+        await db.commit()
+
+    return len(user_ids)
+
+
+async def main():
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        users = await backfill_rollups(db)
+    print(f"✓ 已回填 {users} 个用户的信誉汇总")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
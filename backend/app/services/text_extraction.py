@@ -0,0 +1,358 @@
+"""
+知识文件文本提取
+
+上传提交后在后台调度提取任务，提取在独立的进程池中执行，不占用 API 事件循环。
+提取结果写入 knowledge_items.content_text，参与全文检索（见 app.services.knowledge_search）。
+
+提取状态（knowledge_items.extraction_status）：
+- pending：等待提取
+- processing：提取中
+- done：已提取
+- skipped：文件类型不支持提取（图片、旧版 doc 等）
+- failed：提取失败，错误信息见 extraction_error
+"""
+import asyncio
+import codecs
+import io
+import logging
+import re
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional, Tuple
+from xml.etree import ElementTree
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.file_storage import CHUNK_SIZE, get_file_extension
+from app.db.session import AsyncSessionLocal
+from app.models.knowledge_item import KnowledgeItem
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = {"md", "txt"}
+EXTRACTABLE_EXTENSIONS = TEXT_EXTENSIONS | {"pdf", "docx", "zip"}
+
+
+class UnsupportedFileType(Exception):
+    pass
+
+
+class _TextBuffer:
+    """按字符上限收集文本"""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def add(self, text: str) -> None:
+        if self.full or not text:
+            return
+        text = text[:self.max_chars - self.length]
+        self.parts.append(text)
+        self.length += len(text)
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+# ---------------------------------------------------------------------------
+# 各格式提取（在进程池中执行）
+# ---------------------------------------------------------------------------
+
+def _extract_text_stream(chunks: Iterable[bytes], buffer: _TextBuffer) -> None:
+    """逐块解码纯文本：优先 UTF-8，首块无法解码时按 GB18030 处理"""
+    decoder = None
+    for chunk in chunks:
+        if decoder is None:
+            encoding = "utf-8"
+            try:
+                # 首块末尾可能截断多字节字符，只检查前半部分
+                chunk[:max(1, len(chunk) - 4)].decode("utf-8")
+            except UnicodeDecodeError:
+                encoding = "gb18030"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        buffer.add(decoder.decode(chunk))
+        if buffer.full:
+            return
+    if decoder is not None:
+        buffer.add(decoder.decode(b"", final=True))
+
+
+def _iter_file_chunks(fileobj) -> Iterable[bytes]:
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _extract_docx(fileobj, buffer: _TextBuffer) -> None:
+    """流式解析 word/document.xml 中的 <w:t> 文本"""
+    with zipfile.ZipFile(fileobj) as archive:
+        with archive.open("word/document.xml") as document:
+            for _event, element in ElementTree.iterparse(document, events=("end",)):
+                tag = element.tag.rsplit("}", 1)[-1]
+                if tag == "t":
+                    buffer.add(element.text or "")
+                elif tag == "p":
+                    buffer.add("\n")
+                element.clear()
+                if buffer.full:
+                    return
+
+
+# 流字典的最大长度，也是跨块查找流开头时保留的字节数（内容流的字典只有 /Length、/Filter 等少量键）
+_PDF_DICT_WINDOW = 4096
+_PDF_STREAM_START = re.compile(rb"<<(.{0,%d}?)>>\s*stream\r?\n" % _PDF_DICT_WINDOW, re.S)
+_PDF_STREAM_END = b"endstream"
+_PDF_TEXT_BLOCK = re.compile(rb"BT(.*?)ET", re.S)
+_PDF_STRING = re.compile(rb"\((?:\\.|[^\\)])*\)", re.S)
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+# 单个未闭合文本块（BT … ET）最多缓存的字节数，超出后丢弃该块
+_PDF_TEXT_BLOCK_MAX = 1024 * 1024
+
+
+def _decode_pdf_string(literal: bytes) -> str:
+    body = literal[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        byte = body[i:i + 1]
+        if byte != b"\\":
+            out += byte
+            i += 1
+            continue
+        nxt = body[i + 1:i + 2]
+        if nxt in _PDF_ESCAPES:
+            out += _PDF_ESCAPES[nxt]
+            i += 2
+        elif nxt and nxt in b"01234567":
+            octal = re.match(rb"[0-7]{1,3}", body[i + 1:i + 4]).group()
+            out.append(int(octal, 8) & 0xFF)
+            i += 1 + len(octal)
+        else:
+            # 未定义的转义（包括 \8、\9）：忽略反斜杠，保留字符
+            out += nxt
+            i += 2
+    return out.decode("latin-1")
+
+
+def _iter_pdf_stream_parts(chunks: Iterable[bytes]) -> Iterator[Tuple[str, bytes]]:
+    """逐块扫描 PDF 中的流对象
+
+    依次产出 ("start", 流字典)、若干 ("data", 流数据片段)、("end", b"")，
+    内存中只保留当前块和少量跨块的尾部。
+    """
+    pending = b""
+    inside = False
+    for chunk in chunks:
+        pending += chunk
+        while True:
+            if not inside:
+                match = _PDF_STREAM_START.search(pending)
+                if match is None:
+                    pending = pending[-_PDF_DICT_WINDOW:]
+                    break
+                yield "start", match.group(1)
+                pending = pending[match.end():]
+                inside = True
+            else:
+                end = pending.find(_PDF_STREAM_END)
+                if end < 0:
+                    # 结束标记可能跨块，保留可能是其前缀的尾部
+                    keep = len(_PDF_STREAM_END) - 1
+                    if len(pending) > keep:
+                        yield "data", pending[:-keep]
+                        pending = pending[-keep:]
+                    break
+                yield "data", pending[:end]
+                yield "end", b""
+                pending = pending[end + len(_PDF_STREAM_END):]
+                inside = False
+
+
+class _PdfTextScanner:
+    """逐段扫描一个内容流中 BT … ET 文本块里的字符串"""
+
+    def __init__(self, buffer: _TextBuffer):
+        self.buffer = buffer
+        self.pending = b""
+
+    def feed(self, data: bytes) -> None:
+        self.pending += data
+        last = 0
+        for block in _PDF_TEXT_BLOCK.finditer(self.pending):
+            strings = [_decode_pdf_string(s) for s in _PDF_STRING.findall(block.group(1))]
+            if strings:
+                self.buffer.add("".join(strings) + "\n")
+            last = block.end()
+            if self.buffer.full:
+                return
+
+        rest = self.pending[last:]
+        start = rest.find(b"BT")
+        if start < 0:
+            # "BT" 可能跨段
+            self.pending = rest[-1:]
+        elif len(rest) - start > _PDF_TEXT_BLOCK_MAX:
+            self.pending = b""
+        else:
+            self.pending = rest[start:]
+
+
+def _extract_pdf(fileobj, buffer: _TextBuffer) -> None:
+    """提取 PDF 内容流中 Tj/TJ 操作符的文本
+
+    只依赖标准库：支持未压缩和 FlateDecode 压缩的内容流，
+    不处理对象流、加密文档和 CID 字体编码。
+    文件按块读取、压缩流增量解压，内存占用与文件大小无关。
+    """
+    decompressor = None
+    scanner = None
+    for kind, value in _iter_pdf_stream_parts(_iter_file_chunks(fileobj)):
+        if kind == "start":
+            decompressor = zlib.decompressobj() if b"/FlateDecode" in value else None
+            # 其他编码的流不处理
+            scanner = _PdfTextScanner(buffer) if decompressor or b"/Filter" not in value else None
+            # 限制每个流的解压大小，防止压缩炸弹
+            remaining = settings.MAX_FILE_SIZE
+        elif kind == "data" and scanner is not None:
+            if decompressor is not None:
+                try:
+                    value = decompressor.decompress(value, remaining)
+                except zlib.error:
+                    scanner = None
+                    continue
+                remaining -= len(value)
+                if remaining <= 0:
+                    scanner.feed(value)
+                    scanner = None
+                    continue
+            scanner.feed(value)
+        elif kind == "end":
+            scanner = None
+
+        if buffer.full:
+            return
+
+
+def _extract_zip(fileobj, buffer: _TextBuffer) -> None:
+    """提取压缩包内的文件名以及文本和 docx 文件的内容"""
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            buffer.add(info.filename + "\n")
+            ext = get_file_extension(info.filename)
+            with archive.open(info) as member:
+                if ext in TEXT_EXTENSIONS:
+                    _extract_text_stream(_iter_file_chunks(member), buffer)
+                    buffer.add("\n")
+                elif ext == "docx" and info.file_size <= settings.MAX_FILE_SIZE:
+                    _extract_docx(io.BytesIO(member.read()), buffer)
+                    buffer.add("\n")
+            if buffer.full:
+                return
+
+
+def extract_text(file_path: str, file_name: str, max_chars: int) -> str:
+    """从文件中提取最多 max_chars 个字符的文本（进程池入口）"""
+    ext = get_file_extension(file_name)
+    if ext not in EXTRACTABLE_EXTENSIONS:
+        raise UnsupportedFileType(ext)
+
+    buffer = _TextBuffer(max_chars)
+    with open(file_path, "rb") as f:
+        if ext in TEXT_EXTENSIONS:
+            _extract_text_stream(_iter_file_chunks(f), buffer)
+        elif ext == "docx":
+            _extract_docx(f, buffer)
+        elif ext == "pdf":
+            _extract_pdf(f, buffer)
+        elif ext == "zip":
+            _extract_zip(f, buffer)
+
+    # 压缩连续空白，NUL 字符无法写入 PostgreSQL 文本列
+    return re.sub(r"[ \t\r\f\v]+", " ", buffer.text()).replace("\x00", "").strip()
+
+
+# ---------------------------------------------------------------------------
+# 调度（在事件循环中执行）
+# ---------------------------------------------------------------------------
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.TEXT_EXTRACTION_WORKERS)
+    return _executor
+
+
+def shutdown_extraction_pool() -> None:
+    """关闭提取进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _set_status(knowledge_id: int, **values) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(KnowledgeItem).where(KnowledgeItem.id == knowledge_id).values(**values)
+        )
+        await db.commit()
+
+
+async def run_extraction(knowledge_id: int) -> None:
+    """提取一个知识条目的文本并写入检索列"""
+    async with AsyncSessionLocal() as db:
+        knowledge = await db.get(KnowledgeItem, knowledge_id)
+        if knowledge is None:
+            return
+        file_path, file_name = knowledge.file_url, knowledge.file_name
+
+    await _set_status(knowledge_id, extraction_status="processing", extraction_error=None)
+
+    try:
+        loop = asyncio.get_running_loop()
+        content_text = await loop.run_in_executor(
+            _get_executor(), extract_text, file_path, file_name, settings.TEXT_EXTRACTION_MAX_CHARS
+        )
+    except UnsupportedFileType:
+        await _set_status(
+            knowledge_id,
+            extraction_status="skipped",
+            content_text=None,
+            extracted_at=datetime.now(timezone.utc)
+        )
+        return
+    except Exception as e:
+        logger.warning(f"Text extraction failed for knowledge {knowledge_id}: {e}")
+        await _set_status(
+            knowledge_id,
+            extraction_status="failed",
+            extraction_error=str(e)[:500],
+            extracted_at=datetime.now(timezone.utc)
+        )
+        return
+
+    await _set_status(
+        knowledge_id,
+        extraction_status="done",
+        content_text=content_text,
+        extraction_error=None,
+        extracted_at=datetime.now(timezone.utc)
+    )
+    logger.info(f"Extracted {len(content_text)} characters from knowledge {knowledge_id}")
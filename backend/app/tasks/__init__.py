@@ -1,17 +1,21 @@
 """
-后台定时任务：自动检测超时模块
+后台定时任务：自动检测超时模块、未读计数对账、通知保留期清理、重建排行榜
+
+每个进程都注册任务，但只有选举出的 leader 实际执行（见 app.core.leader）；
+排行榜在各进程的内存中，每个进程都重建。
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from functools import wraps
 import logging
 
 from app.db.session import AsyncSessionLocal
-from app.models.module import Module
-from app.models.notification import Notification, NotificationType
-from app.models.user import User
+from app.core.config import settings
+from app.core.leader import leader_elector
+from app.services.module_timeouts import scan_module_timeouts
+from app.services.deadline_timer import deadline_timer
+from app.services.notifications import reconcile_unread_counts, prune_notifications
+from app.services.leaderboard import leaderboard
 
 logger = logging.getLogger(__name__)
 
@@ -19,83 +23,107 @@ logger = logging.getLogger(__name__)
 scheduler = AsyncIOScheduler()
 
 
+def leader_only(job):
+    """只在当前进程是 leader 时执行的定时任务"""
+    @wraps(job)
+    async def wrapper():
+        if not leader_elector.is_leader:
+            return
+        await job()
+    return wrapper
+
+
 async def check_module_timeouts():
-    """检测超时模块并发送通知"""
+    """检测超时模块并发送通知（截止时间定时器的兜底）"""
     async with AsyncSessionLocal() as db:
         try:
-            # 查找所有超时但未标记的模块
-            # 条件: deadline < now, is_timeout = False, status in (open, in_progress)
-            now = datetime.utcnow()
-            result = await db.execute(
-                select(Module).where(
-                    Module.deadline < now,
-                    Module.is_timeout == False,
-                    Module.status.in_(['open', 'in_progress'])
-                )
+            run = await scan_module_timeouts(
+                db,
+                batch_size=settings.TIMEOUT_SCAN_BATCH_SIZE,
+                max_batches=settings.TIMEOUT_SCAN_MAX_BATCHES
+            )
+            logger.info(
+                f"Timeout scan: {run['marked']} modules marked, {run['notified']} notifications "
+                f"in {run['batches']} batches ({run['duration_ms']} ms)"
             )
-            timeout_modules = result.scalars().all()
-
-            if not timeout_modules:
-                logger.info("No timeout modules found")
-                return
-
-            logger.info(f"Found {len(timeout_modules)} timeout modules")
-
-            for module in timeout_modules:
-                # 标记为超时
-                module.is_timeout = True
-
-                # 发送通知给所有承接人
-                assignees_result = await db.execute(
-                    select(User).join(Module.assignees).where(Module.id == module.id)
-                )
-                assignees = assignees_result.scalars().all()
-
-                for assignee in assignees:
-                    # 创建超时通知
-                    notification = Notification(
-                        recipient_id=assignee.id,
-                        type=NotificationType.TIMEOUT,
-                        title=f'任务超时提醒',
-                        content=f'您承接的任务「{module.title}」已超时，请尽快完成或申请放弃。',
-                        related_module_id=module.id
-                    )
-                    db.add(notification)
-
-                # 发送通知给指挥官（所有指挥官）
-                commanders_result = await db.execute(
-                    select(User).where(User.role == 'commander')
-                )
-                commanders = commanders_result.scalars().all()
-
-                for commander in commanders:
-                    notification = Notification(
-                        recipient_id=commander.id,
-                        type=NotificationType.TIMEOUT,
-                        title=f'任务超时提醒',
-                        content=f'模块「{module.title}」已超时，当前有 {len(assignees)} 名承接人。',
-                        related_module_id=module.id
-                    )
-                    db.add(notification)
-
-            await db.commit()
-            logger.info(f"Successfully processed {len(timeout_modules)} timeout modules")
-
         except Exception as e:
             logger.error(f"Error checking timeouts: {e}")
             await db.rollback()
 
 
+async def reconcile_notification_counters():
+    """修正物化未读计数与实际未读数之间的偏差"""
+    async with AsyncSessionLocal() as db:
+        try:
+            corrected = await reconcile_unread_counts(db)
+            if corrected:
+                logger.warning(f"Corrected unread counters for {corrected} users")
+        except Exception as e:
+            logger.error(f"Error reconciling unread counters: {e}")
+            await db.rollback()
+
+
+async def prune_old_notifications():
+    """按保留期删除或归档已读通知"""
+    if settings.NOTIFICATION_RETENTION_DAYS <= 0:
+        return
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        try:
+            removed = await prune_notifications(
+                db,
+                cutoff,
+                mode=settings.NOTIFICATION_RETENTION_MODE,
+                batch_size=settings.NOTIFICATION_RETENTION_BATCH_SIZE,
+                max_batches=settings.NOTIFICATION_RETENTION_MAX_BATCHES
+            )
+            logger.info(f"Pruned {removed} read notifications older than {cutoff.isoformat()}")
+        except Exception as e:
+            logger.error(f"Error pruning notifications: {e}")
+            await db.rollback()
+
+
+async def rebuild_leaderboard():
+    """从数据库重建内存中的信誉分排行榜"""
+    async with AsyncSessionLocal() as db:
+        try:
+            await leaderboard.rebuild(db)
+        except Exception as e:
+            logger.error(f"Error rebuilding leaderboard: {e}")
+
+
 async def start_scheduler():
     """启动定时任务调度器"""
     try:
-        # 每小时检查一次超时
+        await leader_elector.start()
+        await deadline_timer.start()
+        await rebuild_leaderboard()
+
         scheduler.add_job(
-            check_module_timeouts,
+            leader_only(check_module_timeouts),
             'interval',
-            hours=1,
+            seconds=settings.TIMEOUT_SCAN_INTERVAL_SECONDS,
             id='check_module_timeouts'
         )
+        scheduler.add_job(
+            leader_only(reconcile_notification_counters),
+            'interval',
+            minutes=settings.UNREAD_COUNTER_RECONCILE_MINUTES,
+            id='reconcile_notification_counters'
+        )
+        scheduler.add_job(
+            leader_only(prune_old_notifications),
+            'interval',
+            hours=settings.NOTIFICATION_RETENTION_INTERVAL_HOURS,
+            id='prune_old_notifications'
+        )
+        scheduler.add_job(
+            rebuild_leaderboard,
+            'interval',
+            minutes=settings.LEADERBOARD_REBUILD_MINUTES,
+            id='rebuild_leaderboard'
+        )
         scheduler.start()
         logger.info("Timeout checker scheduler started successfully")
     except Exception as e:
@@ -106,6 +134,8 @@ async def stop_scheduler():
     """停止定时任务调度器"""
     try:
         scheduler.shutdown()
+        await deadline_timer.stop()
+        await leader_elector.stop()
         logger.info("Timeout checker scheduler stopped successfully")
     except Exception as e:
         logger.error(f"Failed to stop scheduler: {e}")
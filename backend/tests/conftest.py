@@ -0,0 +1,118 @@
+"""
+测试夹具
+
+测试使用临时目录中的 SQLite 数据库，每个用例前重建所有表（含 FTS5 表和触发器）。
+进程内缓存（认证用户、查询结果）在测试中关闭，避免用例之间通过复用的 id 串数据。
+"""
+import os
+import tempfile
+from pathlib import Path
+
+_TEST_DIR = Path(tempfile.mkdtemp(prefix="nexus-tests-"))
+_TEST_DB = _TEST_DIR / "test.db"
+
+# 必须在导入 app 之前设置；SQLite 只有一个写锁，并发用例中等锁的时间可能超过默认的 5 秒
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_TEST_DB}?timeout=60"
+os.environ["PRINCIPAL_CACHE_ENABLED"] = "false"
+os.environ["QUERY_CACHE_BACKEND"] = "none"
+os.environ["DEADLINE_TIMER_ENABLED"] = "false"
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.core import file_storage
+from app.core.security import create_access_token
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+from app.models import Base, User, Project, Module
+
+engine.echo = False
+
+
+@pytest.fixture
+async def db_engine():
+    """空数据库：删除上一个用例的数据库文件后重新建表"""
+    await engine.dispose()
+    _TEST_DB.unlink(missing_ok=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(db_engine):
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def client(db_engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    """上传目录指向用例自己的临时目录"""
+    monkeypatch.setattr(file_storage, "UPLOAD_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    """记录执行的 SQL 语句，用于断言查询次数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def create_user(db, username: str, role: str = "node", **values) -> User:
+    """直接写库创建用户（跳过 bcrypt）"""
+    user = User(
+        username=username,
+        hashed_password="x",
+        role=role,
+        reputation_score=values.pop("reputation_score", 100.0),
+        concurrent_task_count=values.pop("concurrent_task_count", 0),
+        **values
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+def auth_headers(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': str(user.id)})}"}
+
+
+async def create_project(db, creator: User, name: str = "项目") -> Project:
+    project = Project(name=name, description="", status="active", creator_id=creator.id)
+    db.add(project)
+    await db.commit()
+    await db.refresh(project)
+    return project
+
+
+async def create_module(db, project: Project, title: str = "模块", **values) -> Module:
+    module = Module(
+        title=title,
+        description=values.pop("description", ""),
+        project_id=project.id,
+        creator_id=values.pop("creator_id", project.creator_id),
+        bounty=values.pop("bounty", 10.0),
+        status=values.pop("status", "open"),
+        **values
+    )
+    db.add(module)
+    await db.commit()
+    await db.refresh(module)
+    return module
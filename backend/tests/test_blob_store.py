@@ -0,0 +1,92 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.file_storage import get_blob_path
+from app.models.file_blob import FileBlob
+from app.services.blob_store import acquire_blob, release_blob, get_blob
+
+CONTENT = b"knowledge file content"
+CONTENT_HASH = hashlib.sha256(CONTENT).hexdigest()
+
+
+def _temp_upload(upload_dir: Path, name: str) -> str:
+    """模拟 save_upload_file 写出的临时文件"""
+    path = upload_dir / f"{name}.part"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+async def test_identical_uploads_share_one_file(db, upload_dir):
+    first = _temp_upload(upload_dir, "a")
+    second = _temp_upload(upload_dir, "b")
+
+    path_a = await acquire_blob(db, CONTENT_HASH, len(CONTENT), first)
+    path_b = await acquire_blob(db, CONTENT_HASH, len(CONTENT), second)
+    await db.commit()
+
+    assert path_a == path_b == str(get_blob_path(CONTENT_HASH))
+    assert Path(path_a).read_bytes() == CONTENT
+    assert not Path(first).exists() and not Path(second).exists()
+    assert (await get_blob(db, CONTENT_HASH)).ref_count == 2
+
+
+async def test_last_release_deletes_file_after_commit(db, upload_dir):
+    path = await acquire_blob(db, CONTENT_HASH, len(CONTENT), _temp_upload(upload_dir, "a"))
+    await acquire_blob(db, CONTENT_HASH, len(CONTENT), _temp_upload(upload_dir, "b"))
+    await db.commit()
+
+    await release_blob(db, CONTENT_HASH)
+    await db.commit()
+    assert Path(path).exists()
+
+    await release_blob(db, CONTENT_HASH)
+    # 锁内已移出 blob 路径，提交前新的引用就会看到文件缺失
+    assert not Path(path).exists()
+    await db.commit()
+
+    assert await db.get(FileBlob, CONTENT_HASH) is None
+    assert list((upload_dir / "tmp").iterdir()) == []
+
+
+async def test_rollback_restores_released_file(db, upload_dir):
+    path = await acquire_blob(db, CONTENT_HASH, len(CONTENT), _temp_upload(upload_dir, "a"))
+    await db.commit()
+
+    await release_blob(db, CONTENT_HASH)
+    await db.rollback()
+
+    assert Path(path).read_bytes() == CONTENT
+    assert (await get_blob(db, CONTENT_HASH)).ref_count == 1
+
+
+async def test_upload_racing_last_delete_keeps_its_file(db, upload_dir):
+    await acquire_blob(db, CONTENT_HASH, len(CONTENT), _temp_upload(upload_dir, "a"))
+    await db.commit()
+
+    # 上传已写完临时文件（此时 blob 文件还在），随后另一请求删除了最后一个引用
+    racing_upload = _temp_upload(upload_dir, "b")
+    await release_blob(db, CONTENT_HASH)
+    await db.commit()
+    assert not get_blob_path(CONTENT_HASH).exists()
+
+    path = await acquire_blob(db, CONTENT_HASH, len(CONTENT), racing_upload)
+    await db.commit()
+
+    assert Path(path).read_bytes() == CONTENT
+    assert (await get_blob(db, CONTENT_HASH)).ref_count == 1
+
+
+async def test_reference_by_hash_after_last_delete_is_rejected(db, upload_dir):
+    await acquire_blob(db, CONTENT_HASH, len(CONTENT), _temp_upload(upload_dir, "a"))
+    await db.commit()
+    await release_blob(db, CONTENT_HASH)
+    await db.commit()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await acquire_blob(db, CONTENT_HASH, len(CONTENT))
+    assert exc_info.value.status_code == 404
+    await db.rollback()
+    assert await get_blob(db, CONTENT_HASH) is None
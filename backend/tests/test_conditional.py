@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models import Module, Project
+
+from tests.conftest import create_user, create_project, create_module, auth_headers
+
+SAME_SECOND = datetime(2026, 10, 18, 12, 0, 0, tzinfo=timezone.utc)
+
+
+async def _pin_updated_at(db, model, row_id: int) -> None:
+    """模拟 SQLite 上同一秒内的多次修改：updated_at 不变"""
+    await db.execute(update(model).where(model.id == row_id).values(updated_at=SAME_SECOND))
+    await db.commit()
+
+
+async def _etag(client, url: str, headers: dict) -> str:
+    response = await client.get(url, headers=headers)
+    assert response.status_code == 200
+    revalidated = await client.get(url, headers={**headers, "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+    return response.headers["ETag"]
+
+
+@pytest.fixture
+async def commander(db):
+    user = await create_user(db, "commander", role="commander")
+    return user, auth_headers(user)
+
+
+@pytest.mark.parametrize("changes", [
+    {"name": "新名称"},
+    {"description": "新描述"},
+])
+async def test_project_list_etag_changes_within_one_second(db, client, commander, changes):
+    user, headers = commander
+    project = await create_project(db, user)
+    await _pin_updated_at(db, Project, project.id)
+    before = await _etag(client, "/api/v1/projects/", headers)
+
+    response = await client.put(f"/api/v1/projects/{project.id}", json=changes, headers=headers)
+    assert response.status_code == 200
+    await _pin_updated_at(db, Project, project.id)
+
+    assert await _etag(client, "/api/v1/projects/", headers) != before
+
+
+@pytest.mark.parametrize("changes", [
+    {"title": "新标题"},
+    {"description": "新描述"},
+    {"bounty": 99.0},
+    {"deadline": "2027-01-01T00:00:00Z"},
+    {"dispatch_mode": "lottery"},
+])
+async def test_module_etag_changes_within_one_second(db, client, commander, changes):
+    user, headers = commander
+    module = await create_module(db, await create_project(db, user))
+    url = f"/api/v1/modules/{module.id}"
+    await _pin_updated_at(db, Module, module.id)
+    before = await _etag(client, url, headers)
+
+    response = await client.put(url, json=changes, headers=headers)
+    assert response.status_code == 200
+    await _pin_updated_at(db, Module, module.id)
+
+    assert await _etag(client, url, headers) != before
+
+
+async def test_module_etag_follows_project_name(db, client, commander):
+    user, headers = commander
+    project = await create_project(db, user)
+    module = await create_module(db, project)
+    url = f"/api/v1/modules/{module.id}"
+    await _pin_updated_at(db, Project, project.id)
+    before = await _etag(client, url, headers)
+
+    await client.put(f"/api/v1/projects/{project.id}", json={"name": "改名"}, headers=headers)
+    await _pin_updated_at(db, Project, project.id)
+
+    response = await client.get(url, headers={**headers, "If-None-Match": before})
+    assert response.status_code == 200
+    assert response.json()["project_name"] == "改名"
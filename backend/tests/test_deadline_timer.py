@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.core.leader import leader_elector
+from app.models import Module, Notification
+from app.models.module_assignee import ModuleAssignee
+from app.services import deadline_timer as deadline_timer_module
+from app.services.deadline_timer import DeadlineTimer, TIMEOUT
+
+from tests.conftest import create_user, create_project, create_module
+
+
+@pytest.fixture
+def timer(monkeypatch):
+    """不启动循环的定时器：测试直接调用调度和触发"""
+    monkeypatch.setattr(DeadlineTimer, "running", True)
+    return DeadlineTimer(reminder_minutes=[10, 60], refresh_seconds=60, horizon_minutes=120)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _entries(due: list) -> list:
+    return [(module_id, offset) for _, module_id, offset, _ in due]
+
+
+async def _module_with_assignee(db, deadline: datetime):
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander), deadline=deadline.replace(tzinfo=None))
+    node = await create_user(db, "node")
+    db.add(ModuleAssignee(module_id=module.id, user_id=node.id))
+    await db.commit()
+    return module, node
+
+
+async def _last_reminder(db, module_id: int):
+    return await db.scalar(select(Module.last_reminder_minutes).where(Module.id == module_id))
+
+
+async def _reminders_for(db, user_id: int) -> int:
+    return len((await db.execute(select(Notification.id).where(Notification.recipient_id == user_id))).all())
+
+
+def test_due_entries_pop_in_fire_order(timer):
+    now = _now()
+    timer.schedule_module(1, now + timedelta(minutes=90))
+    timer.schedule_module(2, now + timedelta(minutes=70))
+    # 截止时间超出时间窗口：只调度窗口内的提醒
+    timer.schedule_module(3, now + timedelta(minutes=150))
+
+    due = timer._pop_due(now + timedelta(hours=3))
+
+    fire_times = [fire_at for fire_at, _, _, _ in due]
+    assert fire_times == sorted(fire_times)
+    assert _entries(due) == [(2, 60), (1, 60), (2, 10), (2, TIMEOUT), (1, 10), (1, TIMEOUT), (3, 60)]
+    assert timer._heap == []
+
+
+def test_changed_deadline_drops_stale_entries(timer):
+    now = _now()
+    timer.schedule_module(1, now + timedelta(minutes=30))
+    timer.schedule_module(1, now + timedelta(minutes=100))
+
+    assert timer._pop_due(now + timedelta(minutes=35)) == []
+    assert _entries(timer._pop_due(now + timedelta(minutes=100))) == [(1, 60), (1, 10), (1, TIMEOUT)]
+
+    # 取消截止时间后剩余条目全部作废
+    timer.schedule_module(2, now + timedelta(minutes=30))
+    timer.schedule_module(2, None)
+    assert timer._pop_due(now + timedelta(hours=1)) == []
+
+
+def test_missed_reminders_send_only_the_closest(timer):
+    now = _now()
+    timer.schedule_module(1, now + timedelta(minutes=5))
+    timer.schedule_module(2, now + timedelta(minutes=5), last_reminder_minutes=10)
+    timer.schedule_module(3, now - timedelta(minutes=5))
+
+    # 错过的提醒在调度时立即到期
+    assert _entries(timer._pop_due(_now())) == [(3, TIMEOUT), (1, 10)]
+    assert _entries(timer._pop_due(now + timedelta(minutes=5))) == [(1, TIMEOUT), (2, TIMEOUT)]
+
+
+def test_settled_reminders_are_not_rescheduled(timer):
+    now = _now()
+    timer.schedule_module(1, now + timedelta(minutes=5))
+    due = timer._pop_due(_now())
+
+    # 触发成功前重新加载：尚未记录，仍会补发
+    timer.schedule_module(1, now + timedelta(minutes=5))
+    assert _entries(timer._pop_due(_now())) == [(1, 10)]
+
+    timer._settle(due)
+    timer.schedule_module(1, now + timedelta(minutes=5))
+    assert timer._pop_due(_now()) == []
+
+
+async def test_reminder_fires_and_is_recorded(db, timer):
+    module, node = await _module_with_assignee(db, _now() + timedelta(minutes=5))
+    timer.schedule_module(module.id, module.deadline)
+
+    due = timer._pop_due(_now())
+    assert await timer._fire(due)
+    timer._settle(due)
+
+    assert await _last_reminder(db, module.id) == 10
+    assert await _reminders_for(db, node.id) == 1
+    assert timer.sent_reminders == 1
+    # 重复触发被条件 UPDATE 拦下
+    assert await timer._fire(due)
+    assert await _reminders_for(db, node.id) == 1
+
+
+async def test_failed_fire_keeps_reminder_for_retry(db, timer, monkeypatch):
+    module, node = await _module_with_assignee(db, _now() + timedelta(minutes=5))
+    timer.schedule_module(module.id, module.deadline)
+
+    failures = [RuntimeError("database unavailable")]
+    send_reminders = timer._send_reminders
+
+    async def flaky_send(db, reminders):
+        if failures:
+            raise failures.pop()
+        return await send_reminders(db, reminders)
+
+    monkeypatch.setattr(timer, "_send_reminders", flaky_send)
+    due = timer._pop_due(_now())
+    assert not await timer._fire(due)
+    timer._requeue(due)
+
+    assert timer._reminded == {}
+    assert timer.sent_reminders == 0
+    assert await _last_reminder(db, module.id) is None
+
+    # 重试间隔之前不触发，之后补发
+    assert timer._pop_due(_now()) == []
+    retry = timer._pop_due(_now() + timedelta(seconds=deadline_timer_module.FIRE_RETRY_SECONDS + 1))
+    assert _entries(retry) == [(module.id, 10)]
+    assert await timer._fire(retry)
+    assert await _last_reminder(db, module.id) == 10
+    assert await _reminders_for(db, node.id) == 1
+
+
+@pytest.mark.parametrize("is_leader", [True, False])
+async def test_only_leader_fires(db, monkeypatch, is_leader):
+    module, node = await _module_with_assignee(db, _now() + timedelta(minutes=5))
+    monkeypatch.setattr(leader_elector, "is_leader", is_leader)
+    timer = DeadlineTimer(reminder_minutes=[10], refresh_seconds=60, horizon_minutes=120)
+    fired = []
+    original_fire = timer._fire
+
+    async def recording_fire(due):
+        fired.append(_entries(due))
+        return await original_fire(due)
+
+    monkeypatch.setattr(timer, "_fire", recording_fire)
+    await timer.start()
+    # 第一轮循环：加载并处理错过的提醒
+    await asyncio.sleep(0.3)
+    await timer.stop()
+
+    assert timer.refreshes >= 1
+    if is_leader:
+        assert fired == [[(module.id, 10)]]
+        assert await _last_reminder(db, module.id) == 10
+        assert await _reminders_for(db, node.id) == 1
+    else:
+        assert fired == []
+        assert await _last_reminder(db, module.id) is None
+        assert await _reminders_for(db, node.id) == 0
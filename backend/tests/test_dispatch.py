@@ -0,0 +1,120 @@
+import asyncio
+import gc
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models import Module, ModuleAssignee
+from app.models.module import MAX_MODULE_ASSIGNEES
+from app.services import dispatch
+from app.services.dispatch import DispatchQueue
+
+from tests.conftest import create_user, create_project, create_module
+
+
+@pytest.fixture
+def queue():
+    return DispatchQueue(window_ms=50, full_cache_seconds=60)
+
+
+@pytest.fixture
+async def module(db):
+    commander = await create_user(db, "commander", role="commander")
+    return await create_module(db, await create_project(db, commander))
+
+
+async def _users(db, reputations):
+    return [
+        await create_user(db, f"node{i}", reputation_score=reputation)
+        for i, reputation in enumerate(reputations)
+    ]
+
+
+async def _submit_all(queue, module, policy, users):
+    """同一窗口内按列表顺序提交，返回中签的用户名"""
+    results = await asyncio.gather(
+        *[queue.submit(module.id, policy, user) for user in users],
+        return_exceptions=True
+    )
+    for result in results:
+        assert result is None or (isinstance(result, HTTPException) and "已满" in result.detail)
+    return [user.username for user, result in zip(users, results) if result is None]
+
+
+async def _assigned(db, module):
+    result = await db.execute(
+        select(ModuleAssignee.user_id).where(ModuleAssignee.module_id == module.id)
+    )
+    return set(result.scalars().all())
+
+
+async def test_fifo_assigns_in_arrival_order(db, queue, module):
+    users = await _users(db, [100.0] * (MAX_MODULE_ASSIGNEES + 2))
+
+    winners = await _submit_all(queue, module, "fifo", users)
+
+    assert winners == [user.username for user in users[:MAX_MODULE_ASSIGNEES]]
+    assert await _assigned(db, module) == {user.id for user in users[:MAX_MODULE_ASSIGNEES]}
+    assert await db.scalar(select(Module.assignee_count).where(Module.id == module.id)) == MAX_MODULE_ASSIGNEES
+    assert queue.metrics()["batches"] == 1 and queue.metrics()["winners"] == MAX_MODULE_ASSIGNEES
+
+
+async def test_reputation_prefers_higher_scores_then_arrival(db, queue, module):
+    users = await _users(db, [50.0, 90.0, 70.0, 90.0, 10.0, 80.0, 60.0])
+
+    winners = await _submit_all(queue, module, "reputation", users)
+
+    assert winners == ["node1", "node2", "node3", "node5", "node6"]
+
+
+async def test_lottery_draws_with_random_shuffle(db, queue, module, monkeypatch):
+    monkeypatch.setattr(dispatch.random, "shuffle", lambda entries: entries.reverse())
+    users = await _users(db, [100.0] * (MAX_MODULE_ASSIGNEES + 2))
+
+    winners = await _submit_all(queue, module, "lottery", users)
+
+    assert winners == [user.username for user in users[2:]]
+
+
+async def test_full_module_is_rejected_without_queueing(db, queue, module, query_counter):
+    users = await _users(db, [100.0] * (MAX_MODULE_ASSIGNEES + 1))
+    await _submit_all(queue, module, "fifo", users[:MAX_MODULE_ASSIGNEES])
+    assert queue.active_policy(module.id) == "fifo"
+    query_counter.clear()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await queue.submit(module.id, "fifo", users[-1])
+
+    assert "已满" in exc_info.value.detail
+    assert query_counter == []
+    assert queue.metrics()["fast_rejections"] == 1
+
+    # 释放名额后清除标记，请求重新进入窗口
+    queue.forget(module.id)
+    assert queue.active_policy(module.id) is None
+
+
+async def test_disconnected_request_does_not_leak_unretrieved_exception(db, queue, module):
+    module_id = module.id
+    await _submit_all(queue, module, "fifo", await _users(db, [100.0] * MAX_MODULE_ASSIGNEES))
+    queue.forget(module_id)
+    late = await create_user(db, "late")
+
+    loop = asyncio.get_running_loop()
+    errors = []
+    loop.set_exception_handler(lambda _loop, context: errors.append(context))
+    try:
+        # 客户端在窗口结算前断开，结算时该请求未中签
+        request = asyncio.create_task(queue.submit(module_id, "fifo", late))
+        await asyncio.sleep(0)
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        await asyncio.gather(*queue._tasks)
+        del request
+        gc.collect()
+    finally:
+        loop.set_exception_handler(None)
+
+    assert errors == []
+    assert queue.metrics()["batches"] == 2
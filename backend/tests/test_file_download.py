@@ -0,0 +1,75 @@
+import pytest
+from starlette.requests import Request
+
+from app.core.file_download import parse_range_header, build_file_response, MAX_RANGES
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=100-", [(100, 999)]),
+    ("bytes=-100", [(900, 999)]),
+    ("bytes=990-2000", [(990, 999)]),
+    ("bytes=500-599, 0-99", [(0, 99), (500, 599)]),
+    # 重叠和相邻的区间合并
+    ("bytes=0-99,50-149", [(0, 149)]),
+    ("bytes=0-99,100-199", [(0, 199)]),
+    ("bytes=0-,0-,0-", [(0, 999)]),
+    ("bytes=-500,0-", [(0, 999)]),
+    ("bytes=200-299,0-49,40-59,300-300", [(0, 59), (200, 300)]),
+    # 全部不可满足
+    ("bytes=1000-", []),
+    ("bytes=5000-6000,1000-", []),
+    # 格式错误：忽略 Range
+    ("items=0-99", None),
+    ("bytes=", None),
+    ("bytes=abc-def", None),
+    ("bytes=100-50", None),
+    ("bytes=0-99,,200-299", None),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+def test_too_many_ranges_are_ignored():
+    assert parse_range_header("bytes=" + ",".join(["0-"] * MAX_RANGES), 1000) == [(0, 999)]
+    assert parse_range_header("bytes=" + ",".join(["0-"] * (MAX_RANGES + 1)), 1000) is None
+
+
+def _request(range_header: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"range", range_header.encode("latin-1"))],
+    })
+
+
+def test_repeated_ranges_are_served_once(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"x" * 1000)
+
+    response = build_file_response(_request("bytes=0-,0-,0-"), path, "file.bin", "application/octet-stream")
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 0-999/1000"
+    assert response.headers["content-length"] == "1000"
+
+
+def test_range_amplification_falls_back_to_full_response(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"x" * 1000)
+
+    header = "bytes=" + ",".join(f"{i * 10}-{i * 10}" for i in range(MAX_RANGES + 1))
+    response = build_file_response(_request(header), path, "file.bin", "application/octet-stream")
+
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+
+
+def test_unsatisfiable_range_returns_416(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"x" * 10)
+
+    response = build_file_response(_request("bytes=100-"), path, "file.bin", "application/octet-stream")
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from app.db.session import AsyncSessionLocal
+from app.models import Module, ModuleAssignee, User
+from app.models.module import MAX_MODULE_ASSIGNEES
+from app.models.user import MAX_CONCURRENT_TASKS
+from app.services.assignments import grab_module, remove_assignment
+
+from tests.conftest import create_user, create_project, create_module
+
+
+async def _grab(module_id: int, user_id: int):
+    """每个抢单使用独立会话（独立连接），模拟并发请求"""
+    async with AsyncSessionLocal() as session:
+        try:
+            await grab_module(session, module_id, user_id)
+            await session.commit()
+            return None
+        except HTTPException as e:
+            return e.detail
+
+
+async def _timed_grab(module_id: int, user_id: int, latencies: list):
+    started = time.perf_counter()
+    result = await _grab(module_id, user_id)
+    latencies.append(time.perf_counter() - started)
+    return result
+
+
+async def _assignee_count(db, module_id: int) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(ModuleAssignee).where(ModuleAssignee.module_id == module_id)
+    )
+
+
+async def _module_counter(db, module_id: int) -> int:
+    return await db.scalar(select(Module.assignee_count).where(Module.id == module_id))
+
+
+async def _user_counter(db, user_id: int) -> int:
+    return await db.scalar(select(User.concurrent_task_count).where(User.id == user_id))
+
+
+async def test_concurrent_grabs_respect_module_cap(db):
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander))
+    users = [await create_user(db, f"node{i}") for i in range(MAX_MODULE_ASSIGNEES * 2)]
+
+    results = await asyncio.gather(*[_grab(module.id, user.id) for user in users])
+
+    assert results.count(None) == MAX_MODULE_ASSIGNEES
+    assert all("已满" in detail for detail in results if detail is not None)
+    assert await _assignee_count(db, module.id) == MAX_MODULE_ASSIGNEES
+    assert await _module_counter(db, module.id) == MAX_MODULE_ASSIGNEES
+    # 失败的抢单不占用户槽位
+    counts = [await _user_counter(db, user.id) for user in users]
+    assert sorted(counts) == [0] * MAX_MODULE_ASSIGNEES + [1] * MAX_MODULE_ASSIGNEES
+
+
+async def test_concurrent_grabs_respect_user_task_slots(db):
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    modules = [await create_module(db, project, f"模块{i}") for i in range(MAX_CONCURRENT_TASKS + 3)]
+    user = await create_user(db, "node")
+
+    results = await asyncio.gather(*[_grab(module.id, user.id) for module in modules])
+
+    assert results.count(None) == MAX_CONCURRENT_TASKS
+    assert all("最大并发任务数" in detail for detail in results if detail is not None)
+    assert await _user_counter(db, user.id) == MAX_CONCURRENT_TASKS
+    # 失败的抢单不占模块名额
+    assert sorted([await _module_counter(db, module.id) for module in modules]) == (
+        [0] * 3 + [1] * MAX_CONCURRENT_TASKS
+    )
+
+
+async def test_same_user_grabbing_twice_concurrently_is_assigned_once(db):
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander))
+    user = await create_user(db, "node")
+
+    results = await asyncio.gather(*[_grab(module.id, user.id) for _ in range(4)])
+
+    assert results.count(None) == 1
+    assert await _assignee_count(db, module.id) == 1
+    assert await _user_counter(db, user.id) == 1
+    assert await _module_counter(db, module.id) == 1
+
+
+async def test_released_slot_can_be_grabbed_again(db):
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander))
+    users = [await create_user(db, f"node{i}") for i in range(MAX_MODULE_ASSIGNEES + 1)]
+    for user in users[:MAX_MODULE_ASSIGNEES]:
+        assert await _grab(module.id, user.id) is None
+    assert "已满" in await _grab(module.id, users[-1].id)
+
+    assert await remove_assignment(db, module.id, users[0].id)
+    await db.commit()
+
+    assert await _grab(module.id, users[-1].id) is None
+    assert await _user_counter(db, users[0].id) == 0
+    assert await _module_counter(db, module.id) == MAX_MODULE_ASSIGNEES
+
+
+async def test_grabbing_closed_module_is_rejected(db):
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander), status="closed")
+    user = await create_user(db, "node")
+
+    assert await _grab(module.id, user.id) == "模块不可承接"
+    with pytest.raises(HTTPException) as exc_info:
+        await grab_module(db, module.id + 100, user.id)
+    assert exc_info.value.status_code == 404
+
+
+async def test_concurrent_grab_benchmark(db):
+    """1000 个并发抢单分布在少量模块上：上限不被突破，计数与关联行一致
+
+    SQLite 上所有写事务串行，耗时包含排队等待连接池和写锁的时间。
+    """
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    modules = [await create_module(db, project, f"模块{i}") for i in range(8)]
+    users = [User(username=f"node{i}", hashed_password="x", role="node") for i in range(250)]
+    db.add_all(users)
+    await db.commit()
+    # 每个用户抢 4 个模块，超过个人并发上限
+    grabs = [(modules[(i + j) % len(modules)].id, user.id) for i, user in enumerate(users) for j in range(4)]
+    latencies = []
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[_timed_grab(module_id, user_id, latencies) for module_id, user_id in grabs])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99_ms = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"\n{len(grabs)} grabs in {elapsed:.2f} s ({len(grabs) / elapsed:.0f} ops/s, p99 {p99_ms:.1f} ms)")
+
+    assert len(grabs) == 1000
+    assert results.count(None) == len(modules) * MAX_MODULE_ASSIGNEES
+    for module in modules:
+        assert await _module_counter(db, module.id) == await _assignee_count(db, module.id) == MAX_MODULE_ASSIGNEES
+    assigned = dict((await db.execute(
+        select(ModuleAssignee.user_id, func.count()).group_by(ModuleAssignee.user_id)
+    )).all())
+    for user in users:
+        assert await _user_counter(db, user.id) == assigned.get(user.id, 0) <= MAX_CONCURRENT_TASKS
@@ -0,0 +1,107 @@
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import select, func
+
+from app.models import Base, Module, ModuleAssignee, Delivery, Notification, User, KnowledgeLink
+from app.services.module_timeouts import _pending_timeout_conditions
+
+MIGRATION = Path(__file__).parent.parent / "alembic" / "versions" / "20261018_0900_8e97ebe017a8_add_hot_path_indexes.py"
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("hot_path_indexes", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def _query_plan(db, query) -> str:
+    compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return "\n".join(row[-1] for row in result.all())
+
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("query, index", [
+    (
+        select(Notification).where(Notification.recipient_id == 1, Notification.is_read == False)
+        .order_by(Notification.created_at.desc(), Notification.id.desc()),
+        "ix_notifications_recipient_read_created",
+    ),
+    (select(Module).where(Module.project_id == 1), "ix_modules_project_id"),
+    (
+        select(Module.id).where(*_pending_timeout_conditions(NOW)).order_by(Module.deadline, Module.id),
+        "ix_modules_status_timeout_deadline",
+    ),
+    (select(ModuleAssignee).where(ModuleAssignee.user_id == 1), "ix_module_assignees_user_id"),
+    (select(Delivery).where(Delivery.assignee_id == 1), "ix_deliveries_assignee_id"),
+    (select(KnowledgeLink).where(KnowledgeLink.module_id == 1), "ix_knowledge_links_module_id"),
+    (select(User.id).where(func.lower(User.role) == "commander"), "ix_users_role_lower"),
+])
+async def test_hot_queries_use_indexes(db, query, index):
+    assert index in await _query_plan(db, query)
+
+
+def _legacy_schema(engine) -> sa.MetaData:
+    """基线结构：没有唯一约束和索引（模拟升级前的数据库）"""
+    metadata = sa.MetaData()
+    for table in Base.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        copy.constraints = {c for c in copy.constraints if not isinstance(c, sa.UniqueConstraint)}
+        copy.indexes.clear()
+    metadata.create_all(engine)
+    return metadata
+
+
+def test_upgrade_removes_duplicate_deliveries_and_reviews(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    tables = _legacy_schema(engine).tables
+
+    with engine.begin() as conn:
+        def insert(table, *rows):
+            conn.execute(tables[table].insert(), list(rows))
+
+        insert("users", {"id": 1, "username": "boss", "hashed_password": "x", "role": "commander"},
+               {"id": 2, "username": "node", "hashed_password": "x", "role": "node"})
+        insert("projects", {"id": 1, "name": "p", "creator_id": 1})
+        insert("modules", {"id": 1, "title": "m1", "description": "", "project_id": 1, "creator_id": 1},
+               {"id": 2, "title": "m2", "description": "", "project_id": 1, "creator_id": 1})
+        insert("module_assignees", {"module_id": 1, "user_id": 2}, {"module_id": 1, "user_id": 2},
+               {"module_id": 2, "user_id": 2})
+        # 模块 1：三条交付，只有第二条被验收（两次）；模块 2：两条未验收的交付
+        insert("deliveries", *[
+            {"id": delivery_id, "module_id": module_id, "assignee_id": 2, "content": "c"}
+            for delivery_id, module_id in [(1, 1), (2, 1), (3, 1), (4, 2), (5, 2)]
+        ])
+        insert("reviews", {"id": 1, "delivery_id": 2, "reviewer_id": 1, "decision": "pass"},
+               {"id": 2, "delivery_id": 2, "reviewer_id": 1, "decision": "reject"})
+
+    migration = _load_migration()
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+
+    with engine.connect() as conn:
+        deliveries = conn.exec_driver_sql("SELECT id FROM deliveries ORDER BY id").scalars().all()
+        reviews = conn.exec_driver_sql("SELECT id, delivery_id FROM reviews").all()
+        assignees = conn.exec_driver_sql("SELECT COUNT(*) FROM module_assignees").scalar()
+        inspector = sa.inspect(conn)
+        delivery_constraints = {uc["name"] for uc in inspector.get_unique_constraints("deliveries")}
+        review_constraints = {uc["name"] for uc in inspector.get_unique_constraints("reviews")}
+
+    assert deliveries == [2, 4]
+    assert [tuple(row) for row in reviews] == [(1, 2)]
+    assert assignees == 2
+    assert "uq_deliveries_module_assignee" in delivery_constraints
+    assert "uq_reviews_delivery_id" in review_constraints
+    engine.dispose()
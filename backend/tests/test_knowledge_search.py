@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models import KnowledgeItem
+from app.services.knowledge_search import parse_search_query, _postgres_scores
+
+from tests.conftest import create_user, auth_headers
+
+ITEMS = [
+    {"title": "前端登录模块开发说明", "description": None, "content_text": None},
+    {"title": "后端接口文档", "description": "用户登录流程与令牌刷新", "content_text": None},
+    {"title": "Quick brown fox", "description": "an English note", "content_text": None},
+    {"title": "运维记录", "description": None, "content_text": "生产环境部署手册：先备份数据库"},
+    {"title": "axb", "description": None, "content_text": None},
+]
+
+
+@pytest.fixture
+async def knowledge(db):
+    user = await create_user(db, "uploader")
+    items = []
+    for values in ITEMS:
+        item = KnowledgeItem(
+            file_url="/tmp/none",
+            file_name="f.txt",
+            file_size=1,
+            file_type="text/plain",
+            uploader_id=user.id,
+            **values
+        )
+        db.add(item)
+        items.append(item)
+    await db.commit()
+    return user, items
+
+
+async def _search(client, user, search: str) -> list:
+    response = await client.get("/api/v1/knowledge/", params={"search": search}, headers=auth_headers(user))
+    assert response.status_code == 200
+    return [item["title"] for item in response.json()]
+
+
+@pytest.mark.parametrize("search, expected", [
+    # 少于 3 个字符的中文词（子串匹配），标题命中排在描述命中之前
+    ("登录", ["前端登录模块开发说明", "后端接口文档"]),
+    ("登录模块", ["前端登录模块开发说明"]),
+    ("前端 登录", ["前端登录模块开发说明"]),
+    ('"登录流程"', ["后端接口文档"]),
+    # 提取出的文件文本
+    ("部署", ["运维记录"]),
+    ("部署手册", ["运维记录"]),
+    # 英文：大小写不敏感，前缀和短语
+    ("QUICK", ["Quick brown fox"]),
+    ("qui*", ["Quick brown fox"]),
+    ('"brown fox"', ["Quick brown fox"]),
+    # LIKE 通配符按字面匹配
+    ("a_b", []),
+    ("x_", []),
+    ("不存在", []),
+])
+async def test_search(client, knowledge, search, expected):
+    user, _items = knowledge
+    assert await _search(client, user, search) == expected
+
+
+async def test_search_follows_updates(db, client, knowledge):
+    user, items = knowledge
+    items[2].title = "慢速的狐狸"
+    await db.commit()
+
+    assert await _search(client, user, "狐狸") == ["慢速的狐狸"]
+    assert await _search(client, user, "quick") == []
+
+
+def test_postgres_uses_substring_match_for_cjk_terms():
+    scores = _postgres_scores(parse_search_query("登录 report*"))
+    sql = str(scores.element.compile(dialect=postgresql.dialect()))
+
+    # 中文词：对检索文本做 ILIKE（pg_trgm 索引），英文词：tsvector
+    assert "coalesce(content_text, '')) ILIKE" in sql
+    assert "knowledge_items.search_vector @@ to_tsquery" in sql
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from app.core import leader
+from app.core.leader import LeaderElector
+from app.tasks import leader_only
+
+pytestmark = pytest.mark.skipif(leader.fcntl is None, reason="需要 fcntl")
+
+
+@pytest.fixture
+def electors(tmp_path):
+    """共用一个锁文件的两个选举器（SQLite 下使用 flock）"""
+    lock_file = str(tmp_path / "scheduler.lock")
+    first = LeaderElector(interval_seconds=60, lock_file=lock_file)
+    second = LeaderElector(interval_seconds=60, lock_file=lock_file)
+    first.identity, second.identity = "host-a:1", "host-b:2"
+    yield first, second
+    for elector in (first, second):
+        if elector._file is not None:
+            elector._file.close()
+
+
+async def test_second_elector_is_not_leader(electors):
+    first, second = electors
+    assert first.backend == "file_lock"
+
+    await first._tick()
+    await second._tick()
+
+    assert first.is_leader and first.promotions == 1
+    assert not second.is_leader and second.leader_since is None
+    # leader 重复检查时保持不变
+    await first._tick()
+    assert first.is_leader and first.promotions == 1
+
+
+async def test_takeover_after_release(electors):
+    first, second = electors
+    await first._tick()
+    await second._tick()
+
+    await first._release()
+    assert not first.is_leader
+    await second._tick()
+
+    assert second.is_leader
+    await first._tick()
+    assert not first.is_leader
+
+
+async def test_takeover_after_stop(electors):
+    first, second = electors
+    await first.start()
+    assert first.is_leader and first._task is not None
+
+    await first.stop()
+    assert first._task is None and not first.is_leader
+    await second._tick()
+
+    assert second.is_leader
+
+
+async def test_current_leader_reads_identity_from_lock_file(electors):
+    first, second = electors
+    assert await second.current_leader() is None
+
+    await first._tick()
+    await second._tick()
+
+    with open(first.lock_file) as lock:
+        assert json.load(lock)["identity"] == "host-a:1"
+    assert await second.current_leader() == "host-a:1"
+    assert await first.current_leader() == "host-a:1"
+    assert (await second.status())["leader"] == "host-a:1"
+
+    # 锁已释放而文件内容还在：内容已过期
+    await first._release()
+    assert await second.current_leader() is None
+
+
+async def test_leader_only_skips_jobs_when_not_leader(monkeypatch):
+    runs = []
+
+    @leader_only
+    async def job():
+        runs.append(True)
+
+    monkeypatch.setattr(leader.leader_elector, "is_leader", False)
+    await job()
+    assert runs == []
+
+    monkeypatch.setattr(leader.leader_elector, "is_leader", True)
+    await job()
+    assert runs == [True]
+    assert job.__name__ == "job"
@@ -0,0 +1,115 @@
+import bisect
+import random
+
+import pytest
+
+from app.services import leaderboard as leaderboard_module
+from app.services.leaderboard import IndexableSkipList, Leaderboard
+
+from tests.conftest import create_user
+
+
+def _check_widths(skiplist: IndexableSkipList) -> None:
+    """每层从头节点出发的跨度之和都等于元素个数"""
+    for level in range(skiplist._level):
+        node, total = skiplist._head, 0
+        while node is not None:
+            total += node.width[level]
+            node = node.forward[level]
+        assert total == len(skiplist) + 1
+
+
+def _check_against(skiplist: IndexableSkipList, expected: list) -> None:
+    assert len(skiplist) == len(expected)
+    assert skiplist.slice(0, len(expected) + 5) == expected
+    for start in range(-3, len(expected) + 2):
+        assert skiplist.slice(start, 4) == expected[max(start, 0):max(start + 4, 0)]
+    for key in expected[::7] + [-1, 10 ** 6]:
+        assert skiplist.bisect_left(key) == bisect.bisect_left(expected, key)
+    _check_widths(skiplist)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_skiplist_matches_sorted_list(seed):
+    random.seed(seed)
+    skiplist, expected = IndexableSkipList(), []
+
+    for _ in range(600):
+        key = random.randrange(1000)
+        position = bisect.bisect_left(expected, key)
+        if position < len(expected) and expected[position] == key:
+            assert skiplist.remove(key)
+            expected.pop(position)
+        else:
+            skiplist.insert(key)
+            expected.insert(position, key)
+    _check_against(skiplist, expected)
+
+    assert not skiplist.remove(-1)
+    for key in expected[::2]:
+        assert skiplist.remove(key)
+    _check_against(skiplist, expected[1::2])
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 100, 1000])
+def test_from_sorted_builds_same_index(size):
+    random.seed(size)
+    keys = sorted(random.sample(range(10 * size + 1), size))
+    skiplist = IndexableSkipList.from_sorted(keys)
+    _check_against(skiplist, keys)
+
+    # 批量构建后继续增量修改
+    skiplist.insert(-5)
+    for key in keys[:1]:
+        assert skiplist.remove(key)
+    _check_against(skiplist, [-5] + keys[1:])
+
+
+def test_slice_edges():
+    skiplist = IndexableSkipList.from_sorted(list(range(10)))
+    assert skiplist.slice(8, 5) == [8, 9]
+    assert skiplist.slice(10, 5) == []
+    assert skiplist.slice(-2, 3) == [0]
+    assert skiplist.slice(3, 0) == []
+
+
+def _board(scores: dict) -> Leaderboard:
+    board = Leaderboard(rebuild_minutes=10)
+    board._loaded = True
+    for user_id, score in scores.items():
+        board.update(user_id, score, f"u{user_id}", "node")
+    return board
+
+
+def test_competition_ranks_and_neighbours():
+    board = _board({1: 50.0, 2: 90.0, 3: 70.0, 4: 90.0, 5: 10.0})
+
+    assert [(e["rank"], e["user_id"]) for e in board.top(10)] == [(1, 2), (1, 4), (3, 3), (4, 1), (5, 5)]
+    assert [e["user_id"] for e in board.top(2, offset=2)] == [3, 1]
+    assert board.rank_of(4) == 1 and board.rank_of(5) == 5 and board.rank_of(99) is None
+    assert [e["user_id"] for e in board.around(2, 1)] == [2, 4]
+    assert [e["user_id"] for e in board.around(3, 1)] == [4, 3, 1]
+
+    board.update(5, 95.0, "u5", "node")
+    board.remove(4)
+    assert [(e["rank"], e["user_id"]) for e in board.top(10)] == [(1, 5), (2, 2), (3, 3), (4, 1)]
+
+
+async def test_committed_user_changes_update_the_ranking(db, monkeypatch):
+    board = Leaderboard(rebuild_minutes=10)
+    monkeypatch.setattr(leaderboard_module, "leaderboard", board)
+    first = await create_user(db, "first", reputation_score=80.0)
+    second = await create_user(db, "second", reputation_score=60.0)
+    await board.rebuild(db)
+
+    second.reputation_score = 90.0
+    await db.commit()
+    third = await create_user(db, "third", reputation_score=70.0)
+
+    assert [e["username"] for e in board.top(10)] == ["second", "first", "third"]
+    assert board.rank_of(third.id) == 3
+
+    await db.delete(first)
+    await db.commit()
+    assert [e["username"] for e in board.top(10)] == ["second", "third"]
+    assert board.metrics()["rebuilds"] == 1
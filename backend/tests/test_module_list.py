@@ -0,0 +1,55 @@
+from app.models import ModuleAssignee, Delivery
+
+from tests.conftest import create_user, create_project, create_module, auth_headers
+
+
+async def _seed(db):
+    commander = await create_user(db, "commander", role="commander")
+    nodes = [await create_user(db, f"node{i}") for i in range(3)]
+    project = await create_project(db, commander)
+    return commander, nodes, project
+
+
+async def _add_modules(db, project, nodes, start: int, stop: int):
+    """模块 i 有 i % 3 + 1 个承接人和一条交付"""
+    for i in range(start, stop):
+        module = await create_module(db, project, title=f"模块{i}")
+        for node in nodes[: i % 3 + 1]:
+            db.add(ModuleAssignee(module_id=module.id, user_id=node.id))
+        db.add(Delivery(module_id=module.id, assignee_id=nodes[0].id, content="done"))
+    await db.commit()
+
+
+async def _list_modules(client, query_counter, headers):
+    query_counter.clear()
+    response = await client.get("/api/v1/modules/", headers=headers)
+    assert response.status_code == 200
+    return len(query_counter), response.json()
+
+
+async def test_list_modules_query_count_does_not_grow_with_page_size(db, client, query_counter):
+    commander, nodes, project = await _seed(db)
+    headers = auth_headers(commander)
+
+    await _add_modules(db, project, nodes, 0, 2)
+    small_count, small_page = await _list_modules(client, query_counter, headers)
+
+    await _add_modules(db, project, nodes, 2, 30)
+    large_count, large_page = await _list_modules(client, query_counter, headers)
+
+    assert len(small_page) == 2
+    assert len(large_page) == 30
+    assert large_count == small_count
+
+
+async def test_list_modules_builds_assignees_and_deliveries(db, client):
+    commander, nodes, project = await _seed(db)
+    await _add_modules(db, project, nodes, 0, 3)
+
+    response = await client.get("/api/v1/modules/", headers=auth_headers(commander))
+
+    modules = {module["title"]: module for module in response.json()}
+    assert [len(modules[f"模块{i}"]["assignees"]) for i in range(3)] == [1, 2, 3]
+    assert all(len(module["deliveries"]) == 1 for module in modules.values())
+    assert all(module["project_name"] == "项目" for module in modules.values())
+    assert all(module["creator_name"] == "commander" for module in modules.values())
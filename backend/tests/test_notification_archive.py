@@ -0,0 +1,29 @@
+from app.models import Notification
+
+from tests.conftest import create_user, auth_headers
+
+
+async def _notify(db, user, title: str) -> Notification:
+    notification = Notification(recipient_id=user.id, type="module_published", title=title, content="", is_read=True)
+    db.add(notification)
+    await db.commit()
+    return notification
+
+
+async def test_reused_notification_id_can_be_archived_again(db, client):
+    user = await create_user(db, "node")
+    headers = auth_headers(user)
+    first = await _notify(db, user, "第一条")
+
+    response = await client.post("/api/v1/notifications/bulk/archive", json={}, headers=headers)
+    assert response.json()["count"] == 1
+
+    # SQLite 会把已移出的最大 id 分配给下一条通知
+    second = await _notify(db, user, "第二条")
+    assert second.id == first.id
+
+    response = await client.post("/api/v1/notifications/bulk/archive", json={}, headers=headers)
+    assert response.status_code == 200 and response.json()["count"] == 1
+
+    archived = (await client.get("/api/v1/notifications/archived", headers=headers)).json()
+    assert [(item["id"], item["title"]) for item in archived] == [(first.id, "第二条"), (first.id, "第一条")]
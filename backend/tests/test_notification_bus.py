@@ -0,0 +1,75 @@
+import asyncio
+
+from app.services.notification_bus import NotificationBus, RedisRelay
+
+
+class FakeRedis:
+    """进程间共享的 Redis 发布/订阅替身"""
+
+    def __init__(self):
+        self.channels = {}
+
+    async def publish(self, channel, payload):
+        for queue in self.channels.get(channel, []):
+            queue.put_nowait({"type": "message", "data": payload})
+        return len(self.channels.get(channel, []))
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.channels.setdefault(channel, []).append(self.queue)
+        self.queue.put_nowait({"type": "subscribe", "data": 1})
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_events_reach_subscribers_on_other_workers():
+    redis = FakeRedis()
+    worker_a = NotificationBus(relay=RedisRelay(redis))
+    worker_b = NotificationBus(relay=RedisRelay(redis))
+    await worker_a.start()
+    await worker_b.start()
+    try:
+        await _settle()
+        local = worker_a.subscribe(1, maxsize=10)
+        remote = worker_b.subscribe(1, maxsize=10)
+        other_user = worker_b.subscribe(2, maxsize=10)
+
+        worker_a.publish(1, "notification", {"title": "新任务"}, event_id=7)
+        await _settle()
+
+        expected = {"event": "notification", "id": 7, "data": {"title": "新任务"}}
+        # 发布进程直接推送，不会再收到自己转发的副本
+        assert local.queue.qsize() == 1 and local.queue.get_nowait() == expected
+        assert remote.queue.qsize() == 1 and remote.queue.get_nowait() == expected
+        assert other_user.queue.empty()
+        assert worker_a.relay.sent == 1 and worker_b.relay.received == 1
+    finally:
+        await worker_a.stop()
+        await worker_b.stop()
+
+
+async def test_bus_without_relay_is_process_local():
+    bus = NotificationBus()
+    subscription = bus.subscribe(1, maxsize=1)
+
+    bus.publish(1, "unread", {"delta": 1})
+    bus.publish(1, "unread", {"delta": 1})
+
+    assert subscription.overflowed
+    assert bus.metrics()["relay"] == "none"
+    assert bus.metrics()["overflows"] == 1
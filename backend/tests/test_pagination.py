@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.core.pagination import encode_cursor, decode_cursor, encode_payload, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.models import Module
+
+from tests.conftest import create_user, create_project, create_module, auth_headers
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 18, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_payload(["list"]), encode_payload({"t": None})])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
+
+
+async def _pages(client, headers, limit: int, **params) -> list:
+    pages, cursor = [], None
+    while True:
+        response = await client.get(
+            "/api/v1/modules/",
+            params={"limit": limit, **params, **({"cursor": cursor} if cursor else {})},
+            headers=headers
+        )
+        assert response.status_code == 200
+        pages.append([module["id"] for module in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return pages
+
+
+async def test_keyset_pages_cover_all_rows_once_with_tied_timestamps(db, client):
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    module_ids = [(await create_module(db, project, title=f"模块{i}")).id for i in range(7)]
+    # 所有行的 created_at 相同，只能靠 id 区分先后
+    await db.execute(update(Module).values(created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)))
+    await db.commit()
+
+    pages = await _pages(client, auth_headers(commander), limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [module_id for page in pages for module_id in page] == sorted(module_ids, reverse=True)
+
+
+async def test_cursor_survives_deleted_anchor_row(db, client):
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    modules = [await create_module(db, project, title=f"模块{i}") for i in range(4)]
+    headers = auth_headers(commander)
+
+    first = await client.get("/api/v1/modules/", params={"limit": 2}, headers=headers)
+    assert [m["id"] for m in first.json()] == [modules[3].id, modules[2].id]
+
+    # 游标行被删除后，以游标中携带的时间戳继续
+    await db.delete(await db.get(Module, modules[2].id))
+    await db.commit()
+    second = await client.get(
+        "/api/v1/modules/",
+        params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]},
+        headers=headers
+    )
+    assert [m["id"] for m in second.json()] == [modules[1].id, modules[0].id]
+
+
+async def test_with_total_sets_count_header(db, client):
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    for i in range(5):
+        await create_module(db, project, title=f"模块{i}")
+
+    response = await client.get(
+        "/api/v1/modules/", params={"limit": 2, "with_total": True}, headers=auth_headers(commander)
+    )
+    assert response.headers[TOTAL_COUNT_HEADER] == "5"
+
+
+async def test_malformed_cursor_returns_400(db, client):
+    commander = await create_user(db, "commander", role="commander")
+    response = await client.get(
+        "/api/v1/modules/", params={"cursor": "%%%"}, headers=auth_headers(commander)
+    )
+    assert response.status_code == 400
@@ -0,0 +1,143 @@
+import pytest
+from sqlalchemy import select, text
+
+from app.core.deps import authenticate_token
+from app.core.principal_cache import principal_cache
+from app.core.security import create_access_token
+from app.db.session import engine, AsyncSessionLocal
+from app.models import User
+from app.services.assignments import grab_module
+
+from tests.conftest import create_user, create_project, create_module, auth_headers
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """打开进程内缓存（conftest 中默认关闭）"""
+    monkeypatch.setattr(principal_cache, "enabled", True)
+    monkeypatch.setattr(principal_cache, "ttl_seconds", 30)
+    monkeypatch.setattr(principal_cache, "_entries", type(principal_cache._entries)())
+    for counter in ("hits", "misses", "invalidations"):
+        monkeypatch.setattr(principal_cache, counter, 0)
+    return principal_cache
+
+
+def _token(user: User) -> str:
+    return create_access_token(data={"sub": str(user.id)})
+
+
+def _user_selects(statements: list) -> list:
+    return [s for s in statements if s.lstrip().startswith("SELECT") and "FROM users" in s]
+
+
+async def _write_elsewhere(user_id: int, score: float) -> None:
+    """模拟其他 worker 的写入：不经过本进程的失效"""
+    async with engine.begin() as conn:
+        await conn.execute(text("UPDATE users SET reputation_score = :score WHERE id = :id"), {"score": score, "id": user_id})
+
+
+async def test_miss_then_hit_without_query(db, cache, query_counter):
+    user = await create_user(db, "node")
+    query_counter.clear()
+
+    first = await authenticate_token(db, _token(user))
+    second = await authenticate_token(db, _token(user))
+
+    assert len(_user_selects(query_counter)) == 1
+    assert (first.id, second.id) == (user.id, user.id)
+    assert second.username == "node" and second.role == "node"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_hit_returns_detached_snapshot(db, cache):
+    user = await create_user(db, "node", reputation_score=100.0)
+    user_id = user.id
+    await authenticate_token(db, _token(user))
+    db.expunge_all()
+    await _write_elsewhere(user_id, 150.0)
+
+    snapshot = await authenticate_token(db, _token(user))
+
+    # 快照带缓存时的旧值，但不进入会话，之后的查询读到数据库中的最新值
+    assert snapshot.reputation_score == 100.0
+    assert snapshot not in db
+    fresh = (await db.execute(select(User).where(User.id == user_id))).scalar_one()
+    assert fresh is not snapshot and fresh.reputation_score == 150.0
+
+
+async def test_my_series_reports_current_score_despite_cached_principal(db, client, cache):
+    user = await create_user(db, "node", reputation_score=100.0)
+    headers = auth_headers(user)
+    assert (await client.get("/api/v1/auth/me", headers=headers)).json()["reputation_score"] == 100.0
+    await _write_elsewhere(user.id, 120.0)
+
+    response = await client.get("/api/v1/reputation/me/series", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["current_score"] == 120.0
+    assert cache.hits == 1
+
+
+async def test_entries_expire_after_ttl(db, cache):
+    user = await create_user(db, "node")
+    cache.ttl_seconds = -1
+    await authenticate_token(db, _token(user))
+
+    assert cache.load(user.id) is None
+    assert cache.metrics()["size"] == 0
+
+
+async def test_lru_evicts_oldest(db, cache, monkeypatch):
+    monkeypatch.setattr(cache, "max_size", 2)
+    users = [await create_user(db, f"node{i}") for i in range(3)]
+    for user in users:
+        await authenticate_token(db, _token(user))
+
+    assert cache.load(users[0].id) is None
+    assert cache.load(users[2].id) is not None
+
+
+async def test_orm_changes_invalidate_on_flush_and_commit(db, cache):
+    user = await create_user(db, "node")
+    await authenticate_token(db, _token(user))
+
+    user.reputation_score = 130.0
+    await db.flush()
+    assert cache.load(user.id) is None
+
+    # 提交前其他请求重新缓存了旧值，提交后再次失效
+    async with engine.connect() as conn:
+        row = (await conn.execute(select(User).where(User.id == user.id))).first()
+    cache.put(User(**row._mapping))
+    await db.commit()
+    assert cache.load(user.id) is None
+
+    assert (await authenticate_token(db, _token(user))).reputation_score == 130.0
+
+
+async def test_bulk_update_invalidates_on_commit(db, cache):
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander))
+    user = await create_user(db, "node")
+    await authenticate_token(db, _token(user))
+
+    await grab_module(db, module.id, user.id)
+    assert cache.load(user.id) is None
+    await authenticate_token(db, _token(user))
+    await db.commit()
+
+    assert cache.load(user.id) is None
+    async with AsyncSessionLocal() as session:
+        assert (await authenticate_token(session, _token(user))).concurrent_task_count == 1
+
+
+async def test_rollback_discards_pending_invalidations(db, cache):
+    user = await create_user(db, "node")
+    user_id, token = user.id, _token(user)
+    user.reputation_score = 1.0
+    await db.flush()
+    await db.rollback()
+
+    await authenticate_token(db, token)
+    await db.commit()
+    assert cache.load(user_id) is not None
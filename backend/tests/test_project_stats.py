@@ -0,0 +1,136 @@
+import pytest
+from sqlalchemy import update
+
+from app.core.query_cache import query_cache, MemoryBackend
+from app.models.delivery import Delivery
+from app.models.module import Module
+from app.models.review import Review, ReviewDecision
+from app.services.project_stats import MODULE_STATUSES, _query_stats
+
+from tests.conftest import create_user, create_project, create_module, auth_headers
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """打开进程内查询缓存（conftest 中默认关闭）"""
+    monkeypatch.setattr(query_cache, "backend", MemoryBackend(max_size=100))
+    for counter in ("hits", "misses"):
+        monkeypatch.setattr(query_cache, counter, 0)
+    return query_cache
+
+
+def _by_status(**counts) -> dict:
+    return {status: counts.get(status, 0) for status in MODULE_STATUSES}
+
+
+async def _deliver(db, module, users, reviewed: int = 0) -> None:
+    commander_id = module.creator_id
+    deliveries = [Delivery(module_id=module.id, assignee_id=user.id, content="交付") for user in users]
+    db.add_all(deliveries)
+    await db.flush()
+    for delivery in deliveries[:reviewed]:
+        db.add(Review(delivery_id=delivery.id, reviewer_id=commander_id, decision=ReviewDecision.REJECT))
+    await db.commit()
+
+
+async def test_stats_aggregate_modules_without_multiplying_by_deliveries(db):
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    other = await create_project(db, commander, "其他项目")
+    empty = await create_project(db, commander, "空项目")
+    nodes = [await create_user(db, f"node{i}") for i in range(3)]
+
+    await create_module(db, project, "待承接", bounty=10.0)
+    busy = await create_module(db, project, "进行中", bounty=20.0, status="in_progress", assignee_count=2)
+    await create_module(db, project, "已完成", bounty=30.0, status="completed")
+    await create_module(db, project, "超时", bounty=5.0, is_timeout=True)
+    await create_module(db, other, "其他", bounty=100.0)
+    # 一个模块三条交付：统计不能被交付行放大
+    await _deliver(db, busy, nodes, reviewed=2)
+
+    stats = await _query_stats(db, [project.id, other.id, empty.id])
+
+    assert stats[project.id] == {
+        "module_count": 4,
+        "modules_by_status": _by_status(open=2, in_progress=1, completed=1),
+        "timed_out_count": 1,
+        "total_bounty": 65.0,
+        "allocated_bounty": 50.0,
+        "assignee_count": 2,
+        "delivery_count": 3,
+        "reviewed_delivery_count": 2,
+    }
+    assert stats[other.id]["module_count"] == 1 and stats[other.id]["total_bounty"] == 100.0
+    assert stats[empty.id] == {
+        "module_count": 0,
+        "modules_by_status": _by_status(),
+        "timed_out_count": 0,
+        "total_bounty": 0.0,
+        "allocated_bounty": 0.0,
+        "assignee_count": 0,
+        "delivery_count": 0,
+        "reviewed_delivery_count": 0,
+    }
+
+
+async def test_stats_endpoints(db, client):
+    commander = await create_user(db, "commander", role="commander")
+    headers = auth_headers(commander)
+    project = await create_project(db, commander)
+    empty = await create_project(db, commander, "空项目")
+    await create_module(db, project, bounty=12.5)
+
+    response = await client.get(f"/api/v1/projects/{project.id}/stats", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["module_count"] == 1 and response.json()["total_bounty"] == 12.5
+
+    response = await client.get(f"/api/v1/projects/{empty.id}/stats", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["module_count"] == 0
+
+    listed = await client.get("/api/v1/projects/", params={"with_stats": True}, headers=headers)
+    assert {p["id"]: p["stats"]["module_count"] for p in listed.json()} == {project.id: 1, empty.id: 0}
+
+    assert (await client.get(f"/api/v1/projects/{empty.id + 100}/stats", headers=headers)).status_code == 404
+
+
+async def test_cached_stats_follow_grab_delivery_and_review(db, client, cache):
+    commander = await create_user(db, "commander", role="commander")
+    node = await create_user(db, "node")
+    project = await create_project(db, commander)
+    module = await create_module(db, project, bounty=10.0)
+    url = f"/api/v1/projects/{project.id}/stats"
+
+    async def stats() -> dict:
+        response = await client.get(url, headers=auth_headers(commander))
+        assert response.status_code == 200
+        return response.json()
+
+    assert (await stats())["total_bounty"] == 10.0
+    # 绕过接口的写入不会使缓存失效：证明读取的是缓存
+    await db.execute(update(Module).where(Module.id == module.id).values(bounty=15.0))
+    await db.commit()
+    assert (await stats())["total_bounty"] == 10.0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    response = await client.post(f"/api/v1/modules/{module.id}/assign", headers=auth_headers(node))
+    assert response.status_code == 201
+    after_grab = await stats()
+    assert after_grab["assignee_count"] == 1
+    assert after_grab["total_bounty"] == after_grab["allocated_bounty"] == 15.0
+
+    response = await client.post(
+        "/api/v1/deliveries/", json={"module_id": module.id, "content": "完成"}, headers=auth_headers(node)
+    )
+    assert response.status_code == 201
+    assert (await stats())["delivery_count"] == 1
+
+    response = await client.post(
+        "/api/v1/reviews/",
+        json={"delivery_id": response.json()["id"], "decision": "pass", "reputation_change": 5},
+        headers=auth_headers(commander)
+    )
+    assert response.status_code == 201
+    after_review = await stats()
+    assert after_review["reviewed_delivery_count"] == 1
+    assert after_review["modules_by_status"]["completed"] == 1
@@ -0,0 +1,111 @@
+import json
+import pickle
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_cache import query_cache, QueryCache, MemoryBackend, RedisBackend, _create_backend
+
+from tests.conftest import create_user, create_project, create_module, auth_headers
+
+
+class _FakeRedis:
+    """redis.asyncio 接口的最小替身：mget、pipeline(set / incr)"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def set(self, key, value, ex=None):
+        self._ops.append(lambda: self._client.values.__setitem__(key, value.encode() if isinstance(value, str) else value))
+
+    def incr(self, key):
+        self._ops.append(lambda: self._client.values.__setitem__(key, int(self._client.values.get(key, 0)) + 1))
+
+    async def execute(self):
+        for op in self._ops:
+            op()
+
+
+@pytest.fixture
+def redis_urls(monkeypatch):
+    """记录创建 Redis 后端时使用的地址（测试环境未安装 redis 包）"""
+    urls = []
+    monkeypatch.setattr(RedisBackend, "from_url", classmethod(lambda cls, url: urls.append(url) or cls(None)))
+    return urls
+
+
+@pytest.mark.parametrize("backend, redis_url, cache_url, expected, expected_url", [
+    (None, None, None, MemoryBackend, None),
+    # 只设置 REDIS_URL 不切换到 redis 后端
+    (None, "redis://shared:6379/1", None, MemoryBackend, None),
+    ("redis", "redis://shared:6379/1", None, RedisBackend, "redis://shared:6379/1"),
+    ("redis", "redis://shared:6379/1", "redis://cache:6379/2", RedisBackend, "redis://cache:6379/2"),
+    ("memory", "redis://shared:6379/1", None, MemoryBackend, None),
+    ("redis", None, None, RedisBackend, "redis://localhost:6379/0"),
+    ("none", "redis://shared:6379/1", None, type(None), None),
+])
+def test_backend_selection(monkeypatch, redis_urls, backend, redis_url, cache_url, expected, expected_url):
+    monkeypatch.setattr(settings, "QUERY_CACHE_BACKEND", backend)
+    monkeypatch.setattr(settings, "REDIS_URL", redis_url)
+    monkeypatch.setattr(settings, "QUERY_CACHE_REDIS_URL", cache_url)
+
+    assert isinstance(_create_backend(), expected)
+    assert redis_urls == ([expected_url] if expected_url else [])
+
+
+async def test_redis_backend_stores_json():
+    client = _FakeRedis()
+    cache = QueryCache(RedisBackend(client), ttl_seconds=60)
+    value = {"module_count": 2, "modules_by_status": {"open": 2}, "total_bounty": 1.5, "links": [3, None]}
+
+    async def load(missing):
+        return {key: value for key in missing}
+
+    assert await cache.get_or_load_many({"stats:1": ["project:1"]}, load) == {"stats:1": value}
+    stored = client.values["nexus:qc:e:stats:1"]
+    assert json.loads(stored) == [value, {"project:1": 0}]
+
+    assert await cache.get_or_load_many({"stats:1": ["project:1"]}, load) == {"stats:1": value}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_redis_backend_does_not_unpickle_entries():
+    client = _FakeRedis()
+    cache = QueryCache(RedisBackend(client), ttl_seconds=60)
+    # 能写 Redis 的人写入的 pickle 数据只会被当作读取失败，不会被执行
+    client.values["nexus:qc:e:stats:1"] = pickle.dumps(({"forged": True}, {}))
+
+    async def load(missing):
+        return {key: {"forged": False} for key in missing}
+
+    assert await cache.get_or_load_many({"stats:1": ["project:1"]}, load) == {"stats:1": {"forged": False}}
+    assert cache.errors == 1
+    assert json.loads(client.values["nexus:qc:e:stats:1"])[0] == {"forged": False}
+
+
+async def test_module_detail_round_trips_through_redis(db, client, monkeypatch):
+    monkeypatch.setattr(query_cache, "backend", RedisBackend(_FakeRedis()))
+    commander = await create_user(db, "commander", role="commander")
+    module = await create_module(db, await create_project(db, commander), bounty=12.5)
+    headers = auth_headers(commander)
+
+    first = await client.get(f"/api/v1/modules/{module.id}", headers=headers)
+    hits = query_cache.hits
+    second = await client.get(f"/api/v1/modules/{module.id}", headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert query_cache.hits == hits + 1
+    assert second.json() == first.json()
+    assert second.json()["bounty"] == 12.5
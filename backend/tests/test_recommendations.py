@@ -0,0 +1,144 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.models.module import MAX_MODULE_ASSIGNEES
+from app.services import recommendations
+from app.services.recommendations import ModuleFeatureIndex, recommend_modules
+
+from tests.conftest import create_user, create_project, create_module
+
+NOW = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+
+def _index(modules, reputations=()) -> ModuleFeatureIndex:
+    index = ModuleFeatureIndex(rebuild_seconds=300)
+    index._grow(64)
+    for module in modules:
+        index._upsert(*module)
+    index._reputations = np.sort(np.asarray(reputations, dtype=np.float64))
+    return index
+
+
+def _random_modules(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    modules = []
+    for module_id in range(1, n + 1):
+        deadline = None if rng.random() < 0.3 else NOW + timedelta(hours=rng.uniform(-24, 240))
+        modules.append((
+            module_id,
+            rng.randint(1, 20),
+            rng.choice([0.0, rng.uniform(1, 5000)]),
+            deadline,
+            rng.randint(0, MAX_MODULE_ASSIGNEES),
+        ))
+    return modules
+
+
+def _reference_score(module, max_bounty, level, project_counts, exclude, now) -> float:
+    """逐个模块计算的参考实现"""
+    module_id, project_id, bounty, deadline, assignee_count = module
+    seats = MAX_MODULE_ASSIGNEES - assignee_count
+    hours_left = math.inf if deadline is None else (deadline.timestamp() - now) / 3600
+    if seats <= 0 or hours_left <= 0 or module_id in exclude:
+        return -math.inf
+    bounty_norm = math.log1p(bounty) / math.log1p(max_bounty) if max_bounty > 0 else 0.0
+    urgency = math.exp(-max(hours_left, 0) / recommendations.URGENCY_HOURS)
+    fit = 1.0 - abs(bounty_norm - level)
+    total = sum(project_counts.values())
+    affinity = project_counts.get(project_id, 0) / total if total else 0.0
+    return (
+        recommendations.WEIGHT_BOUNTY * bounty_norm
+        + recommendations.WEIGHT_URGENCY * urgency
+        + recommendations.WEIGHT_FIT * fit
+        + recommendations.WEIGHT_AFFINITY * affinity
+        + recommendations.WEIGHT_SEATS * seats / MAX_MODULE_ASSIGNEES
+    )
+
+
+def test_vectorized_scores_match_reference():
+    modules = _random_modules(500)
+    reputations = [float(r) for r in range(0, 200, 2)]
+    index = _index(modules, reputations)
+    project_counts = {3: 4, 7: 1, 19: 2}
+    exclude = {5, 10, 15}
+    now = NOW.timestamp()
+
+    scores = index.score(reputation=120.0, completions=4, project_counts=project_counts, exclude_ids=exclude, now=now)
+
+    rep_pct = sum(r <= 120.0 for r in reputations) / len(reputations)
+    level = 0.7 * rep_pct + 0.3 * 4 / recommendations.EXPERIENCED_COMPLETIONS
+    max_bounty = max(module[2] for module in modules)
+    expected = [_reference_score(m, max_bounty, level, project_counts, exclude, now) for m in modules]
+    np.testing.assert_allclose(scores, expected)
+
+    ranked = sorted((s, m[0]) for s, m in zip(expected, modules) if s != -math.inf)
+    assert index.top(scores, 20) == [module_id for _s, module_id in sorted(ranked, key=lambda x: -x[0])[:20]]
+    assert len(index.top(scores, 10000)) == len(ranked)
+
+
+def test_unavailable_modules_are_never_recommended():
+    index = _index([
+        (1, 1, 100.0, None, MAX_MODULE_ASSIGNEES),     # 满员
+        (2, 1, 100.0, NOW - timedelta(hours=1), 0),    # 已过截止时间
+        (3, 1, 100.0, None, 0),                        # 已承接
+        (4, 1, 10.0, NOW + timedelta(hours=1), 0),
+    ])
+
+    scores = index.score(reputation=0.0, completions=0, project_counts={}, exclude_ids=[3], now=NOW.timestamp())
+
+    assert index.top(scores, 10) == [4]
+
+
+def test_remove_keeps_rows_consistent():
+    modules = _random_modules(100)
+    index = _index(modules)
+    for module_id in (1, 50, 100, 2):
+        index._remove(module_id)
+    index._upsert(101, 1, 10.0, None, 0)
+
+    expected = {m[0]: m for m in modules if m[0] not in (1, 50, 100, 2)}
+    expected[101] = (101, 1, 10.0, None, 0)
+    assert index._size == len(expected)
+    for module_id, row in index._rows.items():
+        assert index._ids[row] == module_id
+        assert index._project_ids[row] == expected[module_id][1]
+
+
+def test_scoring_benchmark():
+    """100k 个模块的整列打分与取前 20，单次应在毫秒级（上限放宽以适应慢速机器）"""
+    index = _index(_random_modules(100_000))
+    now = NOW.timestamp()
+    project_counts = {project_id: project_id for project_id in range(1, 21)}
+
+    started = time.perf_counter()
+    for _ in range(5):
+        scores = index.score(reputation=80.0, completions=3, project_counts=project_counts, exclude_ids=range(50), now=now)
+        index.top(scores, 20)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / 5
+
+    print(f"\nscored {index._size} modules in {elapsed_ms:.2f} ms")
+    assert elapsed_ms < 250
+
+
+async def test_recommendations_follow_committed_changes(db, monkeypatch):
+    monkeypatch.setattr(recommendations, "module_features", ModuleFeatureIndex(rebuild_seconds=300))
+    commander = await create_user(db, "commander", role="commander")
+    project = await create_project(db, commander)
+    rich = await create_module(db, project, "高赏金", bounty=1000.0)
+    poor = await create_module(db, project, "低赏金", bounty=1.0)
+    await create_module(db, project, "已关闭", bounty=5000.0, status="closed")
+    user = await create_user(db, "node", reputation_score=100.0)
+
+    assert await recommend_modules(db, user) == [rich.id, poor.id]
+
+    rich.status = "closed"
+    await db.commit()
+    assert await recommend_modules(db, user) == [poor.id]
+    assert recommendations.module_features.metrics()["incremental_updates"] == 1
+
+    user.concurrent_task_count = 3
+    assert await recommend_modules(db, user) == []
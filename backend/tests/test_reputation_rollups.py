@@ -0,0 +1,128 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import select, delete, update
+
+from app.models.reputation_history import ReputationHistory
+from app.models.reputation_rollup import ReputationRollup
+from app.services.reputation_rollups import record_reputation_history, reputation_series, backfill_rollups
+
+from tests.conftest import create_user, auth_headers
+
+# 2026-09-28 与 2026-10-05 是周一
+CHANGES = [
+    (datetime(2026, 9, 30, 10, 0, tzinfo=timezone.utc), 5.0),
+    (datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc), -2.0),
+    (datetime(2026, 10, 1, 18, 0, tzinfo=timezone.utc), 3.0),
+    (datetime(2026, 10, 5, 12, 0, tzinfo=timezone.utc), 4.0),
+]
+
+
+async def _record_changes(db, user_id: int) -> None:
+    # 每条记录一个事务，验证跨事务的累加
+    for changed_at, score_change in CHANGES:
+        await record_reputation_history(db, [
+            ReputationHistory(user_id=user_id, score_change=score_change, reason="测试", changed_at=changed_at)
+        ])
+        await db.commit()
+
+
+async def _rollups(db, user_id: int) -> dict:
+    result = await db.execute(
+        select(ReputationRollup).where(ReputationRollup.user_id == user_id)
+    )
+    return {
+        (r.granularity, r.bucket_start): (r.score_change, r.gains, r.losses, r.event_count)
+        for r in result.scalars().all()
+    }
+
+
+async def test_history_accumulates_into_day_week_and_month_buckets(db):
+    user = await create_user(db, "node")
+    await _record_changes(db, user.id)
+
+    assert await _rollups(db, user.id) == {
+        ("day", date(2026, 9, 30)): (5.0, 5.0, 0.0, 1),
+        ("day", date(2026, 10, 1)): (1.0, 3.0, 2.0, 2),
+        ("day", date(2026, 10, 5)): (4.0, 4.0, 0.0, 1),
+        ("week", date(2026, 9, 28)): (6.0, 8.0, 2.0, 3),
+        ("week", date(2026, 10, 5)): (4.0, 4.0, 0.0, 1),
+        ("month", date(2026, 9, 1)): (5.0, 5.0, 0.0, 1),
+        ("month", date(2026, 10, 1)): (5.0, 7.0, 2.0, 3),
+    }
+    history = await db.execute(select(ReputationHistory.id).where(ReputationHistory.user_id == user.id))
+    assert len(history.all()) == len(CHANGES)
+
+
+async def test_backfill_matches_incremental_rollups(db):
+    users = [await create_user(db, f"node{i}") for i in range(3)]
+    for user in users[:2]:
+        await _record_changes(db, user.id)
+    expected = {user.id: await _rollups(db, user.id) for user in users}
+
+    # 丢失和被改坏的桶都由明细重算
+    await db.execute(delete(ReputationRollup).where(ReputationRollup.user_id == users[0].id))
+    await db.execute(
+        update(ReputationRollup).where(ReputationRollup.user_id == users[1].id).values(score_change=99.0)
+    )
+    await db.commit()
+
+    assert await backfill_rollups(db, batch_size=1) == 2
+    assert {user.id: await _rollups(db, user.id) for user in users} == expected
+    assert expected[users[2].id] == {}
+
+
+async def test_series_zero_fills_and_derives_scores_from_current(db):
+    user = await create_user(db, "node", reputation_score=100.0)
+    await _record_changes(db, user.id)
+
+    points = await reputation_series(db, user, "day", date(2026, 9, 29), date(2026, 10, 2))
+
+    # 10-05 的 +4 在区间之后，区间末尾的分数为 96
+    assert [(p["bucket_start"], p["score_change"], p["event_count"], p["score"]) for p in points] == [
+        (date(2026, 9, 29), 0.0, 0, 90.0),
+        (date(2026, 9, 30), 5.0, 1, 95.0),
+        (date(2026, 10, 1), 1.0, 2, 96.0),
+        (date(2026, 10, 2), 0.0, 0, 96.0),
+    ]
+
+    months = await reputation_series(db, user, "month", date(2026, 8, 15), date(2026, 10, 18))
+    assert [(p["bucket_start"], p["score"]) for p in months] == [
+        (date(2026, 8, 1), 90.0),
+        (date(2026, 9, 1), 95.0),
+        (date(2026, 10, 1), 100.0),
+    ]
+
+
+async def test_series_endpoint(db, client):
+    user = await create_user(db, "node", reputation_score=100.0)
+    await _record_changes(db, user.id)
+    viewer = await create_user(db, "viewer")
+
+    response = await client.get(
+        f"/api/v1/reputation/users/{user.id}/series",
+        params={"granularity": "week", "start": "2026-10-01", "end": "2026-10-11"},
+        headers=auth_headers(viewer)
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["current_score"] == 100.0
+    assert [(p["bucket_start"], p["gains"], p["losses"], p["score"]) for p in body["points"]] == [
+        ("2026-09-28", 8.0, 2.0, 96.0),
+        ("2026-10-05", 4.0, 0.0, 100.0),
+    ]
+
+
+@pytest.mark.parametrize("params", [
+    {"granularity": "day", "start": "2026-10-02", "end": "2026-10-01"},
+    {"granularity": "day", "start": "2025-01-01", "end": "2026-10-01"},
+    {"granularity": "week", "start": "2000-01-01", "end": "2026-10-01"},
+    {"granularity": "month", "start": "1990-01-01", "end": "2026-10-01"},
+])
+async def test_series_rejects_inverted_or_too_large_ranges(db, client, params):
+    user = await create_user(db, "node")
+
+    response = await client.get("/api/v1/reputation/me/series", params=params, headers=auth_headers(user))
+
+    assert response.status_code == 400
@@ -0,0 +1,129 @@
+import io
+import zlib
+
+import pytest
+
+from app.models import KnowledgeItem
+from app.services import text_extraction
+from app.services.text_extraction import extract_text, _extract_pdf, _decode_pdf_string, _TextBuffer
+
+from tests.conftest import create_user, auth_headers
+
+
+def _pdf(*streams: bytes) -> bytes:
+    """最小的 PDF：每个内容流一个对象"""
+    parts = [b"%PDF-1.4\n"]
+    for number, (dictionary, content) in enumerate(streams, start=1):
+        parts.append(
+            b"%d 0 obj\n<< %s /Length %d >>\nstream\n%s\nendstream\nendobj\n"
+            % (number, dictionary, len(content), content)
+        )
+    parts.append(b"trailer\n<< /Root 1 0 R >>\n%%EOF\n")
+    return b"".join(parts)
+
+
+PAGE_ONE = b"BT /F1 12 Tf (Hello) Tj ET BT [(Wor) -20 (ld)] TJ ET"
+PAGE_TWO = b"BT (second \\(page\\)) Tj ET"
+PDF = _pdf(
+    (b"/Filter /FlateDecode", zlib.compress(PAGE_ONE)),
+    (b"", PAGE_TWO),
+    (b"/Filter /DCTDecode", b"BT (image bytes) Tj ET"),
+)
+
+
+@pytest.mark.parametrize("literal, expected", [
+    (rb"(plain)", "plain"),
+    (rb"(a\\b\(c\))", "a\\b(c)"),
+    (rb"(tab\there)", "tab\there"),
+    (rb"(\101\102C)", "ABC"),
+    (rb"(\0617)", "17"),
+    # \8、\9 不是八进制转义：忽略反斜杠，保留数字
+    (rb"(ab\9c)", "ab9c"),
+    (rb"(\8\9)", "89"),
+    (rb"(\18)", "\x018"),
+    (rb"(\q)", "q"),
+    (rb"(end\)", "end"),
+])
+def test_decode_pdf_string(literal, expected):
+    assert _decode_pdf_string(literal) == expected
+
+
+def test_pdf_with_non_octal_digit_escape_is_extracted():
+    buffer = _TextBuffer(1000)
+    _extract_pdf(io.BytesIO(_pdf((b"", rb"BT (v\9.0 \101) Tj ET"))), buffer)
+    assert buffer.text() == "v9.0 A\n"
+
+
+class _RecordingFile(io.BytesIO):
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1024 * 1024])
+def test_pdf_text_is_extracted_across_chunk_boundaries(monkeypatch, chunk_size):
+    monkeypatch.setattr(text_extraction, "CHUNK_SIZE", chunk_size)
+    buffer = _TextBuffer(1000)
+
+    _extract_pdf(io.BytesIO(PDF), buffer)
+
+    assert buffer.text() == "Hello\nWorld\nsecond (page)\n"
+
+
+def test_pdf_is_read_in_bounded_chunks(monkeypatch):
+    monkeypatch.setattr(text_extraction, "CHUNK_SIZE", 16)
+    fileobj = _RecordingFile(PDF)
+
+    _extract_pdf(fileobj, _TextBuffer(1000))
+
+    assert fileobj.read_sizes and all(0 < size <= 16 for size in fileobj.read_sizes)
+
+
+def test_pdf_extraction_stops_at_max_chars(monkeypatch):
+    monkeypatch.setattr(text_extraction, "CHUNK_SIZE", 8)
+    content = b" ".join(b"BT (line %d) Tj ET" % i for i in range(1000))
+    fileobj = _RecordingFile(_pdf((b"", content)))
+    buffer = _TextBuffer(20)
+
+    _extract_pdf(fileobj, buffer)
+
+    assert buffer.text() == "line 0\nline 1\nline 2"
+    assert sum(fileobj.read_sizes) < len(fileobj.getvalue()) // 2
+
+
+def test_extract_text_from_pdf_file(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(PDF)
+    assert extract_text(str(path), "doc.pdf", 1000) == "Hello\nWorld\nsecond (page)"
+
+
+async def test_knowledge_reads_do_not_load_content_text(db, client, query_counter):
+    user = await create_user(db, "uploader")
+    item = KnowledgeItem(
+        title="大文件",
+        file_url="/tmp/none",
+        file_name="big.txt",
+        file_size=1,
+        file_type="text/plain",
+        uploader_id=user.id,
+        content_text="内容" * 1000,
+        extraction_status="done",
+    )
+    db.add(item)
+    await db.commit()
+    headers = auth_headers(user)
+    query_counter.clear()
+
+    listed = await client.get("/api/v1/knowledge/", headers=headers)
+    detail = await client.get(f"/api/v1/knowledge/{item.id}", headers=headers)
+    extraction = await client.get(f"/api/v1/knowledge/{item.id}/extraction", headers=headers)
+
+    assert listed.status_code == detail.status_code == extraction.status_code == 200
+    assert extraction.json()["content_length"] == 2000
+    # 只在 SQL 里计算长度，不把全文取回应用
+    loaded = [s for s in query_counter if "knowledge_items.content_text" in s.replace("length(knowledge_items.content_text)", "")]
+    assert loaded == []
@@ -0,0 +1,135 @@
+from sqlalchemy import delete, func, select, text, update
+
+from app.db.session import engine
+from app.models import Notification
+from app.models.notification_counter import NotificationCounter
+from app.services import notifications
+from app.services.notifications import notify_users, reconcile_unread_counts, reconcile_metrics
+
+from tests.conftest import create_user, auth_headers
+
+
+async def _stored(db, user_id: int) -> int:
+    count = await db.scalar(select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id))
+    return count or 0
+
+
+async def _actual(db, user_id: int) -> int:
+    return await db.scalar(
+        select(func.count(Notification.id)).where(Notification.recipient_id == user_id, Notification.is_read == False)
+    )
+
+
+async def _notify(db, user_ids, count: int = 1) -> None:
+    for i in range(count):
+        await notify_users(db, user_ids, "module_published", f"通知{i}", "")
+    await db.commit()
+
+
+async def _assert_consistent(db, *users) -> None:
+    for user in users:
+        assert await _stored(db, user.id) == await _actual(db, user.id)
+
+
+async def test_counter_follows_every_write_path(db, client):
+    user = await create_user(db, "node")
+    other = await create_user(db, "other")
+    headers = auth_headers(user)
+
+    await _notify(db, [user.id, other.id], count=6)
+    assert await _stored(db, user.id) == 6
+    await _assert_consistent(db, user, other)
+
+    ids = (await db.execute(
+        select(Notification.id).where(Notification.recipient_id == user.id).order_by(Notification.id)
+    )).scalars().all()
+
+    # 单条标记已读：重复标记只减一次
+    for _ in range(2):
+        assert (await client.post(f"/api/v1/notifications/{ids[0]}/read", headers=headers)).status_code == 200
+    assert await _stored(db, user.id) == 5
+
+    # 批量标记已读（mark_read）
+    response = await client.post("/api/v1/notifications/bulk/read", json={"ids": ids[1:3]}, headers=headers)
+    assert response.json()["count"] == 2
+    assert await _stored(db, user.id) == 3
+
+    # 删除未读通知扣减计数，删除已读通知不影响
+    response = await client.post(
+        "/api/v1/notifications/bulk/delete", json={"ids": ids[:4], "read_only": False}, headers=headers
+    )
+    assert response.json()["count"] == 4
+    assert await _stored(db, user.id) == 2
+
+    # 归档未读通知同样扣减
+    response = await client.post(
+        "/api/v1/notifications/bulk/archive", json={"ids": ids[4:5], "read_only": False}, headers=headers
+    )
+    assert response.json()["count"] == 1
+    assert await _stored(db, user.id) == 1
+
+    # 全部标记已读
+    assert (await client.post("/api/v1/notifications/read-all", headers=headers)).status_code == 200
+    assert await _stored(db, user.id) == 0
+    assert (await client.get("/api/v1/notifications/unread-count", headers=headers)).json() == {"unread_count": 0}
+
+    await _assert_consistent(db, user, other)
+    assert await reconcile_unread_counts(db) == 0
+
+
+async def test_reconcile_corrects_drift(db, monkeypatch):
+    events = []
+    monkeypatch.setattr(notifications, "queue_event", lambda _db, *args, **kwargs: events.append(args))
+    drifted = await create_user(db, "drifted")
+    missing_row = await create_user(db, "missing_row")
+    phantom = await create_user(db, "phantom")
+    correct = await create_user(db, "correct")
+    await _notify(db, [drifted.id, missing_row.id, correct.id], count=3)
+    events.clear()
+
+    await db.execute(update(NotificationCounter).where(NotificationCounter.user_id == drifted.id).values(unread_count=10))
+    await db.execute(delete(NotificationCounter).where(NotificationCounter.user_id == missing_row.id))
+    db.add(NotificationCounter(user_id=phantom.id, unread_count=4))
+    await db.commit()
+
+    assert await reconcile_unread_counts(db, batch_size=2) == 3
+
+    await _assert_consistent(db, drifted, missing_row, phantom, correct)
+    assert sorted(events) == sorted([
+        (drifted.id, "unread", {"unread_count": 3}),
+        (missing_row.id, "unread", {"unread_count": 3}),
+        (phantom.id, "unread", {"unread_count": 0}),
+    ])
+    assert reconcile_metrics["corrected"] == 3 and reconcile_metrics["checked_users"] == 4
+
+
+async def test_reconcile_recounts_after_concurrent_write(db, monkeypatch):
+    """候选集合读取之后提交的写入：锁定后重新计数，不用旧的读数覆盖"""
+    user = await create_user(db, "node")
+    await _notify(db, [user.id], count=2)
+    await db.execute(update(NotificationCounter).where(NotificationCounter.user_id == user.id).values(unread_count=0))
+    await db.commit()
+
+    async def concurrent_insert():
+        # 另一个连接在同一事务中写入通知和计数（与 insert_notifications 相同）
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "INSERT INTO notifications (recipient_id, type, title, content, is_read) "
+                "VALUES (:id, 'module_published', 'late', '', 0)"
+            ), {"id": user.id})
+            await conn.execute(text(
+                "UPDATE notification_counters SET unread_count = unread_count + 1 WHERE user_id = :id"
+            ), {"id": user.id})
+
+    # 候选读取结束后、加锁之前插入并发写入
+    original_batch = notifications._reconcile_batch
+
+    async def batch_after_concurrent_write(session, user_ids):
+        await concurrent_insert()
+        return await original_batch(session, user_ids)
+
+    monkeypatch.setattr(notifications, "_reconcile_batch", batch_after_concurrent_write)
+    assert await reconcile_unread_counts(db) == 1
+
+    assert await _stored(db, user.id) == 3
+    await _assert_consistent(db, user)
@@ -1,13 +1,14 @@
 import React, { useState } from 'react'
 import { Outlet, Link, useNavigate } from 'react-router-dom'
 import { useAuthStore } from '@/store/authStore'
-import { useUnreadCount, useNotifications, useMarkAsRead, useMarkAllAsRead } from '@/services/queries'
+import { useUnreadCount, useNotifications, useMarkAsRead, useMarkAllAsRead, useNotificationStream } from '@/services/queries'
 import { Avatar, Button } from '@/components/ui'
 import ToastContainer from '@/components/ui/Toast'
 
 const Layout: React.FC = () => {
   const navigate = useNavigate()
   const { user, clearAuth } = useAuthStore()
+  useNotificationStream()
   const { data: unreadData } = useUnreadCount()
   const { data: notifications } = useNotifications(false)
   const markAsRead = useMarkAsRead()
@@ -155,6 +155,10 @@ export const notificationsApi = {
     return response.data
   },
 
+  // Server-Sent Events stream (EventSource cannot set headers, so the token goes in the query)
+  streamUrl: (token: string): string =>
+    `${API_URL}/api/v1/notifications/stream?access_token=${encodeURIComponent(token)}`,
+
   getUnreadCount: async (): Promise<{ unread_count: number }> => {
     const response = await api.get('/api/v1/notifications/unread-count')
     return response.data
@@ -224,6 +228,19 @@ export const knowledgeApi = {
   },
 }
 
+// Leaderboard API
+export const leaderboardApi = {
+  list: async (limit = 100, offset = 0): Promise<any[]> => {
+    const response = await api.get('/api/v1/leaderboard/', { params: { limit, offset } })
+    return response.data
+  },
+
+  me: async (radius = 2): Promise<any> => {
+    const response = await api.get('/api/v1/leaderboard/me', { params: { radius } })
+    return response.data
+  },
+}
+
 // Abandon Requests API
 export const abandonRequestsApi = {
   create: async (data: { module_id: number; reason: string }): Promise<any> => {
@@ -1,5 +1,6 @@
+import { useEffect } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
-import { authApi, projectsApi, modulesApi, deliveriesApi, reviewsApi, notificationsApi, abandonRequestsApi, knowledgeApi } from '@/services/api'
+import { authApi, projectsApi, modulesApi, deliveriesApi, reviewsApi, notificationsApi, abandonRequestsApi, knowledgeApi, leaderboardApi } from '@/services/api'
 import { useAuthStore } from '@/store/authStore'
 import type { LoginCredentials, RegisterData } from '@/types'
 
@@ -150,12 +151,20 @@ export const useCreateReview = () => {
   })
 }
 
+// Leaderboard hooks
+export const useLeaderboard = (limit = 100) => {
+  return useQuery({
+    queryKey: ['leaderboard', limit],
+    queryFn: () => leaderboardApi.list(limit),
+  })
+}
+
 // Notifications hooks
 export const useNotifications = (unreadOnly = false) => {
   return useQuery({
     queryKey: ['notifications', unreadOnly],
     queryFn: () => notificationsApi.list(0, 50, unreadOnly),
-    refetchInterval: 30000, // Refetch every 30 seconds
+    refetchInterval: 300000, // Fallback only, updates arrive via useNotificationStream
   })
 }
 
@@ -163,10 +172,44 @@ export const useUnreadCount = () => {
   return useQuery({
     queryKey: ['unreadCount'],
     queryFn: notificationsApi.getUnreadCount,
-    refetchInterval: 15000, // Refetch every 15 seconds
+    refetchInterval: 300000, // Fallback only, updates arrive via useNotificationStream
   })
 }
 
+// Push notifications and unread-count changes into the query cache
+export const useNotificationStream = () => {
+  const queryClient = useQueryClient()
+  const token = useAuthStore((state) => state.token)
+
+  useEffect(() => {
+    if (!token) return
+
+    // EventSource reconnects automatically and sends Last-Event-ID
+    const source = new EventSource(notificationsApi.streamUrl(token))
+
+    source.addEventListener('notification', () => {
+      queryClient.invalidateQueries({ queryKey: ['notifications'] })
+    })
+
+    source.addEventListener('unread', (event) => {
+      const data = JSON.parse((event as MessageEvent).data)
+      queryClient.setQueryData<{ unread_count: number }>(['unreadCount'], (old) => ({
+        unread_count:
+          data.unread_count !== undefined
+            ? data.unread_count
+            : Math.max(0, (old?.unread_count ?? 0) + data.delta),
+      }))
+    })
+
+    source.addEventListener('resync', () => {
+      queryClient.invalidateQueries({ queryKey: ['notifications'] })
+      queryClient.invalidateQueries({ queryKey: ['unreadCount'] })
+    })
+
+    return () => source.close()
+  }, [token, queryClient])
+}
+
 export const useMarkAsRead = () => {
   const queryClient = useQueryClient()
 